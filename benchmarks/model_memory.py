@@ -0,0 +1,76 @@
+"""Compare the memory footprint of the account model against plain dicts.
+
+Builds a synthetic organization (10,000 accounts with 20 roles each, spread
+over a three-level OU hierarchy), serializes it to the ``.ou-cache`` JSON
+format and measures the memory retained by:
+
+* the plain list of dicts returned by ``json.load`` (the previous in-memory
+  representation), and
+* an :class:`~sso_config_generator.models.Organization` built from the same
+  cache data.
+
+Run from the repository root:
+
+    python benchmarks/model_memory.py [--accounts N] [--roles N]
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sso_config_generator.models import Organization  # noqa: E402
+
+
+def synthetic_cache(accounts: int, roles: int) -> str:
+    """Return the JSON text of a synthetic ``.ou-cache`` file."""
+    role_names = [f"Role{r:02d}Access" for r in range(roles)]
+    entries = []
+    for i in range(accounts):
+        ou_path = f"/Workloads/BusinessUnit{i % 25:02d}/Team{i % 200:03d}/"
+        entries.append({
+            'id': f"{100000000000 + i:012d}",
+            'name': f"account-{i:05d}",
+            'ou_path': ou_path,
+            'roles': role_names,
+        })
+    return json.dumps({'ou_tree': None, 'accounts': entries})
+
+
+def retained(build) -> int:
+    """Return the number of bytes retained by the object ``build()`` returns."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    obj = build()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del obj
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=10_000)
+    parser.add_argument('--roles', type=int, default=20)
+    args = parser.parse_args()
+
+    text = synthetic_cache(args.accounts, args.roles)
+
+    dict_bytes = retained(lambda: json.loads(text)['accounts'])
+    model_bytes = retained(lambda: Organization.from_cache(json.loads(text)['accounts']))
+
+    print(f"{args.accounts} accounts x {args.roles} roles")
+    print(f"  dicts:        {dict_bytes / 1024 / 1024:8.2f} MiB")
+    print(f"  Organization: {model_bytes / 1024 / 1024:8.2f} MiB")
+    print(f"  reduction:    {100 * (1 - model_bytes / dict_bytes):8.1f} %")
+
+
+if __name__ == '__main__':
+    main()
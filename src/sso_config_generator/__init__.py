@@ -1,6 +1,17 @@
 """SSO Config Generator - Generate AWS SSO configuration and directory structures."""
 
 from .version import __version__
-from .core import SSOConfigGenerator
 
-__all__ = ["SSOConfigGenerator", "__version__"]
+__all__ = ["SSOConfigGenerator", "AccountDirectory", "__version__"]
+
+
+def __getattr__(name):
+    # Imported on first use: importing the package (e.g. for the command line
+    # entry point) must not import boto3
+    if name == "SSOConfigGenerator":
+        from .core import SSOConfigGenerator
+        return SSOConfigGenerator
+    if name == "AccountDirectory":
+        from .api import AccountDirectory
+        return AccountDirectory
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
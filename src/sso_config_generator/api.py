@@ -0,0 +1,200 @@
+"""Embeddable library API for account, role and OU discovery.
+
+Services that need the accounts visible to an SSO user can use this module
+in-process instead of running the ``sso-config-generator`` command::
+
+    from sso_config_generator.api import AccountDirectory
+
+    directory = AccountDirectory(sso_session_name="sso", use_ou_structure=True)
+    for account in directory.iter_accounts():
+        print(account.id, account.name, account.ou_path, account.roles)
+
+    async for account in directory.aiter_accounts():
+        ...
+
+Discovery uses the same ``.ou-cache`` as the command line tool, with the same
+semantics: fresh cache segments are used as is, expired segments are updated
+incrementally and a missing cache is rebuilt.  During a rebuild accounts are
+yielded as soon as they have been discovered.
+
+Creating an :class:`AccountDirectory` has no side effects; configuration is
+read on first use.  Nothing is printed (messages go to the
+``sso_config_generator.core`` logger), nothing is prompted for, the working
+directory is not changed and neither ``~/.aws/config`` nor any directory tree
+is written.  Discovery does write the files it needs to keep working: the
+``.ou-cache`` and its ``.journal`` and checkpoint files, the shared
+organization cache when one is configured, and the SSO token cache when
+botocore refreshes an expiring token.
+
+Discovery stops when the consumer stops iterating, for instance after a
+``break``: the iterator is closed and discovery ends at its next checkpoint,
+keeping what it found so far in the cache, as a run that reached its
+deadline does.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from .core import SSOConfigGenerator
+from .models import Account, OUNode
+
+__all__ = ["AccountDirectory", "DiscoveryError", "Account", "OUNode",
+           "iter_accounts", "aiter_accounts"]
+
+# Marks the end of a discovery run on the queue between producer and consumer
+_DONE = object()
+
+
+class DiscoveryError(Exception):
+    """Raised when the accounts cannot be discovered (e.g. no valid SSO session)."""
+
+
+class AccountDirectory:
+    """Accounts, roles and OUs visible through an SSO session.
+
+    One instance keeps its AWS clients and SSO token between calls, so repeated
+    lookups from a long-running service stay cheap.  Discovery runs of one
+    instance are serialized; iterate from as many threads or tasks as needed.
+
+    Args:
+        sso_session_name: Name of the ``[sso-session …]`` section (default:
+            auto-detected, as on the command line)
+        profile: AWS profile used to authenticate (default: sso-browser)
+        region: AWS region (default: eu-west-1)
+        use_ou_structure: Look up the OU of every account (default: False)
+        **options: Further :class:`~sso_config_generator.core.SSOConfigGenerator`
+            discovery options, e.g. ``max_workers``, ``role_discovery``, the
+            cache TTLs or a ``deadline`` per discovery run
+    """
+
+    def __init__(self, sso_session_name: Optional[str] = None, profile: str = "sso-browser",
+                 region: str = "eu-west-1", use_ou_structure: bool = False, **options):
+        self._options: Dict = dict(options, sso_session_name=sso_session_name, profile=profile,
+                                   region=region, use_ou_structure=use_ou_structure)
+        self._generator = None
+        self._lock = threading.Lock()
+
+    def iter_accounts(self, rebuild_cache: bool = False) -> Iterator[Account]:
+        """Iterate over the accounts with at least one accessible role.
+
+        Args:
+            rebuild_cache: Re-discover the organization even when the cache is fresh
+
+        Raises:
+            DiscoveryError: When discovery fails
+        """
+        items: queue.SimpleQueue = queue.SimpleQueue()
+        stop = threading.Event()
+        threading.Thread(target=self._discover, args=(rebuild_cache, items.put, stop),
+                         name="sso-config-generator-discovery", daemon=True).start()
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    async def aiter_accounts(self, rebuild_cache: bool = False) -> AsyncIterator[Account]:
+        """Asynchronously iterate over the accounts with at least one accessible role.
+
+        Discovery runs in the event loop's default executor, so the loop is never
+        blocked by AWS calls.
+
+        Args:
+            rebuild_cache: Re-discover the organization even when the cache is fresh
+
+        Raises:
+            DiscoveryError: When discovery fails
+        """
+        loop = asyncio.get_running_loop()
+        items: asyncio.Queue = asyncio.Queue()
+
+        def emit(item) -> None:
+            try:
+                loop.call_soon_threadsafe(items.put_nowait, item)
+            except RuntimeError:
+                pass  # the event loop was closed; nobody is listening anymore
+
+        stop = threading.Event()
+        discovery = loop.run_in_executor(None, self._discover, rebuild_cache, emit, stop)
+        try:
+            while True:
+                item = await items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            if discovery.done():
+                discovery.result()
+
+    def accounts(self, rebuild_cache: bool = False) -> List[Account]:
+        """Return all accounts with at least one accessible role."""
+        return list(self.iter_accounts(rebuild_cache=rebuild_cache))
+
+    def _discover(self, rebuild_cache: bool, emit: Callable, stop: threading.Event) -> None:
+        """Run discovery and pass every account, then ``_DONE`` or the error, to ``emit``.
+
+        Once ``stop`` is set nothing is emitted anymore and discovery ends as if
+        its deadline had passed.
+        """
+        seen = set()
+
+        def on_account(account: Account) -> None:
+            seen.add(account.id)
+            if stop.is_set():
+                # Nobody is listening anymore; end discovery at its next checkpoint
+                generator._deadline_at = time.monotonic()
+                return
+            emit(account)
+
+        try:
+            with self._lock:
+                generator = self._get_generator()
+                generator._start_deadline()
+                try:
+                    if not generator._get_sso_info():
+                        raise DiscoveryError(f"no SSO configuration found in {generator.aws_config_path}")
+                    accounts = generator._get_accounts(on_account=on_account, rebuild_cache=rebuild_cache)
+                finally:
+                    generator._deadline_at = None
+            if accounts is None:
+                raise DiscoveryError("account discovery failed; see the sso_config_generator.core "
+                                     "log for details (is the SSO session still valid?)")
+            # Accounts served from the cache are not streamed while being discovered
+            for account in accounts:
+                if stop.is_set():
+                    return
+                if account.id not in seen:
+                    emit(account)
+            emit(_DONE)
+        except BaseException as exc:
+            if not stop.is_set():
+                emit(exc)
+
+    def _get_generator(self) -> SSOConfigGenerator:
+        if self._generator is None:
+            try:
+                self._generator = SSOConfigGenerator(quiet=True, interactive=False, **self._options)
+            except Exception as exc:
+                raise DiscoveryError(f"unable to set up discovery: {exc}") from exc
+        return self._generator
+
+
+def iter_accounts(rebuild_cache: bool = False, **options) -> Iterator[Account]:
+    """Iterate over the accessible accounts; see :class:`AccountDirectory` for options."""
+    return AccountDirectory(**options).iter_accounts(rebuild_cache=rebuild_cache)
+
+
+def aiter_accounts(rebuild_cache: bool = False, **options) -> AsyncIterator[Account]:
+    """Asynchronously iterate over the accessible accounts; see :class:`AccountDirectory`."""
+    return AccountDirectory(**options).aiter_accounts(rebuild_cache=rebuild_cache)
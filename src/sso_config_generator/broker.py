@@ -0,0 +1,244 @@
+"""Local credential broker for the generated ``Role@Account`` profiles.
+
+Every ``aws``/boto3 process normally resolves SSO credentials on its own: it
+reads the token cache from disk and calls ``GetRoleCredentials``.  Scripts that
+loop over hundreds of profiles repeat that work for every invocation.
+
+:class:`CredentialBroker` keeps the SSO access token in memory and caches role
+credentials per account/role until shortly before they expire.  ``serve()``
+exposes it on a unix socket (only accessible to the current user) and
+:func:`request_credentials` is the client used by the ``credential-process``
+command, which prints credentials in the format expected by the AWS CLI's
+``credential_process`` setting.
+
+The protocol is one JSON request line and one JSON response line per
+connection:
+
+* ``{"account_id": "...", "role_name": "..."}`` returns ``{"credentials": {...}}``
+* ``{"prefetch": [["<account_id>", "<role_name>"], ...]}`` (or ``"all"``)
+  fetches the listed credentials concurrently and returns ``{"prefetched": N}``
+
+Errors are returned as ``{"error": "..."}``.
+
+The client side only uses the standard library, so ``credential-process``
+stays fast when the broker is running.
+"""
+
+import datetime
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+# Credentials are fetched again when they expire within this margin
+REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+# Seconds the client waits for the broker before giving up
+CLIENT_TIMEOUT = 30
+
+
+class BrokerError(Exception):
+    """Raised when credentials cannot be obtained from the broker."""
+
+
+class CredentialBroker:
+    """Fetch and cache role credentials using the generator's SSO token.
+
+    Args:
+        generator: Configured :class:`~sso_config_generator.core.SSOConfigGenerator`;
+            its SSO client, token handling and OU cache are reused
+    """
+
+    def __init__(self, generator):
+        self.generator = generator
+        self._credentials: Dict[Tuple[str, str], Dict] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._auth_lock = threading.Lock()
+
+    def get(self, account_id: str, role_name: str) -> Dict:
+        """Return ``credential_process`` output for a role, from cache when still valid.
+
+        Concurrent requests for the same role share a single ``GetRoleCredentials``
+        call.
+
+        Raises:
+            BrokerError: When the credentials cannot be obtained
+        """
+        key = (account_id, role_name)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            cached = self._credentials.get(key)
+            if cached and not self._expiring(cached):
+                return cached
+            credentials = self._fetch(account_id, role_name)
+            self._credentials[key] = credentials
+            return credentials
+
+    def prefetch(self, roles: Iterable[Tuple[str, str]]) -> int:
+        """Fetch credentials for several roles concurrently.
+
+        Returns:
+            int: Number of roles for which credentials are available
+        """
+        def fetch(role: Tuple[str, str]) -> bool:
+            try:
+                self.get(*role)
+                return True
+            except BrokerError as exc:
+                print(f"Unable to prefetch {role[1]}@{role[0]}: {exc}", file=sys.stderr)
+                return False
+
+        with ThreadPoolExecutor(max_workers=self.generator.max_workers) as pool:
+            return sum(pool.map(fetch, list(roles)))
+
+    def cached_roles(self) -> List[Tuple[str, str]]:
+        """Return every account/role combination in the OU cache."""
+        cache_data = self.generator._load_cache_data() or {}
+        return [(entry['id'], role) for entry in cache_data.get('accounts', [])
+                for role in entry.get('roles') or ()]
+
+    def _expiring(self, credentials: Dict) -> bool:
+        expiration = datetime.datetime.fromisoformat(credentials['Expiration'])
+        return expiration - datetime.datetime.now(datetime.timezone.utc) < REFRESH_MARGIN
+
+    def _fetch(self, account_id: str, role_name: str) -> Dict:
+        """Call ``GetRoleCredentials``, re-authenticating once when the token was rejected."""
+        for attempt in range(2):
+            token = self._token(renew=attempt > 0)
+            try:
+                response = self.generator.sso.get_role_credentials(
+                    accountId=account_id, roleName=role_name, accessToken=token)
+                break
+            except Exception as exc:
+                code = getattr(exc, 'response', {}).get('Error', {}).get('Code')
+                if code != 'UnauthorizedException' or attempt:
+                    raise BrokerError(f"{code or type(exc).__name__}: {exc}") from exc
+        role_credentials = response['roleCredentials']
+        expiration = datetime.datetime.fromtimestamp(role_credentials['expiration'] / 1000,
+                                                     datetime.timezone.utc)
+        return {
+            'Version': 1,
+            'AccessKeyId': role_credentials['accessKeyId'],
+            'SecretAccessKey': role_credentials['secretAccessKey'],
+            'SessionToken': role_credentials['sessionToken'],
+            'Expiration': expiration.isoformat(),
+        }
+
+    def _token(self, renew: bool = False) -> str:
+        """Return the in-memory SSO access token, loading or refreshing it when needed."""
+        with self._auth_lock:
+            if renew or not self.generator.access_token:
+                if not self.generator._ensure_sso_auth():
+                    raise BrokerError("no valid SSO session; run aws sso login")
+            return self.generator.access_token
+
+    def handle(self, request: Dict) -> Dict:
+        """Answer a single protocol request."""
+        try:
+            if 'prefetch' in request:
+                roles = request['prefetch']
+                if roles == 'all':
+                    roles = self.cached_roles()
+                return {'prefetched': self.prefetch(tuple(role) for role in roles)}
+            return {'credentials': self.get(request['account_id'], request['role_name'])}
+        except (BrokerError, KeyError, TypeError, ValueError) as exc:
+            return {'error': str(exc)}
+
+    def serve(self, socket_path: str) -> None:
+        """Serve credentials on a unix socket until interrupted.
+
+        Raises:
+            BrokerError: When another broker is already listening on the socket
+        """
+        if os.path.exists(socket_path):
+            if _broker_running(socket_path):
+                raise BrokerError(f"a credential broker is already running on {socket_path}")
+            os.remove(socket_path)  # left behind by a broker that did not shut down cleanly
+        os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+
+        broker = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline()
+                if not line:
+                    return  # a probe such as _broker_running; nobody reads a response
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {'error': 'invalid request'}
+                else:
+                    response = broker.handle(request)
+                self.wfile.write(json.dumps(response).encode('utf-8') + b"\n")
+
+        # Only the current user may connect to the socket
+        old_umask = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(socket_path, Handler)
+        finally:
+            os.umask(old_umask)
+        server.daemon_threads = True
+        try:
+            print(f"Serving credentials on {socket_path} (press Ctrl-C to stop)")
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nCredential broker stopped")
+        finally:
+            server.server_close()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+def request_credentials(socket_path: str, account_id: str, role_name: str) -> Dict:
+    """Ask a running broker for the credentials of a role.
+
+    Raises:
+        BrokerError: When the broker is not reachable or returned an error
+    """
+    response = _call(socket_path, {'account_id': account_id, 'role_name': role_name})
+    if 'error' in response:
+        raise BrokerError(response['error'])
+    return response['credentials']
+
+
+def request_prefetch(socket_path: str, roles=None) -> int:
+    """Ask a running broker to fetch credentials for several roles (default: all).
+
+    Waits without a timeout: prefetching a large organization takes a while.
+    """
+    response = _call(socket_path, {'prefetch': roles if roles is not None else 'all'}, timeout=None)
+    if 'error' in response:
+        raise BrokerError(response['error'])
+    return response['prefetched']
+
+
+def _call(socket_path: str, request: Dict, timeout=CLIENT_TIMEOUT) -> Dict:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall(json.dumps(request).encode('utf-8') + b"\n")
+            with sock.makefile('rb') as f:
+                line = f.readline()
+    except OSError as exc:
+        raise BrokerError(f"credential broker not reachable on {socket_path}: {exc}") from exc
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        raise BrokerError("invalid response from credential broker") from exc
+
+
+def _broker_running(socket_path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(1)
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
@@ -1,10 +1,28 @@
 import sys
 import os
+import json
+import contextlib
+import datetime
 import configparser
-from typing import Optional
+from typing import Optional, Tuple
 import click
 from .version import __version__
-from .core import SSOConfigGenerator
+from .broker import BrokerError, CredentialBroker, request_credentials, request_prefetch
+from .durations import parse_duration
+from .envindex import HOOKS, exports, resolve
+
+# Change journal categories, in the order `changes` lists them
+_CHANGE_KINDS = ('added', 'removed', 'renamed', 'moved', 'roles_granted', 'roles_revoked')
+
+
+def _generator(**kwargs):
+    """Create an SSOConfigGenerator.
+
+    The core module (and with it boto3) is imported here rather than at module
+    level, so commands that do not talk to AWS, such as ``env``, start fast.
+    """
+    from .core import SSOConfigGenerator
+    return SSOConfigGenerator(**kwargs)
 
 
 def _migrate_legacy_config(cwd: str) -> None:
@@ -69,27 +87,51 @@ def _read_ini_defaults() -> dict:
 
     bool_keys = {
         'create_directories', 'use_ou_structure', 'create_repos_md',
-        'skip_sso_name', 'rebuild_cache', 'validate',
+        'skip_sso_name', 'rebuild_cache', 'validate', 'credential_process',
+        'serve_prefetch',
     }
+    list_keys = {'outputs', 'enrich'}
     defaults = {}
     for key, value in config.items(section):
         param = key.replace('-', '_')
         if param in bool_keys:
             defaults[param] = value.lower() in ('true', 'yes', '1')
+        elif param in list_keys:
+            defaults[param] = [v.strip() for v in value.replace('\n', ',').split(',') if v.strip()]
         else:
             defaults[param] = value
     return defaults
 
 
-class _IniConfigCommand(click.Command):
-    """Click Command subclass that injects .sso-config-generator.ini values as defaults."""
+class _Duration(click.ParamType):
+    """Click parameter type for durations such as 90s, 15m, 12h or 7d."""
+
+    name = 'duration'
+
+    def convert(self, value, param, ctx):
+        try:
+            return parse_duration(value)
+        except ValueError as exc:
+            self.fail(str(exc), param, ctx)
+
+
+class _IniConfigGroup(click.Group):
+    """Click Group subclass that injects .sso-config-generator.ini values as defaults.
+
+    The same flat set of ini values is offered to the group and to every
+    subcommand, so subcommand options can be configured in the ini file too.
+    """
 
     def make_context(self, info_name, args, parent=None, **extra):
-        extra['default_map'] = _read_ini_defaults()
+        defaults = _read_ini_defaults()
+        default_map = dict(defaults)
+        for name in self.commands:
+            default_map[name] = dict(defaults)
+        extra['default_map'] = default_map
         return super().make_context(info_name, args, parent=parent, **extra)
 
 
-@click.command(cls=_IniConfigCommand)
+@click.group(cls=_IniConfigGroup, invoke_without_command=True)
 @click.version_option(version=__version__)
 @click.option('--create-directories', is_flag=True, default=False,
               help='Create a local directory tree with one directory per account.')
@@ -113,8 +155,35 @@ class _IniConfigCommand(click.Command):
                    '(default: current directory). '
                    'When the current directory is named "environment" '
                    'the SSO name directory is skipped automatically.')
+@click.option('--ou-tree-ttl', type=_Duration(), default='7d', show_default=True,
+              help='Maximum age of the cached OU tree.')
+@click.option('--placement-ttl', type=_Duration(), default='7d', show_default=True,
+              help='Maximum age of the cached account-to-OU placement.')
+@click.option('--account-list-ttl', type=_Duration(), default='7d', show_default=True,
+              help='Maximum age of the cached account list.')
+@click.option('--roles-ttl', type=_Duration(), default='7d', show_default=True,
+              help='Maximum age of the cached roles (permission-set assignments) of each account.')
+@click.option('--negative-cache-ttl', type=_Duration(), default='1d', show_default=True,
+              help='How long accounts without accessible roles (or with access denied) '
+                   'stay cached before they are checked again.')
+@click.option('--error-cache-ttl', type=_Duration(), default='15m', show_default=True,
+              help='How long throttled or failed role lookups stay cached before they '
+                   'are retried.')
+@click.option('--tags-ttl', type=_Duration(), default='7d', show_default=True,
+              help='Maximum age of the cached Organizations tags of each account. Tags are '
+                   'only fetched when --region-tag, --alias-tag or {tags[...]} in a name '
+                   'template uses them.')
+@click.option('--refresh-account', 'refresh_accounts', multiple=True, metavar='ID|NAME',
+              help='Re-discover only this account (ID or name) and patch it into the cache. '
+                   'Newly vended accounts are picked up as well. Can be repeated.')
+@click.option('--refresh-ou', 'refresh_ous', multiple=True, metavar='PATH',
+              help='Re-discover only the accounts in this OU subtree (e.g. /Workloads/Prod) '
+                   'and patch them into the cache. Can be repeated.')
 @click.option('--validate', is_flag=True,
               help='Validate the current AWS SSO configuration instead of generating it.')
+@click.option('--validation-ttl', type=_Duration(), default='1d', show_default=True,
+              help='How long a successful profile validation is trusted. --validate only '
+                   're-checks profiles whose result is older, that failed or that changed.')
 @click.option('--region', '-r', default='eu-west-1', show_default=True,
               help='AWS region.')
 @click.option('--sso-session-name', default=None,
@@ -130,10 +199,74 @@ class _IniConfigCommand(click.Command):
                    'organizations:ListOrganizationalUnitsForParent, '
                    'organizations:DescribeOrganizationalUnit, '
                    'organizations:ListParents.')
-def cli(create_directories: bool, use_ou_structure: bool, developer_role_name: Optional[str],
-        sso_name: Optional[str], create_repos_md: bool, skip_sso_name: bool,
-        unified_root: Optional[str], rebuild_cache: bool, validate: bool,
-        region: str, sso_session_name: Optional[str], profile: str):
+@click.option('--role-discovery', type=click.Choice(['per-account', 'admin']),
+              default='per-account', show_default=True,
+              help='How roles are discovered. "per-account" calls sso:ListAccountRoles for '
+                   'every account; "admin" uses the Identity Center admin APIs to build the '
+                   'map in a number of calls proportional to the permission sets, falling '
+                   'back to per-account discovery when those APIs are not accessible.')
+@click.option('--region-tag', default=None, metavar='KEY',
+              help='Account tag whose value is used as the region of the account\'s profiles '
+                   '(default: --region). Requires organizations:ListTagsForResource.')
+@click.option('--alias-tag', default=None, metavar='KEY',
+              help='Account tag whose value replaces the account name in profile and '
+                   'directory names. Requires organizations:ListTagsForResource.')
+@click.option('--profile-name-template', default='{role}@{account}', show_default=True,
+              help='Profile name format. Fields: {role}, {account} (alias tag or name), '
+                   '{account_name}, {account_id}, {region}, {ou} and {tags[KEY]}.')
+@click.option('--directory-name-template', default='{account}', show_default=True,
+              help='Account directory name format, with the same fields as '
+                   '--profile-name-template except {role}.')
+@click.option('--tags-rate-limit', type=click.FloatRange(min=0, min_open=True), default=5.0,
+              show_default=True,
+              help='Maximum number of Organizations tag requests per second.')
+@click.option('--max-workers', type=click.IntRange(min=1), default=8, show_default=True,
+              help='Number of accounts whose OU placement and roles are looked up '
+                   'concurrently while (re)building the cache.')
+@click.option('--credential-process', is_flag=True, default=False,
+              help='Generate profiles that obtain their credentials from the local credential '
+                   'broker (see: sso-config-generator serve-credentials --help) via '
+                   'credential_process instead of resolving SSO credentials themselves.')
+@click.option('--broker-socket', default=None, metavar='PATH',
+              help='Unix socket of the credential broker '
+                   '(default: ~/.aws/sso/sso-config-generator-<sso-session-name>.sock).')
+@click.option('--enrich', multiple=True, metavar='TASK[=TTL]',
+              help='Run this enrichment task in every account directory with the account\'s '
+                   'role credentials: repos (CodeCommit repositories into repos.md) or alias '
+                   '(IAM account alias into .account-alias). Results are cached for TTL '
+                   '(default per task). Requires --create-directories. Can be repeated.')
+@click.option('--enrichment-role', default=None, metavar='NAME',
+              help='Role used by enrichment tasks inside the accounts '
+                   '(default: --developer-role-name, else the first role of each account).')
+@click.option('--deadline', type=_Duration(), default=None, metavar='DURATION',
+              help='Bound the time spent waiting for AWS (e.g. 90s). Work not done by then '
+                   'is served from the cache (expired or not) and postponed to the next run, '
+                   'which continues where this one stopped. What was postponed is reported.')
+@click.option('--shared-cache-dir', default=None, metavar='DIR',
+              help='Host-wide directory for organization-level data (OU tree and account '
+                   'placement) shared by all users of the host, so it is discovered once per '
+                   'host. Account lists and roles stay in each user\'s own cache. The '
+                   'directory should be group-writable for the users sharing it.')
+@click.option('--output', 'outputs', multiple=True, metavar='FORMAT[=PATH]',
+              help='Also render the accounts in this format: json, ndjson, terraform or '
+                   'granted. Relative paths are placed next to the AWS config file. '
+                   'Files are only rewritten when their content changed. Can be repeated.')
+@click.pass_context
+def cli(ctx: click.Context, create_directories: bool, use_ou_structure: bool,
+        developer_role_name: Optional[str], sso_name: Optional[str], create_repos_md: bool,
+        skip_sso_name: bool, unified_root: Optional[str], rebuild_cache: bool,
+        ou_tree_ttl: datetime.timedelta, placement_ttl: datetime.timedelta,
+        account_list_ttl: datetime.timedelta, roles_ttl: datetime.timedelta,
+        negative_cache_ttl: datetime.timedelta, error_cache_ttl: datetime.timedelta,
+        tags_ttl: datetime.timedelta, refresh_accounts: Tuple[str, ...],
+        refresh_ous: Tuple[str, ...], validate: bool, validation_ttl: datetime.timedelta,
+        region: str, sso_session_name: Optional[str], profile: str, role_discovery: str,
+        region_tag: Optional[str], alias_tag: Optional[str], profile_name_template: str,
+        directory_name_template: str, tags_rate_limit: float, max_workers: int,
+        credential_process: bool, broker_socket: Optional[str],
+        enrich: Tuple[str, ...], enrichment_role: Optional[str],
+        deadline: Optional[datetime.timedelta], shared_cache_dir: Optional[str],
+        outputs: Tuple[str, ...]):
     """Generate AWS CLI profiles and (optionally) a local directory tree from your SSO organisation.
 
     By default the tool only rewrites the SSO-managed block in ~/.aws/config, creating
@@ -191,46 +324,108 @@ def cli(create_directories: bool, use_ou_structure: bool, developer_role_name: O
       # Directory tree + .envrc files for the ReadOnlyAccess role
       sso-config-generator --create-directories --developer-role-name ReadOnlyAccess
 
+      # Log in within a predictable time, even when AWS is slow or throttling
+      sso-config-generator --deadline 60s
+
       # Force a cache refresh
       sso-config-generator --rebuild-cache
 
+      # Pick up a newly vended account without a full rebuild
+      sso-config-generator --refresh-account 123456789012
+
       # Use a non-default authentication profile
       sso-config-generator --profile my-admin-profile
 
       # Validate existing configuration
       sso-config-generator --validate
+
+      # Keep ~/.aws/config fresh on a shared host (see: sso-config-generator watch --help)
+      sso-config-generator --create-directories watch --interval 900
+
+      # Name profiles and directories after an account tag, with per-account regions
+      sso-config-generator --alias-tag ShortName --region-tag HomeRegion
+
+      # List the CodeCommit repositories of every account into its repos.md
+      sso-config-generator --create-directories --enrich repos --enrich alias
+
+      # Also write an account inventory and Terraform provider aliases
+      sso-config-generator --output json --output terraform=providers.tf
+
+      # Serve credentials for all profiles from one local process
+      sso-config-generator --credential-process
+      sso-config-generator serve-credentials --prefetch
+
+      # Bootstrap a new machine from a published cache (see: sso-config-generator cache --help)
+      sso-config-generator --create-directories cache import org-cache.json.gz
     """
+    # Options given before a subcommand configure the generator it uses
+    ctx.obj = dict(
+        create_directories=create_directories,
+        use_ou_structure=use_ou_structure,
+        developer_role_name=developer_role_name,
+        sso_name=sso_name,
+        create_repos_md=create_repos_md,
+        skip_sso_name=skip_sso_name,
+        unified_root=unified_root,
+        region=region,
+        sso_session_name=sso_session_name,
+        profile=profile,
+        max_workers=max_workers,
+        negative_cache_ttl=negative_cache_ttl,
+        error_cache_ttl=error_cache_ttl,
+        ou_tree_ttl=ou_tree_ttl,
+        placement_ttl=placement_ttl,
+        account_list_ttl=account_list_ttl,
+        roles_ttl=roles_ttl,
+        role_discovery=role_discovery,
+        tags_ttl=tags_ttl,
+        region_tag=region_tag,
+        alias_tag=alias_tag,
+        profile_name_template=profile_name_template,
+        directory_name_template=directory_name_template,
+        tags_rate_limit=tags_rate_limit,
+        credential_process=credential_process,
+        broker_socket=broker_socket,
+        enrich=enrich,
+        enrichment_role=enrichment_role,
+        deadline=deadline,
+        shared_cache_dir=shared_cache_dir,
+        outputs=outputs,
+    )
+    if ctx.invoked_subcommand is not None:
+        return
+
+    if rebuild_cache and (refresh_accounts or refresh_ous):
+        raise click.UsageError('--rebuild-cache cannot be combined with --refresh-account/--refresh-ou.')
+
     try:
         if validate:
-            generator = SSOConfigGenerator(
+            generator = _generator(
                 region=region,
                 sso_session_name=sso_session_name,
                 profile=profile,
+                max_workers=max_workers,
+                validation_ttl=validation_ttl,
             )
             if not generator.validate():
                 sys.exit(1)
         else:
-            generator = SSOConfigGenerator(
-                create_directories=create_directories,
-                use_ou_structure=use_ou_structure,
-                developer_role_name=developer_role_name,
-                sso_name=sso_name,
-                create_repos_md=create_repos_md,
-                skip_sso_name=skip_sso_name,
-                unified_root=unified_root,
-                region=region,
-                sso_session_name=sso_session_name,
-                profile=profile,
-            )
+            generator = _generator(**ctx.obj)
 
             if rebuild_cache:
-                removed_count = generator.clear_ou_cache_files()
+                # The current cache is kept until the rebuild succeeds so that the
+                # change journal can record what changed
+                removed_count = generator.clear_ou_cache_files(keep=[generator.ou_cache_path])
                 if removed_count:
-                    print(f"Removed {removed_count} OU cache file(s)")
-                else:
-                    print("No OU cache files found to remove")
-
-            if not generator.generate():
+                    print(f"Removed {removed_count} stale OU cache file(s)")
+                # A full rebuild does not resume an interrupted discovery
+                if os.path.exists(generator.checkpoint_path):
+                    os.remove(generator.checkpoint_path)
+
+            if refresh_accounts or refresh_ous:
+                if not generator.refresh(refresh_accounts, refresh_ous):
+                    sys.exit(1)
+            elif not generator.generate(rebuild_cache=rebuild_cache):
                 sys.exit(1)
 
     except Exception as e:
@@ -238,5 +433,285 @@ def cli(create_directories: bool, use_ou_structure: bool, developer_role_name: O
         sys.exit(1)
 
 
+@cli.command()
+@click.option('--interval', 'watch_interval', type=click.IntRange(min=1), default=900,
+              show_default=True,
+              help='Seconds between change checks.')
+@click.option('--jitter', 'watch_jitter', type=click.IntRange(min=0), default=60,
+              show_default=True,
+              help='Maximum number of random seconds added to each interval, so that '
+                   'several hosts do not poll AWS in lock-step.')
+@click.option('--max-backoff', 'watch_max_backoff', type=click.IntRange(min=1), default=3600,
+              show_default=True,
+              help='Upper bound in seconds for the exponential backoff applied when AWS '
+                   'throttles or a check fails.')
+@click.pass_obj
+def watch(obj: dict, watch_interval: int, watch_jitter: int, watch_max_backoff: int):
+    """Keep the cache and ~/.aws/config continuously fresh.
+
+    Runs until interrupted.  After an initial run, every interval the account list
+    (and, with --use-ou-structure, the OU tree) is fingerprinted; role discovery and
+    regeneration of the managed block only happen when the fingerprint changed or
+    the cache expired.  The SSO token and AWS clients are reused between checks.
+
+    Options of the main command go before "watch", e.g.:
+
+    \b
+      sso-config-generator --create-directories --use-ou-structure watch --interval 600
+
+    In .sso-config-generator.ini use watch_interval, watch_jitter and watch_max_backoff.
+    """
+    try:
+        generator = _generator(**obj)
+        if not generator.watch(watch_interval, watch_jitter, watch_max_backoff):
+            sys.exit(1)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--since', metavar='TIMESTAMP',
+              help='Only show changes recorded at or after this ISO 8601 timestamp '
+                   '(e.g. 2026-01-31 or 2026-01-31T12:00:00).')
+@click.option('--limit', type=click.IntRange(min=1),
+              help='Only show the most recent N change records.')
+@click.option('--json', 'as_json', is_flag=True,
+              help='Print the change records as a JSON array.')
+@click.option('--ids', 'ids_only', is_flag=True,
+              help='Print only the IDs of the affected accounts, one per line.')
+@click.pass_obj
+def changes(obj: dict, since: Optional[str], limit: Optional[int], as_json: bool, ids_only: bool):
+    """Show organization changes recorded between cache generations.
+
+    Every cache rebuild or targeted refresh appends the accounts that were added,
+    removed, renamed or moved to another OU, and the roles that were granted or
+    revoked, to a journal next to the OU cache.  Use --json or --ids to let
+    automation act on the changed accounts only.
+    """
+    # Keep stdout clean for --json / --ids consumers
+    with contextlib.redirect_stdout(sys.stderr):
+        generator = _generator(region=obj['region'],
+                               sso_session_name=obj['sso_session_name'],
+                               profile=obj['profile'])
+    records = generator.read_changes(since=since, limit=limit)
+
+    if as_json:
+        print(json.dumps(records, indent=2))
+    elif ids_only:
+        ids = []
+        for record in records:
+            for kind in _CHANGE_KINDS:
+                ids.extend(item['id'] for item in record.get(kind, []))
+        print("\n".join(dict.fromkeys(ids)))
+    elif not records:
+        print(f"No changes recorded in {generator.journal_path}")
+    else:
+        for record in records:
+            print(f"{record['timestamp']} ({record['source']})")
+            for kind in _CHANGE_KINDS:
+                for item in record.get(kind, []):
+                    print(f"  {kind.replace('_', ' '):14} {_describe_change(kind, item)}")
+
+
+@cli.group()
+def cache():
+    """Export or import the OU cache as a portable bundle.
+
+    A bundle lets a new laptop or CI runner start from an existing cache instead
+    of discovering the whole organization:
+
+    \b
+      sso-config-generator cache export org-cache.json.gz
+      sso-config-generator --create-directories cache import org-cache.json.gz
+    """
+
+
+@cache.command('export')
+@click.argument('bundle', type=click.Path(dir_okay=False, writable=True))
+@click.pass_obj
+def cache_export(obj: dict, bundle: str):
+    """Write the OU cache to a compressed, checksummed BUNDLE file."""
+    try:
+        generator = _generator(**obj)
+        if not generator.export_cache(bundle):
+            sys.exit(1)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+@cache.command('import')
+@click.argument('bundle', type=click.Path(exists=True, dir_okay=False))
+@click.option('--force', is_flag=True,
+              help='Import a bundle that was exported for a different SSO start URL.')
+@click.pass_obj
+def cache_import(obj: dict, bundle: str, force: bool):
+    """Install the OU cache from BUNDLE and generate the configuration from it.
+
+    No discovery is performed; the managed block in ~/.aws/config (and, with
+    --create-directories, the directory tree) is written straight from the bundle.
+    Segments that have expired are updated by the next regular run.
+    """
+    try:
+        generator = _generator(**obj)
+        if not generator.import_cache(bundle, force=force):
+            sys.exit(1)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+@cli.command()
+@click.pass_obj
+def render(obj: dict):
+    """Render the --output artifacts from the cache without contacting AWS.
+
+    \b
+      sso-config-generator --output json --output terraform=~/infra/providers.tf render
+    """
+    try:
+        generator = _generator(**obj)
+        if not generator.render():
+            sys.exit(1)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+@cli.command('serve-credentials')
+@click.option('--prefetch', 'serve_prefetch', is_flag=True,
+              help='Fetch credentials for every cached account/role concurrently at startup; '
+                   'when a broker is already running, ask it to do so.')
+@click.pass_obj
+def serve_credentials(obj: dict, serve_prefetch: bool):
+    """Serve role credentials for the generated profiles on a local unix socket.
+
+    The broker keeps the SSO access token in memory and caches the credentials of
+    each role until shortly before they expire, so scripts that loop over many
+    profiles do not resolve SSO credentials in every process.  Generate the
+    profiles with --credential-process to let them use the broker:
+
+    \b
+      sso-config-generator --credential-process
+      sso-config-generator serve-credentials --prefetch
+    """
+    try:
+        generator = _generator(**obj)
+        if serve_prefetch and os.path.exists(generator.broker_socket_path):
+            try:
+                count = request_prefetch(generator.broker_socket_path)
+            except BrokerError:
+                pass  # left behind by a broker that is gone; serve() replaces it
+            else:
+                print(f"Credential broker already running on {generator.broker_socket_path}; "
+                      f"prefetched credentials for {count} role(s)")
+                return
+        if not generator._ensure_sso_auth():
+            sys.exit(1)
+        broker = CredentialBroker(generator)
+        if serve_prefetch:
+            roles = broker.cached_roles()
+            print(f"Prefetched credentials for {broker.prefetch(roles)} of {len(roles)} role(s)")
+        broker.serve(generator.broker_socket_path)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+@cli.command('credential-process')
+@click.option('--account-id', required=True, help='AWS account ID.')
+@click.option('--role-name', required=True, help='Name of the SSO role (permission set).')
+@click.option('--socket', 'socket_path', metavar='PATH',
+              help='Unix socket of the credential broker (default: as for --broker-socket).')
+@click.pass_obj
+def credential_process_cmd(obj: dict, account_id: str, role_name: str, socket_path: Optional[str]):
+    """Print role credentials in the AWS CLI credential_process format.
+
+    Credentials are requested from the credential broker; when no broker is
+    running they are fetched directly with the cached SSO token.
+    """
+    def from_broker(path: str) -> Optional[dict]:
+        if not os.path.exists(path):
+            return None
+        try:
+            return request_credentials(path, account_id, role_name)
+        except BrokerError as e:
+            print(f"Credential broker: {e}; fetching credentials directly", file=sys.stderr)
+            return None
+
+    try:
+        socket_path = os.path.expanduser(socket_path) if socket_path else None
+        credentials = from_broker(socket_path) if socket_path else None
+        if credentials is None:
+            # credential_process output must be the only thing on stdout
+            with contextlib.redirect_stdout(sys.stderr):
+                generator = _generator(**dict(obj, broker_socket=socket_path or obj['broker_socket']))
+                if not socket_path:
+                    credentials = from_broker(generator.broker_socket_path)
+                if credentials is None:
+                    credentials = CredentialBroker(generator).get(account_id, role_name)
+        print(json.dumps(credentials))
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+
+@cli.command('env')
+@click.option('--role', default=None, metavar='NAME',
+              help='Role to select (default: --developer-role-name when the account has it, '
+                   'otherwise the first role of the account).')
+@click.option('--shell', type=click.Choice(['sh', 'bash', 'zsh', 'fish']), default='sh',
+              show_default=True, help='Syntax of the printed commands.')
+@click.option('--hook', type=click.Choice(sorted(HOOKS)), default=None,
+              help='Print a hook for this shell that runs "env" on every directory change.')
+@click.option('--json', 'as_json', is_flag=True,
+              help='Print the account of the current directory as JSON instead.')
+@click.option('--index', 'index_path', default=None, metavar='PATH',
+              help='Directory index to use (default: sso-env-index.json next to the AWS config file).')
+def env(role: Optional[str], shell: str, hook: Optional[str], as_json: bool,
+        index_path: Optional[str]):
+    """Print shell exports selecting the profile of the current account directory.
+
+    The account tree written by --create-directories is recorded in a directory
+    index; this command looks up the current directory (or any directory below
+    an account directory) in it and prints AWS_PROFILE for the account.  It does
+    not contact AWS or import the AWS SDK, so it is fast enough to run on every
+    directory change.  Outside the account tree a profile it set earlier is unset.
+
+    One shell hook replaces the .envrc files in every account directory:
+
+    \b
+      eval "$(sso-config-generator env --hook bash)"    # in ~/.bashrc
+      eval "$(sso-config-generator env --hook zsh)"     # in ~/.zshrc
+      sso-config-generator env --hook fish | source     # in config.fish
+    """
+    if hook:
+        click.echo(HOOKS[hook], nl=False)
+        return
+    entry = resolve(os.getcwd(), index_path)
+    if as_json:
+        if entry is None:
+            sys.exit(1)
+        click.echo(json.dumps(entry, indent=2))
+        return
+    try:
+        click.echo(exports(entry, role, shell), nl=False)
+    except KeyError as e:
+        print(f"Error: {e.args[0]}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _describe_change(kind: str, item: dict) -> str:
+    """Return a one-line, human-readable description of a journal item."""
+    if kind == 'renamed':
+        return f"{item['id']} {item['from']} -> {item['to']}"
+    if kind == 'moved':
+        return f"{item['id']} {item['name']}: {item['from']} -> {item['to']}"
+    if kind in ('roles_granted', 'roles_revoked'):
+        return f"{item['id']} {item['name']}: {', '.join(item['roles'])}"
+    return f"{item['id']} {item['name']}"
+
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,214 @@
+"""Shell completion index for the generated profiles, accounts and OU paths.
+
+Completing ``aws --profile`` or an ``AWS_PROFILE=`` value normally means
+scanning the whole AWS config file on every key press.  Instead, each time the managed block changes, sorted
+index files are written to a directory next to the config file:
+
+* ``profiles.idx`` — generated profile names
+* ``accounts.idx`` — account names and IDs (for ``--refresh-account``)
+* ``ous.idx``      — OU paths (for ``--refresh-ou``)
+
+together with bash, zsh and fish scripts that complete ``aws --profile``,
+``AWS_PROFILE`` values (``export AWS_PROFILE=…`` in bash; also
+``AWS_PROFILE=… command`` in zsh; ``set -x AWS_PROFILE …`` and
+``env AWS_PROFILE=…`` in fish) and the tool's own options.  They look up
+completions in the index files
+with ``look(1)``, a binary search over the sorted file, falling back to a
+linear prefix match with ``awk`` when ``look`` is not installed.
+
+The index is only rewritten when the SHA-256 of the managed block (and of the
+OU paths, which the block does not contain) differs from the one recorded in
+``block.sha256``.
+"""
+
+import hashlib
+import os
+from typing import Dict, Iterable
+
+_LOOKUP_SH = '''_sso_config_generator_lookup() {
+    # $1: index name, $2: prefix
+    local index="__INDEX_DIR__/$1.idx"
+    [ -r "$index" ] || return 0
+    if command -v look >/dev/null 2>&1; then
+        LC_ALL=C look -- "$2" "$index" 2>/dev/null
+    else
+        LC_ALL=C awk -v p="$2" 'index($0, p) == 1' "$index"
+    fi
+}
+'''
+
+SCRIPTS: Dict[str, str] = {
+    'bash': '''# Generated by sso-config-generator; add to ~/.bashrc:
+#   source __INDEX_DIR__/completion.bash
+''' + _LOOKUP_SH + '''
+_sso_config_generator_reply_profiles() {
+    # $1: profile typed so far.  Readline only replaces the text after the
+    # last word break (profile names contain "@"), so strip what precedes it
+    local i=${#1}
+    while [ "$i" -gt 0 ]; do
+        case $COMP_WORDBREAKS in *"${1:i-1:1}"*) break ;; esac
+        i=$((i - 1))
+    done
+    local -a matches
+    matches=($(_sso_config_generator_lookup profiles "$1"))
+    COMPREPLY=("${matches[@]#"${1:0:i}"}")
+}
+
+_sso_config_generator_complete_aws() {
+    # Split the line on whitespace only; COMP_WORDS is also split at "@"
+    local line="${COMP_LINE:0:COMP_POINT}"
+    local cur="${line##*[[:space:]]}"
+    local before="${line%"$cur"}"
+    before="${before%"${before##*[![:space:]]}"}"
+    if [ "${before##*[[:space:]]}" = "--profile" ]; then
+        _sso_config_generator_reply_profiles "$cur"
+    elif command -v aws_completer >/dev/null 2>&1; then
+        COMPREPLY=($(COMP_LINE="$COMP_LINE" COMP_POINT="$COMP_POINT" aws_completer))
+    fi
+}
+
+_sso_config_generator_complete_self() {
+    local cur="${COMP_WORDS[COMP_CWORD]}" prev="${COMP_WORDS[COMP_CWORD-1]}"
+    case "$prev" in
+        --refresh-account) COMPREPLY=($(_sso_config_generator_lookup accounts "$cur")) ;;
+        --refresh-ou) COMPREPLY=($(_sso_config_generator_lookup ous "$cur")) ;;
+    esac
+}
+
+_sso_config_generator_complete_profile_value() {
+    # Completes the value of AWS_PROFILE=...; fails for any other word
+    local line="${COMP_LINE:0:COMP_POINT}"
+    local value="${line##*[[:space:]]}"
+    case $value in
+        AWS_PROFILE=*) _sso_config_generator_reply_profiles "${value#AWS_PROFILE=}" ;;
+        *) return 1 ;;
+    esac
+}
+
+_sso_config_generator_completer_of() {
+    # Prints the function of an existing "complete -F" spec
+    set -- $(complete -p "$@" 2>/dev/null)
+    while [ $# -gt 1 ]; do
+        [ "$1" = "-F" ] && { echo "$2"; return; }
+        shift
+    done
+}
+
+# The export completion that was set up before us, if any
+_sso_config_generator_export_completer=$(_sso_config_generator_completer_of export)
+case $_sso_config_generator_export_completer in _sso_config_generator_*) _sso_config_generator_export_completer= ;; esac
+
+_sso_config_generator_complete_export() {
+    _sso_config_generator_complete_profile_value && return
+    if [ -n "$_sso_config_generator_export_completer" ]; then
+        "$_sso_config_generator_export_completer" "$@"
+    else
+        COMPREPLY=($(compgen -v -- "${COMP_WORDS[COMP_CWORD]}"))
+    fi
+}
+
+complete -o default -F _sso_config_generator_complete_aws aws
+complete -o default -F _sso_config_generator_complete_self sso-config-generator
+# bash offers no hook for assignments in front of a command, only for export
+complete -o bashdefault -o default -F _sso_config_generator_complete_export export
+''',
+    'zsh': '''# Generated by sso-config-generator; add to ~/.zshrc (after compinit):
+#   source __INDEX_DIR__/completion.zsh
+''' + _LOOKUP_SH + '''
+typeset -g _sso_config_generator_aws_completer=${_comps[aws]}
+
+_sso_config_generator_complete_aws() {
+    if [[ ${words[CURRENT-1]} == --profile ]]; then
+        local -a matches
+        matches=(${(f)"$(_sso_config_generator_lookup profiles "$PREFIX")"})
+        compadd -a matches
+    elif [[ -n $_sso_config_generator_aws_completer ]]; then
+        ${=_sso_config_generator_aws_completer} "$@"
+    fi
+}
+
+_sso_config_generator_complete_self() {
+    local -a matches
+    case ${words[CURRENT-1]} in
+        --refresh-account) matches=(${(f)"$(_sso_config_generator_lookup accounts "$PREFIX")"}) ;;
+        --refresh-ou) matches=(${(f)"$(_sso_config_generator_lookup ous "$PREFIX")"}) ;;
+        *) _files; return ;;
+    esac
+    compadd -a matches
+}
+
+_sso_config_generator_complete_profile_value() {
+    local -a matches
+    matches=(${(f)"$(_sso_config_generator_lookup profiles "$PREFIX")"})
+    compadd -a matches
+}
+
+compdef _sso_config_generator_complete_aws aws
+compdef _sso_config_generator_complete_self sso-config-generator
+# Values of AWS_PROFILE assignments, with or without export
+compdef _sso_config_generator_complete_profile_value -value-,AWS_PROFILE,-default-
+''',
+    'fish': '''# Generated by sso-config-generator; add to ~/.config/fish/config.fish:
+#   source __INDEX_DIR__/completion.fish
+function __sso_config_generator_lookup
+    set -l index "__INDEX_DIR__/$argv[1].idx"
+    test -r $index; or return 0
+    if command -q look
+        env LC_ALL=C look -- "$argv[2]" $index 2>/dev/null
+    else
+        env LC_ALL=C awk -v p="$argv[2]" 'index($0, p) == 1' $index
+    end
+end
+
+complete -c aws -l profile -x -a '(__sso_config_generator_lookup profiles (commandline -ct))'
+complete -c sso-config-generator -l refresh-account -x -a '(__sso_config_generator_lookup accounts (commandline -ct))'
+complete -c sso-config-generator -l refresh-ou -x -a '(__sso_config_generator_lookup ous (commandline -ct))'
+# set -x AWS_PROFILE ... and env AWS_PROFILE=...
+complete -c set -n 'test (commandline -opc)[-1] = AWS_PROFILE' -x -a '(__sso_config_generator_lookup profiles (commandline -ct))'
+complete -c env -n 'string match -q "AWS_PROFILE=*" -- (commandline -ct)' -x -a '(__sso_config_generator_lookup profiles (string replace AWS_PROFILE= "" -- (commandline -ct)) | string replace -r "^" AWS_PROFILE=)'
+''',
+}
+
+
+def update_completion_index(directory: str, block: str, profiles: Iterable[str],
+                            accounts: Iterable[str], ou_paths: Iterable[str]) -> bool:
+    """Write the completion index and scripts when the managed block changed.
+
+    Args:
+        directory: Directory for the index files and scripts
+        block: Content of the managed block the index is derived from
+        profiles: Generated profile names
+        accounts: Account names and IDs
+        ou_paths: OU paths
+
+    Returns:
+        bool: True when the index was (re)written, False when it was up to date
+    """
+    ou_paths = sorted(set(ou_paths))
+    digest = hashlib.sha256("\n".join([block] + ou_paths).encode('utf-8')).hexdigest()
+    stamp_path = os.path.join(directory, 'block.sha256')
+    try:
+        with open(stamp_path) as f:
+            if f.read().strip() == digest and all(
+                    os.path.exists(os.path.join(directory, f"completion.{shell}")) for shell in SCRIPTS):
+                return False
+    except OSError:
+        pass
+
+    os.makedirs(directory, exist_ok=True)
+    for name, entries in (('profiles', profiles), ('accounts', accounts), ('ous', ou_paths)):
+        # look(1) needs byte order, which is what LC_ALL=C uses as well
+        lines = sorted(set(entries), key=lambda entry: entry.encode('utf-8'))
+        _write(os.path.join(directory, f"{name}.idx"), "".join(f"{line}\n" for line in lines))
+    for shell, script in SCRIPTS.items():
+        _write(os.path.join(directory, f"completion.{shell}"), script.replace('__INDEX_DIR__', directory))
+    # Written last, so an interrupted update is redone on the next run
+    _write(stamp_path, digest + "\n")
+    return True
+
+
+def _write(path: str, content: str) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
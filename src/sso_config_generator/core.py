@@ -3,11 +3,57 @@ import sys
 import json
 import boto3
 import datetime
+import gzip
+import hashlib
+import random
 import re
+import shlex
+import shutil
+import string
+import time
 import configparser
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import AbstractSet, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .completion import update_completion_index
+from .deadline import TIMED_OUT, DaemonThreadPool, call_with_timeout
+from .durations import parse_duration
+from .envindex import ENV_INDEX_FILENAME, update_env_index
+from .models import Account, Organization, diff_accounts
+from .plugins import TASKS, EnrichmentRunner, EnrichmentTask
+from .renderers import RENDERERS, RenderContext, Renderer
+from .shared_cache import SharedCacheError, SharedOrgCache
+from .version import __version__
+
+logger = logging.getLogger(__name__)
+
+# Returned by next() on the list_accounts pages once they are exhausted
+_END_OF_PAGES = object()
+
+# Error codes that indicate AWS is throttling us rather than denying access
+_THROTTLING_ERRORS = {
+    "ThrottlingException", "Throttling", "TooManyRequestsException", "RequestLimitExceeded",
+}
+
+# Reasons recorded in the cache for accounts that have no usable roles
+_NEGATIVE_STATUSES = {"no_roles", "access_denied", "throttled", "error"}
+
+# Identifies cache bundles and the version of the cache layout they contain;
+# bundles with a newer schema than this release understands are rejected
+CACHE_BUNDLE_FORMAT = "sso-config-generator-cache"
+CACHE_SCHEMA_VERSION = 1
+
+# Fields available in profile and directory name templates
+_NAME_TEMPLATE_FIELDS = ('role', 'account', 'account_name', 'account_id', 'region', 'ou', 'tags')
+
+# Suffixes of the files kept next to an OU cache that are not cache themselves
+_CACHE_SIDE_FILES = ('.journal', '.partial', '.validation', '.enrichment')
+
 
 class SSOConfigGenerator:
     """Main class for generating AWS SSO configuration and directory structures."""
@@ -21,9 +67,36 @@ class SSOConfigGenerator:
                  unified_root: Optional[str] = None,
                  region: str = "eu-west-1",
                  sso_session_name: Optional[str] = None,
-                 profile: str = "sso-browser"):
+                 profile: str = "sso-browser",
+                 max_workers: int = 8,
+                 negative_cache_ttl: datetime.timedelta = datetime.timedelta(days=1),
+                 error_cache_ttl: datetime.timedelta = datetime.timedelta(minutes=15),
+                 ou_tree_ttl: datetime.timedelta = datetime.timedelta(days=7),
+                 placement_ttl: datetime.timedelta = datetime.timedelta(days=7),
+                 account_list_ttl: datetime.timedelta = datetime.timedelta(days=7),
+                 roles_ttl: datetime.timedelta = datetime.timedelta(days=7),
+                 role_discovery: str = "per-account",
+                 credential_process: bool = False,
+                 broker_socket: Optional[str] = None,
+                 validation_ttl: datetime.timedelta = datetime.timedelta(days=1),
+                 outputs: Sequence[str] = (),
+                 shared_cache_dir: Optional[str] = None,
+                 tags_ttl: datetime.timedelta = datetime.timedelta(days=7),
+                 region_tag: Optional[str] = None,
+                 alias_tag: Optional[str] = None,
+                 profile_name_template: str = "{role}@{account}",
+                 directory_name_template: str = "{account}",
+                 tags_rate_limit: float = 5.0,
+                 enrich: Sequence[str] = (),
+                 enrichment_role: Optional[str] = None,
+                 deadline: Optional[datetime.timedelta] = None,
+                 quiet: bool = False,
+                 interactive: bool = True):
         """Initialize the SSO Config Generator.
 
+        Construction only reads configuration; it does not change the working
+        directory, prompt, print (when ``quiet``) or contact AWS.
+
         Args:
             create_directories: Whether to create directory structure (default: False)
             use_ou_structure: Whether to nest directories by OU hierarchy (default: False)
@@ -35,13 +108,68 @@ class SSOConfigGenerator:
             region: AWS region to use (default: eu-west-1)
             sso_session_name: Name for the SSO session section (default: auto-detected or "sso")
             profile: AWS profile used to authenticate (default: sso-browser)
+            max_workers: Number of accounts enriched concurrently during discovery (default: 8)
+            negative_cache_ttl: How long accounts without roles or with access denied stay
+                cached before they are checked again (default: 1 day)
+            error_cache_ttl: How long throttled or failed role lookups stay cached
+                before they are retried (default: 15 minutes)
+            ou_tree_ttl: Maximum age of the cached OU tree (default: 7 days)
+            placement_ttl: Maximum age of the cached account-to-OU placement (default: 7 days)
+            account_list_ttl: Maximum age of the cached account list (default: 7 days)
+            roles_ttl: Maximum age of the cached roles of each account (default: 7 days)
+            role_discovery: "per-account" (list_account_roles for every account) or
+                "admin" (bulk discovery via the Identity Center admin APIs, falling back
+                to per-account discovery when they are not accessible)
+            credential_process: Let generated profiles obtain credentials from the local
+                credential broker (``serve-credentials``) via ``credential_process``
+            broker_socket: Unix socket of the credential broker
+                (default: ~/.aws/sso/sso-config-generator-<sso_session_name>.sock)
+            validation_ttl: How long a successful profile validation is trusted before
+                ``validate()`` checks the profile again (default: 1 day)
+            outputs: Additional artifacts to render, as ``FORMAT`` or ``FORMAT=PATH``
+                (formats: see renderers.RENDERERS)
+            shared_cache_dir: Host-wide directory for organization-level data (OU
+                tree, account placement) shared by all users; see shared_cache
+            tags_ttl: Maximum age of the cached Organizations tags of each account
+                (default: 7 days); tags are only fetched when they are used
+            region_tag: Account tag whose value is the region of the account's
+                profiles (default: ``region`` for every profile)
+            alias_tag: Account tag whose value replaces the account name in profile
+                and directory names
+            profile_name_template: Profile name format; fields: ``{role}``,
+                ``{account}`` (alias or name), ``{account_name}``, ``{account_id}``,
+                ``{region}``, ``{ou}`` and ``{tags[KEY]}`` (default: "{role}@{account}")
+            directory_name_template: Account directory name format, with the same
+                fields except ``{role}`` (default: "{account}")
+            tags_rate_limit: Maximum number of Organizations tag requests per second
+            enrich: Enrichment tasks to run in every account directory, as ``TASK`` or
+                ``TASK=TTL`` (tasks: see plugins.TASKS; requires create_directories)
+            enrichment_role: Role used by enrichment tasks inside the accounts
+                (default: developer_role_name, else the first role of each account)
+            deadline: Bound on the time ``generate()`` waits for AWS; work not done
+                by then is served from the cache and postponed to the next run
+                (default: no bound)
+            quiet: Send progress and error messages to the ``sso_config_generator.core``
+                logger instead of printing them (default: False)
+            interactive: Prompt for the SSO start URL and region when the AWS config
+                has none; when False such a configuration is an error (default: True)
+
+        Raises:
+            ValueError: When an output format, enrichment task or name template is invalid
         """
+        self.quiet = quiet
+        self.interactive = interactive
         self.create_directories = create_directories
         self.use_ou_structure = use_ou_structure
         self.developer_role_name = developer_role_name
         self.sso_name = sso_name
         self.create_repos_md = create_repos_md
         self.region = region
+        self.max_workers = max(1, max_workers)
+        self.role_discovery = role_discovery
+        self.credential_process = credential_process
+        self._cli_command: Optional[List[str]] = None  # see _credential_process_command
+        self._admin_roles: Optional[Dict[str, List[str]]] = None
         self._explicit_sso_session_name = sso_session_name
 
         # Check for Cloud9/CloudX environment
@@ -49,16 +177,16 @@ class SSOConfigGenerator:
         current_dir = os.getcwd()
         environment_dir = os.path.join(home_dir, "environment")
         
-        # If we're in home directory and an 'environment' subdirectory exists
+        # If we're in home directory and an 'environment' subdirectory exists, work
+        # in it; the process working directory itself is left unchanged
         if current_dir == home_dir and os.path.isdir(environment_dir):
-            print("\n=== Cloud9/CloudX environment detected ===")
-            print(f"Changing directory to: {environment_dir}\n")
-            os.chdir(environment_dir)
-            # Update current directory after changing
+            self._print("\n=== Cloud9/CloudX environment detected ===")
+            self._print(f"Using directory: {environment_dir}\n")
             current_dir = environment_dir
         
-        # Set unified_root with proper default (current directory)
-        self.unified_root = unified_root or current_dir
+        # Set unified_root with proper default (current directory); relative
+        # roots are resolved against it
+        self.unified_root = os.path.join(current_dir, unified_root) if unified_root else current_dir
         
         # Handle skip_sso_name logic
         # If current directory is named 'environment', automatically skip SSO name
@@ -77,25 +205,178 @@ class SSOConfigGenerator:
         # (e.g. managed by aws-envs: ~/.aws/config -> ~/.aws/aws-envs/easytocloud/config),
         # the cache ends up in the environment-specific directory rather than ~/.aws/.
         self.config_dir = os.path.dirname(os.path.realpath(self.aws_config_path))
-        self.cache_max_age = datetime.timedelta(days=7)
-        self.ou_cache_path = os.path.join(self.config_dir, ".ou-cache")  # updated in _set_ou_cache_path
+        self.env_index_path = os.path.join(self.config_dir, ENV_INDEX_FILENAME)
+        self.cache_ttls = {
+            'ou_tree': ou_tree_ttl,
+            'placement': placement_ttl,
+            'account_list': account_list_ttl,
+            'roles': roles_ttl,
+        }
+        self.negative_cache_ttl = negative_cache_ttl
+        self.error_cache_ttl = error_cache_ttl
+        self.validation_ttl = validation_ttl
+        self.shared_cache_dir = shared_cache_dir
+        self.tags_ttl = tags_ttl
+        self.region_tag = region_tag
+        self.alias_tag = alias_tag
+        self.profile_name_template = self._check_name_template(profile_name_template, 'profile')
+        self.directory_name_template = self._check_name_template(directory_name_template, 'directory')
+        # Tags cost one Organizations call per account, so only fetch them when used
+        self.tag_enrichment = bool(region_tag or alias_tag) or any(
+            field and field.startswith('tags')
+            for template in (profile_name_template, directory_name_template)
+            for _, field, _, _ in string.Formatter().parse(template))
+        self._tags_rate_limiter = _RateLimiter(tags_rate_limit)
+        self._set_ou_cache_path(None)
+        self.outputs = [self._parse_output(spec) for spec in outputs]
+        self.enrichment_tasks = [self._parse_enrichment_task(spec) for spec in enrich]
+        self.enrichment_role = enrichment_role or developer_role_name
+        self.deadline = deadline
+        self._deadline_at: Optional[float] = None
+        self.degraded: List[str] = []  # what was postponed because of the deadline
         self.config = configparser.ConfigParser()
 
         # Resolve SSO session name: auto-detect from config if not explicitly provided
         self.sso_session_name = self._resolve_sso_session_name(self._explicit_sso_session_name)
         self.sso_session_section = f"sso-session {self.sso_session_name}"
+        # The broker socket lives next to the SSO token cache, one per SSO session
+        self.broker_socket_path = os.path.expanduser(
+            broker_socket or f"~/.aws/sso/sso-config-generator-{self.sso_session_name}.sock")
         
         # AWS clients - authenticate via the configured profile (default: sso-browser)
         # Note: SSO services require explicit accessToken, Organizations uses sigv4
         self.profile_name = profile
         self.session = boto3.Session(profile_name=self.profile_name, region_name=self.region)
-        self.sso_oidc = self.session.client('sso-oidc')
-        self.sso = self.session.client('sso')
+        self._clients: Dict[str, object] = {}
+        self._clients_lock = threading.Lock()
+        self.connection_stats = _ConnectionStats()
+        self.sso_oidc = self._client('sso-oidc')
+        self.sso = self._client('sso')
         self.org_client = None
         self.use_ou_structure = use_ou_structure
         self.access_token = None
         self.config_needed_flag = os.path.expanduser("~/.aws/config.needed")
         
+    def _print(self, *args, file=None, **kwargs) -> None:
+        """Print a progress or error message, or log it when the generator is quiet.
+
+        In quiet mode messages meant for stderr are logged as warnings and all
+        other messages as info.
+        """
+        if not self.quiet:
+            print(*args, file=file, **kwargs)
+            return
+        message = kwargs.get('sep', ' ').join(str(arg) for arg in args).strip()
+        if message:
+            logger.log(logging.WARNING if file is sys.stderr else logging.INFO, message)
+
+    def _client(self, service: str, region: Optional[str] = None):
+        """Return the shared client for an AWS service, creating it on first use.
+
+        Every discovery, validation and refresh path uses these clients, so HTTP
+        connections (and their TLS sessions) are reused across calls.  The
+        connection pool is sized to ``max_workers`` so that concurrent lookups do
+        not queue behind botocore's default of 10 connections, and TCP keep-alive
+        keeps idle connections usable, e.g. between ``watch`` checks.
+
+        Args:
+            service: Service name, e.g. ``organizations``
+            region: Region to use instead of the session region
+        """
+        key = service if region in (None, self.session.region_name) else f"{service}@{region}"
+        with self._clients_lock:
+            client = self._clients.get(key)
+            if client is None:
+                options = {}
+                retries = {'mode': 'standard'}
+                if self.deadline is not None:
+                    # Calls are abandoned at the deadline anyway (see _bounded);
+                    # this keeps abandoned calls from lingering in the background
+                    timeout = min(60, max(1, int(self.deadline.total_seconds())))
+                    options = {'connect_timeout': timeout, 'read_timeout': timeout}
+                    retries['total_max_attempts'] = 2
+                config = Config(
+                    max_pool_connections=max(10, self.max_workers),
+                    tcp_keepalive=True,
+                    retries=retries,
+                    **options,
+                )
+                client = self.session.client(service, region_name=region, config=config)
+                self.connection_stats.instrument(client)
+                self._clients[key] = client
+            return client
+
+    def _start_deadline(self) -> None:
+        """Start the clock for ``deadline`` and forget what an earlier run postponed."""
+        self.degraded = []
+        self._deadline_at = (time.monotonic() + self.deadline.total_seconds()
+                             if self.deadline is not None else None)
+
+    def _time_left(self) -> Optional[float]:
+        """Return the seconds left until the deadline, or None without a deadline."""
+        if self._deadline_at is None:
+            return None
+        return max(0.0, self._deadline_at - time.monotonic())
+
+    def _deadline_passed(self) -> bool:
+        return self._time_left() == 0.0
+
+    def _check_deadline(self) -> None:
+        """Raise _DeadlineReached once the deadline has passed."""
+        if self._deadline_passed():
+            raise _DeadlineReached()
+
+    def _bounded(self, function: Callable, *args):
+        """Call ``function(*args)`` unless the deadline passes first.
+
+        Without a deadline this is a plain call.  Otherwise the call runs on a
+        daemon thread that is abandoned at the deadline, so a slow request (and
+        its retries) cannot hold up the run or the exit of the process.
+
+        Raises:
+            _DeadlineReached: When the deadline passes before the call returns
+        """
+        self._check_deadline()
+        result = call_with_timeout(self._time_left(), function, *args)
+        if result is TIMED_OUT:
+            raise _DeadlineReached()
+        return result
+
+    def _run_concurrently(self, *jobs: Tuple[Callable, Sequence[Tuple]]) -> List[List]:
+        """Run calls on ``max_workers`` threads, waiting for them at most until the deadline.
+
+        Calls still running at the deadline are abandoned on their daemon
+        threads rather than awaited; none are started once it has passed.
+
+        Args:
+            jobs: ``(function, argument tuples)`` pairs
+
+        Returns:
+            List[List]: Per job, the results in argument order; None for calls
+            that did not finish before the deadline
+        """
+        if self._deadline_passed():
+            return [[None] * len(arguments) for _, arguments in jobs]
+        pool = DaemonThreadPool(self.max_workers)
+        try:
+            futures = [[pool.submit(function, *args) for args in arguments]
+                       for function, arguments in jobs]
+            wait([future for group in futures for future in group], timeout=self._time_left())
+        finally:
+            pool.shutdown(wait=not self._deadline_passed(), cancel_futures=True)
+        return [[future.result() if future.done() and not future.cancelled() else None
+                 for future in group] for group in futures]
+
+    def _report_degraded(self) -> None:
+        """Report what was postponed because the deadline was reached."""
+        if not self.degraded:
+            return
+        self._print(f"\nDeadline of {self.deadline.total_seconds():g}s reached; some data is served from the cache:",
+                    file=sys.stderr)
+        for note in self.degraded:
+            self._print(f"  {note}", file=sys.stderr)
+        self._print("The postponed work is picked up by the next run.", file=sys.stderr)
+
     def _resolve_sso_session_name(self, explicit_name: Optional[str]) -> str:
         """Resolve the SSO session name to use.
 
@@ -112,63 +393,486 @@ class SSOConfigGenerator:
 
         if len(sso_sessions) == 1:
             name = sso_sessions[0].removeprefix("sso-session ")
-            print(f"Auto-detected SSO session name: {name}")
+            self._print(f"Auto-detected SSO session name: {name}")
             return name
 
         return "sso"
 
-    def generate(self) -> bool:
+    def generate(self, rebuild_cache: bool = False) -> bool:
         """Generate AWS SSO configuration and directory structure.
         
+        Args:
+            rebuild_cache: Re-discover the organization even when the cache is fresh;
+                the existing cache is only replaced once discovery succeeded
+
         Returns:
             bool: True if successful, False otherwise
         """
+        self._start_deadline()
         try:
-            print("\n=== Generating SSO Configuration ===\n")
-            print(f"Using AWS config file: {self.aws_config_path}")
-            print(f"Using AWS credentials file: {self.aws_credentials_path}")
+            self._print("\n=== Generating SSO Configuration ===\n")
+            self._print(f"Using AWS config file: {self.aws_config_path}")
+            self._print(f"Using AWS credentials file: {self.aws_credentials_path}")
             
             # Get SSO information
             sso_info = self._get_sso_info()
             if not sso_info:
                 return False
 
-            print(f"Using OU cache file: {self.ou_cache_path}")
+            self._print(f"Using OU cache file: {self.ou_cache_path}")
                 
-            # Get account and role information
-            accounts = self._get_accounts()
+            # Get account and role information; freshly discovered accounts are
+            # streamed to the config file and directory tree as they arrive
+            sink = _AccountSink(self, sso_info)
+            accounts = self._get_accounts(on_account=sink, rebuild_cache=rebuild_cache)
             if not accounts:
                 return False
                 
-            # Generate AWS CLI config
+            # Final commit: write the complete, ordered managed block
             if not self._generate_aws_config(sso_info, accounts):
                 return False
                 
             # Create directory structure if requested
             if self.create_directories:
-                if not self._create_directory_structure(accounts):
+                if not self._create_directory_structure(accounts, sink.created, sink.base_path):
                     return False
+                self._run_enrichment(accounts)
+            elif self.enrichment_tasks:
+                self._print("Note: enrichment tasks write into account directories; "
+                            "use --create-directories to run them")
+            if not self._render_outputs(sso_info, accounts):
+                return False
             self._clear_config_needed_flag()
                     
-            print("\nSSO configuration generated successfully!")
+            self._print("\nSSO configuration generated successfully!")
+            self._print(self.connection_stats.summary())
+            self._report_degraded()
             return True
             
         except Exception as e:
-            print(f"Error generating SSO configuration: {str(e)}", file=sys.stderr)
+            self._print(f"Error generating SSO configuration: {str(e)}", file=sys.stderr)
             return False
-            
+        finally:
+            # The deadline bounds this run only, not later watch checks or refreshes
+            self._deadline_at = None
+
+    def refresh(self, account_selectors: Sequence[str] = (), ou_paths: Sequence[str] = ()) -> bool:
+        """Re-discover selected accounts and patch them into the existing cache.
+
+        Only the selected accounts are queried (OU placement and roles); every
+        other cached entry is kept as is.  The managed block and directory tree
+        are then regenerated from the patched cache.  Without a usable cache this
+        falls back to a full ``generate()``.
+
+        Args:
+            account_selectors: Account IDs or names to refresh; accounts missing from
+                the cache (e.g. newly vended ones) are looked up via list_accounts
+            ou_paths: OU paths (e.g. ``/Workloads/Prod/``) whose accounts are refreshed,
+                including accounts that have been added to or moved into the subtree
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            self._print("\n=== Refreshing SSO Configuration ===\n")
+
+            sso_info = self._get_sso_info()
+            if not sso_info:
+                return False
+
+            if not os.path.exists(self.ou_cache_path) or (
+                    self.use_ou_structure and not self._cache_built_with_ou_structure()):
+                self._print("No usable OU cache found, performing a full run instead.")
+                return self.generate()
+
+            with open(self.ou_cache_path) as f:
+                cache_data = json.load(f)
+            previous = dict(cache_data, accounts=list(cache_data['accounts']))
+
+            if not self._ensure_sso_auth():
+                return False
+
+            self.use_ou_structure = cache_data.get('use_ou_structure', False)
+            if self.use_ou_structure:
+                self.org_client = self._client('organizations')
+
+            entries = {entry['id']: entry for entry in cache_data['accounts']}
+            targets: Dict[str, str] = {}  # account id -> account name
+
+            # Accounts selected by ID or name
+            unresolved = []
+            for selector in account_selectors:
+                matches = [e for e in entries.values()
+                           if selector in (e['id'], e['name'], self._sanitize_path(e['name']))]
+                if matches:
+                    targets.update((e['id'], e['name']) for e in matches)
+                else:
+                    unresolved.append(selector)
+            if unresolved:
+                found = self._find_sso_accounts(unresolved)
+                targets.update(found)
+                names = set(found.values()) | {self._sanitize_path(name) for name in found.values()}
+                for selector in unresolved:
+                    if selector not in found and selector not in names:
+                        self._print(f"  Account '{selector}' not found in SSO", file=sys.stderr)
+
+            # Accounts currently cached under, or placed by Organizations in, an OU subtree
+            for ou_path in ou_paths:
+                ou_path = "/" + "".join(f"{p}/" for p in ou_path.split('/') if p)
+                targets.update((e['id'], e['name']) for e in entries.values()
+                               if e.get('ou_path', '/').startswith(ou_path))
+                if self.use_ou_structure:
+                    node = self._find_ou_tree_node(cache_data.get('ou_tree'), ou_path)
+                    if node is None:
+                        self._print(f"  OU '{ou_path}' not found in cached OU tree", file=sys.stderr)
+                    else:
+                        targets.update(self._list_ou_subtree_accounts(node))
+
+            if not targets:
+                # Selectors that match nothing were reported above; there is no error
+                self._print("Nothing to refresh.")
+                return True
+
+            self._print(f"Refreshing {len(targets)} account(s)...")
+            if self.shared_cache:
+                # A targeted refresh asks AWS and updates the shared placements too
+                try:
+                    self.shared_cache.forget_placements(targets)
+                except SharedCacheError as exc:
+                    self._disable_shared_cache(exc)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(self._discover_account, targets, targets.values()))
+            self._flush_shared_cache()
+
+            for entry in results:
+                before = entries.get(entry['id'])
+                entries[entry['id']] = entry
+                if not entry['roles']:
+                    self._print(f"  {entry['name']}: no accessible roles ({entry['status']})")
+                    continue
+                action = "updated" if before and before.get('roles') else "added"
+                self._print(f"  {entry['name']}: {action} ({entry['ou_path']}, {len(entry['roles'])} role(s))")
+
+            cache_data['accounts'] = list(entries.values())
+            cache_data['last_updated'] = datetime.datetime.now().isoformat()
+            # Segment timestamps are left alone: a partial refresh must not extend
+            # the lifetime of the rest of the cache
+            self._write_json_atomic(self.ou_cache_path, cache_data)
+            self._record_changes(previous, cache_data, 'refresh')
+
+            if not self._generate_from_cache(sso_info):
+                return False
+
+            self._print("\nSSO configuration refreshed successfully!")
+            self._print(self.connection_stats.summary())
+            return True
+
+        except Exception as e:
+            self._print(f"Error refreshing SSO configuration: {str(e)}", file=sys.stderr)
+            return False
+
+    def export_cache(self, bundle_path: str) -> bool:
+        """Package the OU cache into a portable, integrity-checked bundle.
+
+        The bundle is a gzip-compressed JSON document holding the cache data
+        together with the cache schema version, the SSO start URL and the flags
+        the cache was built with.  A SHA-256 digest of the cache data lets
+        :meth:`import_cache` detect corrupted or tampered bundles.
+
+        Args:
+            bundle_path: File to write the bundle to
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            sso_info = self._get_sso_info()
+            if not sso_info:
+                return False
+
+            cache_data = self._load_cache_data()
+            if cache_data is None:
+                self._print(f"No OU cache found at {self.ou_cache_path}; run sso-config-generator first.",
+                      file=sys.stderr)
+                return False
+
+            bundle = {
+                'format': CACHE_BUNDLE_FORMAT,
+                'schema_version': CACHE_SCHEMA_VERSION,
+                'generator_version': __version__,
+                'exported_at': datetime.datetime.now().isoformat(timespec='seconds'),
+                'start_url': sso_info['start_url'],
+                'flags': {'use_ou_structure': cache_data.get('use_ou_structure', False)},
+                'sha256': self._cache_digest(cache_data),
+                'cache': cache_data,
+            }
+            tmp_path = f"{bundle_path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(bundle, f, separators=(',', ':'))
+            os.replace(tmp_path, bundle_path)
+
+            accounts = sum(1 for entry in cache_data['accounts'] if entry.get('roles'))
+            self._print(f"Exported {accounts} account(s) from {self.ou_cache_path} to {bundle_path}")
+            return True
+
+        except Exception as e:
+            self._print(f"Error exporting cache: {str(e)}", file=sys.stderr)
+            return False
+
+    def import_cache(self, bundle_path: str, force: bool = False) -> bool:
+        """Install a cache bundle and generate the configuration from it.
+
+        The bundle is verified (format, schema version, SHA-256 digest and SSO
+        start URL) before it replaces the local cache.  The managed block and
+        directory tree are then generated from the imported cache without any
+        discovery; the cached segment timestamps are kept, so later runs update
+        whatever has expired through the normal incremental logic.
+
+        Args:
+            bundle_path: Bundle written by :meth:`export_cache`
+            force: Import even when the bundle was exported for another SSO start URL
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            self._print("\n=== Importing OU Cache Bundle ===\n")
+
+            sso_info = self._get_sso_info()
+            if not sso_info:
+                return False
+
+            try:
+                with gzip.open(bundle_path, 'rt', encoding='utf-8') as f:
+                    bundle = json.load(f)
+            except (OSError, ValueError) as exc:
+                self._print(f"Error: {bundle_path} is not a readable cache bundle ({exc})", file=sys.stderr)
+                return False
+
+            if not isinstance(bundle, dict) or bundle.get('format') != CACHE_BUNDLE_FORMAT:
+                self._print(f"Error: {bundle_path} is not a cache bundle", file=sys.stderr)
+                return False
+            if bundle.get('schema_version', 0) > CACHE_SCHEMA_VERSION:
+                self._print(f"Error: bundle uses cache schema version {bundle['schema_version']}, "
+                      f"this release supports up to {CACHE_SCHEMA_VERSION}; please upgrade",
+                      file=sys.stderr)
+                return False
+            cache_data = bundle.get('cache')
+            if not isinstance(cache_data, dict) or bundle.get('sha256') != self._cache_digest(cache_data):
+                self._print("Error: bundle integrity check failed (checksum mismatch)", file=sys.stderr)
+                return False
+            if bundle.get('start_url') != sso_info['start_url']:
+                self._print(f"{'Warning' if force else 'Error'}: bundle was exported for "
+                      f"{bundle.get('start_url')}, not {sso_info['start_url']}", file=sys.stderr)
+                if not force:
+                    self._print("Use --force to import it anyway.", file=sys.stderr)
+                    return False
+
+            if self.use_ou_structure and not cache_data.get('use_ou_structure', False):
+                self._print("Warning: bundle was built without OU structure; "
+                      "the next regular run will rebuild the cache", file=sys.stderr)
+                self.use_ou_structure = False
+
+            previous = self._load_cache_data()
+            self._write_json_atomic(self.ou_cache_path, cache_data)
+            if previous:
+                self._record_changes(previous, cache_data, 'import')
+            self._print(f"Imported cache bundle exported {bundle.get('exported_at')} "
+                  f"by version {bundle.get('generator_version')} into {self.ou_cache_path}")
+
+            # The import must work offline: expired negative entries are looked
+            # up by the next regular run
+            if not self._generate_from_cache(sso_info, recheck=False):
+                return False
+
+            self._print("\nSSO configuration generated from cache bundle!")
+            return True
+
+        except Exception as e:
+            self._print(f"Error importing cache bundle: {str(e)}", file=sys.stderr)
+            return False
+
+    def _cache_digest(self, cache_data: Dict) -> str:
+        """Return the SHA-256 digest of cache data in canonical JSON form."""
+        canonical = json.dumps(cache_data, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _generate_from_cache(self, sso_info: Dict, recheck: bool = True) -> bool:
+        """Write the managed block, directory tree and artifacts from the current cache file.
+
+        Args:
+            sso_info: SSO configuration information
+            recheck: Look up accounts whose negative entry expired (see
+                _get_accounts_from_cache); False writes without any network access
+        """
+        accounts = self._get_accounts_from_cache(recheck=recheck)
+        if not accounts:
+            return False
+        if not self._generate_aws_config(sso_info, accounts):
+            return False
+        if self.create_directories:
+            if not self._create_directory_structure(accounts):
+                return False
+            self._run_enrichment(accounts)
+        if not self._render_outputs(sso_info, accounts):
+            return False
+        self._clear_config_needed_flag()
+        return True
+
+    def render(self) -> bool:
+        """Render the configured output artifacts from the cache without contacting AWS.
+
+        Accounts whose negative cache entry expired are not re-checked.
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            if not self.outputs:
+                self._print("No output formats configured; use --output FORMAT[=PATH]", file=sys.stderr)
+                return False
+            sso_info = self._get_sso_info()
+            if not sso_info:
+                return False
+            if not os.path.exists(self.ou_cache_path):
+                self._print(f"No OU cache found at {self.ou_cache_path}; run sso-config-generator first.",
+                      file=sys.stderr)
+                return False
+            accounts = self._get_accounts_from_cache(recheck=False)
+            if not accounts:
+                return False
+            return self._render_outputs(sso_info, accounts)
+
+        except Exception as e:
+            self._print(f"Error rendering outputs: {str(e)}", file=sys.stderr)
+            return False
+
+    def watch(self, interval: int = 900, jitter: int = 60, max_backoff: int = 3600,
+              iterations: Optional[int] = None) -> bool:
+        """Keep the cache and AWS config fresh until interrupted.
+
+        After an initial ``generate()``, every ``interval`` (plus up to ``jitter``)
+        seconds a cheap fingerprint of the organization is taken: the account IDs
+        and names from ``list_accounts`` and, when the OU structure is used, the OU
+        tree.  Role discovery and regeneration only run when the fingerprint changed
+        or a cache segment expired.  Throttling and other failures back off exponentially
+        up to ``max_backoff`` seconds.
+
+        Args:
+            interval: Seconds between change checks
+            jitter: Maximum random seconds added to each interval
+            max_backoff: Upper bound for the delay after failed checks
+            iterations: Stop after this many checks (default: run forever)
+
+        Returns:
+            bool: False if the initial run failed, True otherwise
+        """
+        self._print(f"\n=== Watching SSO organization (every {interval}s) ===")
+        if not self.generate():
+            return False
+
+        fingerprint = self._cached_fingerprint()
+        failures = 0
+        checks = 0
+        try:
+            while iterations is None or checks < iterations:
+                delay = interval if not failures else min(max_backoff, interval * 2 ** failures)
+                time.sleep(delay + random.uniform(0, jitter))
+                checks += 1
+                try:
+                    if not self._ensure_sso_auth():
+                        failures += 1
+                        continue
+
+                    current = self._organization_fingerprint()
+                    if fingerprint is None:
+                        # Nothing to compare with yet: the organization as it is
+                        # now becomes the reference
+                        self._store_fingerprint(current)
+                        fingerprint = current
+                    stamp = datetime.datetime.now().isoformat(timespec='seconds')
+                    if current != fingerprint:
+                        self._print(f"\n[{stamp}] Organization changed, regenerating")
+                        if not self.generate(rebuild_cache=True):
+                            failures += 1
+                            continue
+                        self._store_fingerprint(current)
+                    elif self._cache_needs_update():
+                        self._print(f"\n[{stamp}] Cache segments expired, updating")
+                        if not self.generate():
+                            failures += 1
+                            continue
+                        self._store_fingerprint(current)
+                    fingerprint = current
+                    failures = 0
+
+                except ClientError as err:
+                    failures += 1
+                    error_code = err.response.get('Error', {}).get('Code')
+                    kind = "Throttled" if error_code in _THROTTLING_ERRORS else "AWS error"
+                    self._print(f"{kind} ({error_code}) during change check, backing off", file=sys.stderr)
+                except Exception as e:
+                    failures += 1
+                    self._print(f"Error during change check: {str(e)}", file=sys.stderr)
+
+        except KeyboardInterrupt:
+            self._print("\nStopped watching.")
+        return True
+
+    def _organization_fingerprint(self) -> str:
+        """Return a hash over the account list and, if used, the OU tree.
+
+        Raises:
+            ClientError: When AWS rejects or throttles one of the calls
+        """
+        digest = hashlib.sha256()
+        paginator = self.sso.get_paginator('list_accounts')
+        accounts = []
+        for page in paginator.paginate(accessToken=self.access_token):
+            accounts.extend(f"{a['accountId']}:{a['accountName']}" for a in page['accountList'])
+        digest.update("\n".join(sorted(accounts)).encode())
+
+        if self.use_ou_structure:
+            if self.org_client is None:
+                self.org_client = self._client('organizations')
+            root_id = self.org_client.list_roots()['Roots'][0]['Id']
+            tree = self._build_ou_tree(root_id)
+            digest.update(json.dumps(tree, sort_keys=True).encode())
+
+        return digest.hexdigest()
+
+    def _cached_fingerprint(self) -> Optional[str]:
+        """Return the organization fingerprint stored in the cache, if any."""
+        try:
+            with open(self.ou_cache_path) as f:
+                return json.load(f).get('fingerprint')
+        except Exception:
+            return None
+
+    def _store_fingerprint(self, fingerprint: str) -> None:
+        """Record the organization fingerprint in the cache."""
+        try:
+            with open(self.ou_cache_path) as f:
+                cache_data = json.load(f)
+            cache_data['fingerprint'] = fingerprint
+            self._write_json_atomic(self.ou_cache_path, cache_data)
+        except (OSError, ValueError):
+            pass
+
     def validate(self) -> bool:
         """Validate current AWS SSO configuration.
+
+        Profiles are re-checked incrementally; see _test_role_assumptions.
         
         Returns:
             bool: True if valid, False otherwise
         """
         try:
-            print("\n=== Validating SSO Configuration ===\n")
+            self._print("\n=== Validating SSO Configuration ===\n")
             
             # Check AWS config file exists
             if not os.path.exists(self.aws_config_path):
-                print("AWS config file not found, will be created during setup")
+                self._print("AWS config file not found, will be created during setup")
                 return True
                 
             # Validate SSO access
@@ -179,11 +883,12 @@ class SSOConfigGenerator:
             if not self._test_role_assumptions():
                 return False
                 
-            print("\nSSO configuration is valid!")
+            self._print("\nSSO configuration is valid!")
+            self._print(self.connection_stats.summary())
             return True
             
         except Exception as e:
-            print(f"Error validating SSO configuration: {str(e)}", file=sys.stderr)
+            self._print(f"Error validating SSO configuration: {str(e)}", file=sys.stderr)
             return False
             
     def _get_sso_info(self) -> Optional[Dict]:
@@ -199,14 +904,14 @@ class SSOConfigGenerator:
             # First check for sso-session section
             if self.sso_session_section in self.config:
                 # Debug output
-                print(f"Found {self.sso_session_section} section in config file")
-                print(f"sso_start_url: {self.config[self.sso_session_section].get('sso_start_url')}")
-                print(f"sso_region: {self.config[self.sso_session_section].get('sso_region')}")
+                self._print(f"Found {self.sso_session_section} section in config file")
+                self._print(f"sso_start_url: {self.config[self.sso_session_section].get('sso_start_url')}")
+                self._print(f"sso_region: {self.config[self.sso_session_section].get('sso_region')}")
 
                 start_url = self.config[self.sso_session_section].get("sso_start_url")
                 sso_name = self._extract_sso_name(start_url)
                 self._set_ou_cache_path(start_url)
-                print(f"Extracted SSO name: {sso_name}")
+                self._print(f"Extracted SSO name: {sso_name}")
                 
                 return {
                     "start_url": start_url,
@@ -215,14 +920,14 @@ class SSOConfigGenerator:
                 }
             # Then check default section
             elif "default" in self.config:
-                print(f"Found default section in config file")
-                print(f"sso_start_url: {self.config['default'].get('sso_start_url')}")
-                print(f"sso_region: {self.config['default'].get('sso_region')}")
+                self._print(f"Found default section in config file")
+                self._print(f"sso_start_url: {self.config['default'].get('sso_start_url')}")
+                self._print(f"sso_region: {self.config['default'].get('sso_region')}")
                 
                 start_url = self.config["default"].get("sso_start_url")
                 sso_name = self._extract_sso_name(start_url)
                 self._set_ou_cache_path(start_url)
-                print(f"Extracted SSO name: {sso_name}")
+                self._print(f"Extracted SSO name: {sso_name}")
                 
                 return {
                     "start_url": start_url,
@@ -231,11 +936,15 @@ class SSOConfigGenerator:
                 }
             
             # Otherwise prompt for information
+            if not self.interactive:
+                self._print(f"No {self.sso_session_section} section with sso_start_url found in "
+                            f"{self.aws_config_path}", file=sys.stderr)
+                return None
             start_url = input("Enter SSO start URL: ").strip()
             region = input("Enter SSO region [eu-west-1]: ").strip() or "eu-west-1"
             sso_name = self._extract_sso_name(start_url)
             self._set_ou_cache_path(start_url)
-            print(f"Extracted SSO name: {sso_name}")
+            self._print(f"Extracted SSO name: {sso_name}")
             
             return {
                 "start_url": start_url,
@@ -244,74 +953,353 @@ class SSOConfigGenerator:
             }
             
         except Exception as e:
-            print(f"Error getting SSO information: {str(e)}", file=sys.stderr)
+            self._print(f"Error getting SSO information: {str(e)}", file=sys.stderr)
             return None
             
-    def _get_accounts(self) -> Optional[List[Dict]]:
+    def _get_accounts(self, on_account: Optional[Callable[[Account], None]] = None,
+                      rebuild_cache: bool = False) -> Optional[List[Account]]:
         """Get AWS account information with OU structure.
+
+        The cache consists of segments with independent TTLs: the OU tree, the
+        account-to-OU placement, the account list and the roles of each account.
+        Only expired segments are fetched again; when all of them expired the
+        cache is rebuilt from scratch.  A resumable checkpoint of an interrupted
+        rebuild is continued first.
         
+        Args:
+            on_account: Called with each account as soon as discovery has finished
+                it (only when the cache is rebuilt)
+            rebuild_cache: Ignore any existing cache and re-discover the organization
+
         Returns:
-            Optional[List[Dict]]: List of account information if successful, None otherwise
+            Optional[List[Account]]: List of accounts if successful, None otherwise
         """
         try:
+            if rebuild_cache:
+                return self._build_accounts_cache(on_account)
+
+            # An interrupted rebuild (e.g. --rebuild-cache stopped at the deadline)
+            # is continued even while the cache is fresh; a checkpoint that can no
+            # longer be resumed is discarded
+            if os.path.exists(self.checkpoint_path):
+                if self._load_checkpoint():
+                    return self._build_accounts_cache(on_account)
+                os.remove(self.checkpoint_path)
+
             # Check if cache exists and should be used
-            if os.path.exists(self.ou_cache_path):
-                if self._is_cache_expired(self.ou_cache_path):
-                    print(f"\nFound OU cache at {self.ou_cache_path}, but it is older than 7 days.")
-                    print("Ignoring stale cache and rebuilding.\n")
-                    try:
-                        os.remove(self.ou_cache_path)
-                    except OSError:
-                        pass
-                    return self._build_accounts_cache()
+            cache_data = self._load_cache_data()
+            if cache_data is None:
+                return self._build_accounts_cache(on_account)
 
-                if self.use_ou_structure and not self._cache_built_with_ou_structure():
-                    print("\nOU structure requested but cache was built without it. Rebuilding.\n")
-                    try:
-                        os.remove(self.ou_cache_path)
-                    except OSError:
-                        pass
-                    return self._build_accounts_cache()
+            if self.use_ou_structure and not cache_data.get('use_ou_structure', False):
+                self._print("\nOU structure requested but cache was built without it. Rebuilding.\n")
+                return self._build_accounts_cache(on_account)
 
-                print("\nFound OU cache, using cached data.")
-                print("Use --rebuild-cache to refresh the OU structure.\n")
+            stale, stale_roles = self._expired_segments(cache_data)
+            stale_tags = self._expired_tags(cache_data)
+            if not stale and not stale_roles and not stale_tags:
+                self._print("\nFound OU cache, using cached data.")
+                self._print("Use --rebuild-cache to refresh the OU structure.\n")
                 return self._get_accounts_from_cache()
-            
-            return self._build_accounts_cache()
+
+            with_roles = sum(1 for e in cache_data['accounts'] if e.get('roles'))
+            structure_stale = 'placement' in stale or not cache_data.get('use_ou_structure')
+            if 'account_list' in stale and structure_stale and len(stale_roles) == with_roles:
+                self._print(f"\nFound OU cache at {self.ou_cache_path}, but it has expired.")
+                self._print("Ignoring stale cache and rebuilding.\n")
+                return self._build_accounts_cache(on_account)
+
+            return self._update_cache_segments(cache_data, stale, stale_roles, stale_tags)
             
         except Exception as e:
-            print(f"Error getting account information: {str(e)}", file=sys.stderr)
+            self._print(f"Error getting account information: {str(e)}", file=sys.stderr)
             return None
-            
-    def _get_accounts_from_cache(self) -> Optional[List[Dict]]:
+        finally:
+            self._flush_shared_cache()
+
+    def _segment_age(self, cache_data: Dict, timestamp: Optional[str],
+                     now: datetime.datetime) -> Optional[datetime.timedelta]:
+        """Return the age of a cache timestamp, falling back to ``last_updated``."""
+        try:
+            fetched_at = datetime.datetime.fromisoformat(timestamp or cache_data['last_updated'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        return now - fetched_at
+
+    def _expired_segments(self, cache_data: Dict) -> Tuple[List[str], List[str]]:
+        """Determine which cache segments are older than their TTL.
+
+        Caches written before segments existed are treated as if every segment
+        was fetched at ``last_updated``.
+
+        Returns:
+            Tuple[List[str], List[str]]: Names of expired segments (``ou_tree``,
+            ``placement``, ``account_list``) and IDs of accounts whose roles expired
+        """
+        now = datetime.datetime.now()
+        segments = cache_data.get('segments', {})
+        names = ['account_list']
+        if cache_data.get('use_ou_structure'):
+            names = ['ou_tree', 'placement'] + names
+
+        stale = []
+        for name in names:
+            age = self._segment_age(cache_data, segments.get(name), now)
+            if age is None or age > self.cache_ttls[name]:
+                stale.append(name)
+
+        stale_roles = []
+        for entry in cache_data['accounts']:
+            if not entry.get('roles'):
+                continue
+            if entry.get('status'):
+                # Roles kept from before a failed lookup: retry like a negative entry
+                if self._negative_entry_expired(entry, now):
+                    stale_roles.append(entry['id'])
+                continue
+            age = self._segment_age(cache_data, entry.get('checked_at'), now)
+            if age is None or age > self.cache_ttls['roles']:
+                stale_roles.append(entry['id'])
+
+        return stale, stale_roles
+
+    def _expired_tags(self, cache_data: Dict) -> List[str]:
+        """Return the IDs of accounts whose cached tags are missing or expired.
+
+        Always empty when no tags are used.  Failed lookups are retried after
+        ``negative_cache_ttl`` (access denied) or ``error_cache_ttl``.
+        """
+        if not self.tag_enrichment:
+            return []
+        now = datetime.datetime.now()
+        stale = []
+        for entry in cache_data['accounts']:
+            if not entry.get('roles'):
+                continue
+            status = entry.get('tags_status')
+            ttl = (self.tags_ttl if status is None else
+                   self.negative_cache_ttl if status == 'access_denied' else self.error_cache_ttl)
+            try:
+                expired = now - datetime.datetime.fromisoformat(entry['tags_checked_at']) > ttl
+            except (KeyError, TypeError, ValueError):
+                expired = True
+            if expired:
+                stale.append(entry['id'])
+        return stale
+
+    def _cache_needs_update(self) -> bool:
+        """Return True when the cache is missing, partly expired or a rebuild can be resumed."""
+        cache_data = self._load_cache_data()
+        if cache_data is None or self._load_checkpoint():
+            return True
+        stale, stale_roles = self._expired_segments(cache_data)
+        return bool(stale or stale_roles or self._expired_tags(cache_data))
+
+    def _update_cache_segments(self, cache_data: Dict, stale: List[str], stale_roles: List[str],
+                               stale_tags: Sequence[str] = ()) -> Optional[List[Account]]:
+        """Re-fetch only the expired cache segments and return the updated accounts.
+
+        New accounts found in a refreshed account list are discovered completely;
+        a changed OU tree also invalidates the placement segment.  When the update
+        fails the (expired) cached data is used instead.  Parts not fetched before
+        the deadline keep their cached data and stay expired, so the next run
+        fetches them.
+
+        Args:
+            cache_data: Parsed cache file
+            stale: Names of expired segments
+            stale_roles: IDs of accounts whose roles expired
+            stale_tags: IDs of accounts whose tags expired
+
+        Returns:
+            Optional[List[Account]]: List of accounts if successful, None otherwise
+        """
+        stale = list(stale)
+        parts = stale + ([f'roles of {len(stale_roles)} account(s)'] if stale_roles else []) + \
+            ([f'tags of {len(stale_tags)} account(s)'] if stale_tags else [])
+        self._print(f"\nFound OU cache, refreshing expired parts: {', '.join(parts)}\n")
+
+        try:
+            if not self._ensure_sso_auth():
+                self._print("Using expired cache data.\n")
+                return self._get_accounts_from_cache()
+
+            previous = json.loads(json.dumps(cache_data))
+            now = datetime.datetime.now().isoformat()
+            segments = cache_data.setdefault('segments', {})
+            entries = {entry['id']: entry for entry in cache_data['accounts']}
+            if cache_data.get('use_ou_structure') and self.org_client is None:
+                self.org_client = self._client('organizations')
+
+            postponed = []
+            if 'ou_tree' in stale:
+                try:
+                    ou_tree = self._get_ou_tree()
+                except _DeadlineReached:
+                    postponed.append('OU tree')
+                else:
+                    if ou_tree != cache_data.get('ou_tree') and 'placement' not in stale:
+                        self._print("OU tree changed, refreshing account placement as well")
+                        stale.append('placement')
+                    cache_data['ou_tree'] = ou_tree
+                    segments['ou_tree'] = now
+
+            new_accounts: Dict[str, str] = {}
+            order = {account_id: i for i, account_id in enumerate(entries)}
+            if 'account_list' in stale:
+                listed = {}
+                try:
+                    paginator = self.sso.get_paginator('list_accounts')
+                    pages = iter(paginator.paginate(accessToken=self.access_token))
+                    while True:
+                        page = self._bounded(next, pages, _END_OF_PAGES)
+                        if page is _END_OF_PAGES:
+                            break
+                        for account in page['accountList']:
+                            entry = entries.get(account['accountId'])
+                            if entry is None:
+                                new_accounts[account['accountId']] = account['accountName']
+                                continue
+                            entry['name'] = account['accountName']
+                            listed[account['accountId']] = entry
+                except _DeadlineReached:
+                    # A partial list cannot tell which accounts are gone; keep the cached one
+                    postponed.append('account list')
+                    new_accounts = {}
+                else:
+                    # Keep list_accounts order; new accounts are inserted after discovery
+                    order = {account_id: i for i, account_id in enumerate(
+                        list(listed) + list(new_accounts))}
+                    entries = listed
+
+            to_place = []
+            if 'placement' in stale:
+                to_place = [i for i, e in entries.items() if e.get('roles')]
+            to_check = [i for i in stale_roles if i in entries]
+            to_tag = [i for i in stale_tags if i in entries]
+            if to_check or new_accounts:
+                try:
+                    self._bounded(self._prepare_role_discovery)
+                except _DeadlineReached:
+                    pass  # the lookups below are all postponed
+
+            discovered, placements, role_lookups, tag_lookups = self._run_concurrently(
+                (self._discover_account, list(new_accounts.items())),
+                (self._get_account_ou_path, [(i,) for i in to_place]),
+                (self._lookup_account_roles, [(i,) for i in to_check]),
+                (self._lookup_account_tags, [(i,) for i in to_tag]))
+
+            for entry in discovered:
+                if entry is not None:
+                    entries[entry['id']] = entry
+            if 'account_list' in stale and 'account list' not in postponed:
+                if None in discovered:
+                    postponed.append(f"discovery of {discovered.count(None)} new account(s)")
+                else:
+                    segments['account_list'] = now
+            for account_id, ou_path in zip(to_place, placements):
+                if ou_path is not None:
+                    entries[account_id]['ou_path'] = ou_path
+            if 'placement' in stale:
+                if None in placements:
+                    postponed.append(f"placement of {placements.count(None)} account(s)")
+                else:
+                    segments['placement'] = now
+            checked_at = datetime.datetime.now().isoformat(timespec='seconds')
+            for account_id, lookup in zip(to_check, role_lookups):
+                if lookup is None:
+                    continue
+                roles, status = lookup
+                entry = entries[account_id]
+                # A failed lookup keeps the roles found before; only an account
+                # that really has no roles any more loses them
+                if roles or status == 'no_roles' or not entry.get('roles'):
+                    entry['roles'] = roles
+                entry['checked_at'] = checked_at
+                entry.pop('status', None)
+                if status:
+                    entry['status'] = status
+            for account_id, lookup in zip(to_tag, tag_lookups):
+                if lookup is not None:
+                    self._apply_tags(entries[account_id], *lookup)
+            if None in role_lookups:
+                postponed.append(f"roles of {role_lookups.count(None)} account(s)")
+            if None in tag_lookups:
+                postponed.append(f"tags of {tag_lookups.count(None)} account(s)")
+            if postponed:
+                self.degraded.append(f"cache update postponed: {', '.join(postponed)}")
+
+            cache_data['accounts'] = sorted(entries.values(), key=lambda e: order[e['id']])
+            cache_data['last_updated'] = now
+            self._write_json_atomic(self.ou_cache_path, cache_data)
+            self._record_changes(previous, cache_data, 'update')
+
+        except Exception as e:
+            self._print(f"Unable to refresh expired cache data ({str(e)}); using cached data.",
+                  file=sys.stderr)
+
+        return self._get_accounts_from_cache()
+
+    def _get_accounts_from_cache(self, recheck: bool = True) -> Optional[List[Account]]:
         """Get account information from cache.
+
+        Accounts cached without roles (negative entries) are skipped without any
+        network access until their TTL expires; only expired negative entries are
+        looked up again, and the cache is updated with the result.
+
+        Args:
+            recheck: Look up accounts whose negative entry expired; when False the
+                cache is read without any network access
         
         Returns:
-            Optional[List[Dict]]: List of account information if successful, None otherwise
+            Optional[List[Account]]: List of accounts if successful, None otherwise
         """
         try:
             with open(self.ou_cache_path, 'r') as f:
                 cache_data = json.load(f)
+
+            now = datetime.datetime.now()
+            entries = cache_data['accounts']
+            expired = [i for i, e in enumerate(entries)
+                       if recheck and not e.get('roles') and self._negative_entry_expired(e, now)]
+            skipped = sum(1 for e in entries if not e.get('roles')) - len(expired)
+
+            if expired and (self.access_token or self._ensure_sso_auth()):
+                self._print(f"Re-checking {len(expired)} account(s) whose negative cache entry expired")
+                # Only the roles are looked up again; the cached placement is kept
+                refreshed, = self._run_concurrently(
+                    (self._lookup_account_roles, [(entries[i]['id'],) for i in expired]))
+                checked_at = datetime.datetime.now().isoformat(timespec='seconds')
+                for i, lookup in zip(expired, refreshed):
+                    if lookup is None:
+                        continue  # not checked before the deadline; stays expired
+                    entry = entries[i]
+                    entry['roles'], status = lookup
+                    entry['checked_at'] = checked_at
+                    entry.pop('status', None)
+                    if status:
+                        entry['status'] = status
+                if None in refreshed:
+                    self.degraded.append(f"re-check of {refreshed.count(None)} account(s) "
+                                         "without accessible roles postponed")
+                self._write_json_atomic(self.ou_cache_path, cache_data)
+            if skipped:
+                self._print(f"Skipping {skipped} account(s) cached without accessible roles")
                 
-            accounts = []
-            for account in cache_data['accounts']:
-                # Use roles from cache if available, otherwise get them from SSO
-                if 'roles' in account and account['roles']:
-                    accounts.append(account)
-                else:
-                    roles = self._get_account_roles(account['id'])
-                    if roles:
-                        account['roles'] = roles
-                        accounts.append(account)
+            org = Organization()
+            for entry in entries:
+                if entry.get('roles'):
+                    org.add_entry(entry)
+            accounts = org.accounts
                     
             if not accounts:
-                print("No accessible accounts found in cache", file=sys.stderr)
+                self._print("No accessible accounts found in cache", file=sys.stderr)
                 return None
                 
             return accounts
             
         except Exception as e:
-            print(f"Error reading cache: {str(e)}", file=sys.stderr)
+            self._print(f"Error reading cache: {str(e)}", file=sys.stderr)
             return None
 
     def _set_ou_cache_path(self, start_url: Optional[str]) -> None:
@@ -325,20 +1313,44 @@ class SSOConfigGenerator:
         * ``.ou-cache.<sso_session_name>``     — when --sso-session-name was
           explicitly supplied, meaning a single config file hosts multiple SSO
           sessions and each needs its own cache.
+
+        The change journal is stored next to the cache as ``<cache>.journal``,
+        the checkpoint of an unfinished rebuild as ``<cache>.partial`` and the
+        profile validation results as ``<cache>.validation`` and the results of
+        enrichment tasks as ``<cache>.enrichment``.
+
+        With a shared cache directory, the organization-level data for
+        ``start_url`` is read from (and written to) the host-wide cache there.
         """
         if self._explicit_sso_session_name:
             safe_name = re.sub(r"[^A-Za-z0-9._-]", "-", self._explicit_sso_session_name)
             self.ou_cache_path = os.path.join(self.config_dir, f".ou-cache.{safe_name}")
         else:
             self.ou_cache_path = os.path.join(self.config_dir, ".ou-cache")
+        self.journal_path = f"{self.ou_cache_path}.journal"
+        self.checkpoint_path = f"{self.ou_cache_path}.partial"
+        self.completion_dir = os.path.join(self.config_dir, "sso-completion")
+        self.validation_path = f"{self.ou_cache_path}.validation"
+        self.enrichment_path = f"{self.ou_cache_path}.enrichment"
+        self.shared_cache = (SharedOrgCache(self.shared_cache_dir, start_url, lock_timeout=self._time_left)
+                             if self.shared_cache_dir and start_url else None)
 
-    def _is_cache_expired(self, cache_path: str) -> bool:
-        """Return True when cache file is older than configured max age."""
+    def _disable_shared_cache(self, error: Exception) -> None:
+        """Stop using the shared cache for this run; organization data is fetched per user."""
+        self._print(f"Warning: not using the shared cache: {error}", file=sys.stderr)
+        self.shared_cache = None
+
+    def _flush_shared_cache(self) -> None:
+        """Write the account placements looked up during this run to the shared cache."""
+        if not self.shared_cache:
+            return
         try:
-            modified_at = datetime.datetime.fromtimestamp(os.path.getmtime(cache_path))
-            return datetime.datetime.now() - modified_at > self.cache_max_age
-        except OSError:
-            return True
+            stored = self.shared_cache.flush()
+        except SharedCacheError as exc:
+            self._disable_shared_cache(exc)
+            return
+        if stored:
+            self._print(f"Stored {stored} account placement(s) in shared cache {self.shared_cache.path}")
 
     def _cache_built_with_ou_structure(self) -> bool:
         """Return True when the cache was built with OU structure enabled.
@@ -352,19 +1364,29 @@ class SSOConfigGenerator:
         except Exception:
             return False
 
-    def clear_ou_cache_files(self) -> int:
+    def clear_ou_cache_files(self, keep: Sequence[str] = ()) -> int:
         """Remove OU cache files from the config directory.
 
         Matches the current cache format (``.ou-cache``, ``.ou-cache.<name>``)
         as well as legacy formats (``.ou``, ``.ou.<name>.json``) so that old
         files are cleaned up automatically when --rebuild-cache is used.
+        The files kept next to a cache are not cache files and are never
+        removed: change journals (``*.journal``) are history, and checkpoints
+        (``*.partial``), validation results (``*.validation``) and enrichment
+        results (``*.enrichment``) have their own lifecycle.
+
+        Args:
+            keep: Paths of cache files to leave in place
 
         Returns:
             int: Number of removed cache files.
         """
         removed = 0
+        keep_names = {os.path.basename(path) for path in keep}
         try:
             for file_name in os.listdir(self.config_dir):
+                if file_name in keep_names or file_name.endswith(_CACHE_SIDE_FILES):
+                    continue
                 is_current_cache = file_name == ".ou-cache" or file_name.startswith(".ou-cache.")
                 is_legacy_cache = file_name == ".ou" or (file_name.startswith(".ou.") and file_name.endswith(".json"))
                 if is_current_cache or is_legacy_cache:
@@ -376,6 +1398,79 @@ class SSOConfigGenerator:
 
         return removed
             
+    def _load_cache_data(self) -> Optional[Dict]:
+        """Return the parsed cache file, or None when it is missing or unreadable."""
+        try:
+            with open(self.ou_cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _record_changes(self, previous: Dict, current: Dict, source: str) -> Optional[Dict]:
+        """Append the delta between two cache generations to the change journal.
+
+        The journal (``<cache>.journal``) holds one compact JSON record per line.
+        Nothing is written when the generations do not differ.
+
+        Args:
+            previous: Cache data before the update
+            current: Cache data after the update
+            source: What produced the new generation (``rebuild``, ``update`` of
+                expired segments, targeted ``refresh`` or bundle ``import``)
+
+        Returns:
+            Optional[Dict]: The journal record, or None when nothing changed
+        """
+        # Without OU structure every account is placed in '/', which is no move
+        compare_ou = bool(previous.get('use_ou_structure') and current.get('use_ou_structure'))
+        delta = diff_accounts(previous.get('accounts', []), current.get('accounts', []),
+                              compare_ou=compare_ou)
+        if not any(delta.values()):
+            return None
+
+        record = {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'source': source,
+            'previous_update': previous.get('last_updated'),
+            **delta,
+        }
+        try:
+            with open(self.journal_path, 'a') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + "\n")
+        except OSError as exc:
+            self._print(f"Warning: unable to write change journal: {exc}", file=sys.stderr)
+            return record
+
+        summary = ", ".join(f"{len(items)} {kind.replace('_', ' ')}"
+                            for kind, items in delta.items() if items)
+        self._print(f"Organization changes: {summary}")
+        return record
+
+    def read_changes(self, since: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """Read records from the change journal, oldest first.
+
+        Args:
+            since: Only return records with a timestamp at or after this ISO 8601 value
+            limit: Only return the most recent ``limit`` records
+
+        Returns:
+            List[Dict]: Journal records
+        """
+        records = []
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since and record.get('timestamp', '') < since:
+                        continue
+                    records.append(record)
+        except OSError:
+            return []
+        return records[-limit:] if limit else records
+
     def _get_sso_token(self) -> Optional[str]:
         """Get SSO token from cache.
         
@@ -388,199 +1483,672 @@ class SSOConfigGenerator:
             Optional[str]: SSO access token if found, None otherwise
         """
         try:
-            # Get our sso_start_url from config
-            self.config.read(self.aws_config_path)
-            start_url = None
-            
-            if self.sso_session_section in self.config:
-                start_url = self.config[self.sso_session_section].get("sso_start_url")
-            elif "default" in self.config:
-                start_url = self.config["default"].get("sso_start_url")
+            now = datetime.datetime.now(datetime.timezone.utc)
+            for _, cache_data in self._iter_sso_token_cache():
+                # Check if token is not expired
+                if 'expiresAt' in cache_data:
+                    expires_dt = self._parse_token_expiry(cache_data['expiresAt'])
+                    if expires_dt is None or now > expires_dt:
+                        continue
 
-            if not start_url:
-                return None
+                # Return the accessToken from the matching, non-expired file
+                if 'accessToken' in cache_data:
+                    return cache_data['accessToken']
 
-            # SSO tokens are always cached in ~/.aws/sso/cache/ 
-            cache_dir = os.path.expanduser("~/.aws/sso/cache")
-            if not os.path.exists(cache_dir):
-                return None
-            
-            now = datetime.datetime.now(datetime.timezone.utc)
-            
-            for token_file in os.listdir(cache_dir):
-                if not token_file.endswith('.json'):
-                    continue
-                
-                try:
-                    with open(os.path.join(cache_dir, token_file)) as f:
-                        cache_data = json.load(f)
-                        
-                        # Check if this token is for our sso_start_url
-                        if cache_data.get('startUrl') != start_url:
-                            continue
-                        
-                        # Check if token is not expired
-                        expires_at = cache_data.get('expiresAt')
-                        if expires_at:
-                            if isinstance(expires_at, str):
-                                # ISO 8601 format (e.g. "2026-03-27T18:33:12Z")
-                                expires_dt = datetime.datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-                            elif isinstance(expires_at, (int, float)):
-                                # Milliseconds since epoch
-                                expires_dt = datetime.datetime.fromtimestamp(expires_at / 1000, datetime.timezone.utc)
-                            else:
-                                continue
-                            if now > expires_dt:
-                                continue
-                        
-                        # Return the accessToken from the matching, non-expired file
-                        if 'accessToken' in cache_data:
-                            return cache_data['accessToken']
-                except (json.JSONDecodeError, IOError):
-                    continue
-                    
             return None
             
         except Exception:
             return None
+
+    def _refresh_sso_token(self) -> Optional[str]:
+        """Obtain a new access token with the refresh token cached by ``aws sso login``.
+
+        Token files written for an ``[sso-session]`` contain the refresh token and
+        the client registration (``clientId``/``clientSecret``) it was issued to.
+        These are exchanged for a new access token via sso-oidc ``CreateToken``,
+        and the token file is updated atomically so the AWS CLI and SDKs pick up
+        the new token as well.  Legacy token files without a refresh token, and
+        expired client registrations, cannot be refreshed.
+
+        Returns:
+            Optional[str]: The new access token, or None when no refresh was possible
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        for path, cache_data in self._iter_sso_token_cache():
+            if not all(cache_data.get(k) for k in ('refreshToken', 'clientId', 'clientSecret')):
+                continue
+            registration_expiry = self._parse_token_expiry(cache_data.get('registrationExpiresAt'))
+            if registration_expiry is not None and now > registration_expiry:
+                continue
+
+            region = cache_data.get('region')
+            oidc = self._client('sso-oidc', region) if region else self.sso_oidc
+            try:
+                response = oidc.create_token(
+                    grantType='refresh_token',
+                    clientId=cache_data['clientId'],
+                    clientSecret=cache_data['clientSecret'],
+                    refreshToken=cache_data['refreshToken'],
+                )
+            except Exception as exc:
+                self._print(f"Unable to refresh the SSO token: {exc}", file=sys.stderr)
+                continue
+
+            expires_at = now + datetime.timedelta(seconds=response.get('expiresIn', 3600))
+            cache_data['accessToken'] = response['accessToken']
+            cache_data['expiresAt'] = expires_at.strftime('%Y-%m-%dT%H:%M:%SZ')
+            if response.get('refreshToken'):
+                cache_data['refreshToken'] = response['refreshToken']
+
+            try:
+                tmp_path = f"{path}.tmp"
+                fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(cache_data, f)
+                os.replace(tmp_path, path)
+            except OSError as exc:
+                self._print(f"Warning: unable to update SSO token cache: {exc}", file=sys.stderr)
+
+            self._print(f"Refreshed SSO access token (valid until {cache_data['expiresAt']})")
+            return cache_data['accessToken']
+
+        return None
+
+    def _iter_sso_token_cache(self) -> Iterator[Tuple[str, Dict]]:
+        """Yield ``(path, data)`` for cached SSO tokens that belong to our sso_start_url."""
+        # Get our sso_start_url from config
+        self.config.read(self.aws_config_path)
+        start_url = None
+
+        if self.sso_session_section in self.config:
+            start_url = self.config[self.sso_session_section].get("sso_start_url")
+        elif "default" in self.config:
+            start_url = self.config["default"].get("sso_start_url")
+
+        if not start_url:
+            return
+
+        # SSO tokens are always cached in ~/.aws/sso/cache/
+        cache_dir = os.path.expanduser("~/.aws/sso/cache")
+        if not os.path.exists(cache_dir):
+            return
+
+        for token_file in os.listdir(cache_dir):
+            if not token_file.endswith('.json'):
+                continue
+            path = os.path.join(cache_dir, token_file)
+            try:
+                with open(path) as f:
+                    cache_data = json.load(f)
+            except (json.JSONDecodeError, IOError):
+                continue
+            # Check if this token is for our sso_start_url
+            if isinstance(cache_data, dict) and cache_data.get('startUrl') == start_url:
+                yield path, cache_data
+
+    def _parse_token_expiry(self, expires_at) -> Optional[datetime.datetime]:
+        """Parse an expiry from the SSO token cache into an aware UTC datetime."""
+        if isinstance(expires_at, str):
+            # ISO 8601 format (e.g. "2026-03-27T18:33:12Z")
+            return datetime.datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
+        if isinstance(expires_at, (int, float)):
+            # Milliseconds since epoch
+            return datetime.datetime.fromtimestamp(expires_at / 1000, datetime.timezone.utc)
+        return None
             
     def _ensure_sso_auth(self) -> bool:
         """Ensure SSO authentication is valid via sso-browser profile.
         
         SSO APIs require explicit access tokens, so we extract from the cache.
+        An expired token is refreshed with the cached refresh token when possible.
+        A check that does not finish before the deadline counts as failed.
         
         Returns:
             bool: True if authenticated, False otherwise
         """
         try:
-            # Try to get token from cache first
-            self.access_token = self._get_sso_token()
-            if self.access_token:
-                try:
-                    # Test if token is valid
-                    self.sso.list_accounts(accessToken=self.access_token)
-                    return True
-                except Exception:
-                    self.access_token = None
-
-            print("\nNo valid SSO session found. Please run:\n")
-            print(f"aws sso login --profile {self.profile_name}")
-            print("\nThen try again.\n")
+            # Try to get token from cache first, then refresh an expired one
+            for get_token in (self._get_sso_token, self._refresh_sso_token):
+                self.access_token = self._bounded(get_token)
+                if self.access_token:
+                    try:
+                        # Test if token is valid
+                        self._bounded(lambda: self.sso.list_accounts(accessToken=self.access_token))
+                        return True
+                    except _DeadlineReached:
+                        raise
+                    except Exception:
+                        self.access_token = None
+
+            self._print("\nNo valid SSO session found. Please run:\n")
+            self._print(f"aws sso login --profile {self.profile_name}")
+            self._print("\nThen try again.\n")
             return False
             
+        except _DeadlineReached:
+            self.access_token = None
+            self.degraded.append("the SSO session check did not finish")
+            return False
         except Exception as e:
-            print(f"\nError checking SSO auth: {str(e)}\n")
+            self._print(f"\nError checking SSO auth: {str(e)}\n")
             return False
 
-    def _build_accounts_cache(self) -> Optional[List[Dict]]:
+    def _build_accounts_cache(self, on_account: Optional[Callable[[Account], None]] = None
+                              ) -> Optional[List[Account]]:
         """Build account and OU structure cache.
+
+        Accounts are streamed from the ``list_accounts`` paginator through OU/role
+        enrichment; each finished account is appended to the checkpoint file
+        (``<cache>.partial``) and handed to ``on_account`` immediately.  Once
+        discovery is complete the accounts are put back in ``list_accounts`` order
+        and the cache is written.
+
+        When an earlier rebuild was interrupted, discovery resumes from its
+        checkpoint: accounts found before are reused and listing continues at the
+        last ``list_accounts`` page whose accounts were all processed.  Reaching
+        the deadline interrupts discovery the same way: the accounts discovered
+        so far are served, completed with the expired cache, and the checkpoint
+        lets the next run continue.
         
+        Args:
+            on_account: Called with each account as soon as it has been enriched
+
         Returns:
-            Optional[List[Dict]]: List of account information if successful, None otherwise
+            Optional[List[Account]]: List of accounts if successful, None otherwise
         """
         try:
-            print("Building OU structure cache...")
+            self._print("Building OU structure cache...")
             
             # Ensure SSO auth is valid
             if not self._ensure_sso_auth():
+                if self._deadline_passed():
+                    return self._accounts_at_deadline(Organization(), {})
                 return None
                 
+            checkpoint = self._load_checkpoint()
+            if checkpoint:
+                self._print(f"Resuming interrupted discovery from {self.checkpoint_path} "
+                      f"({len(checkpoint['entries'])} account(s) already discovered)")
+                ou_tree = checkpoint['ou_tree']
+                self.org_client = self._client('organizations') if self.use_ou_structure else None
             # Initialize Organizations client if needed
-            if self.use_ou_structure:
+            elif self.use_ou_structure:
                 try:
-                    self.org_client = self.session.client('organizations')
-                    roots = self.org_client.list_roots()['Roots']
-                    if not roots:
-                        raise Exception("No organization root found")
-                    root_id = roots[0]['Id']
-                    ou_tree = self._build_ou_tree(root_id)
+                    self.org_client = self._client('organizations')
+                    ou_tree = self._get_ou_tree()
+                except _DeadlineReached:
+                    raise
                 except ClientError as err:
                     error_code = err.response.get('Error', {}).get('Code')
                     if error_code in {"AccessDeniedException", "AccessDenied"}:
-                        print("\nAccess denied while reading AWS Organizations (ListRoots)."
+                        self._print("\nAccess denied while reading AWS Organizations (ListRoots)."
                               " Verify that the IAM role in sso-browser account has permissions:"
                               " organizations:ListRoots, organizations:ListOrganizationalUnitsForParent,"
                               " organizations:DescribeOrganizationalUnit, organizations:ListParents."
                               " Falling back to flat directory layout.\n")
                     else:
-                        print(f"\nUnable to read AWS Organizations data ({error_code})."
+                        self._print(f"\nUnable to read AWS Organizations data ({error_code})."
                               " Falling back to flat directory layout.\n")
                     self.use_ou_structure = False
                     self.org_client = None
                     ou_tree = None
                 except Exception as err:
-                    print(f"\nError while building OU tree: {err}"
+                    self._print(f"\nError while building OU tree: {err}"
                           "\nFalling back to flat directory layout.\n")
                     self.use_ou_structure = False
                     self.org_client = None
                     ou_tree = None
             else:
+                self.org_client = None
                 ou_tree = None
             
+            self._bounded(self._prepare_role_discovery)
+
             # Get all accounts using sso-browser profile (requires explicit token for SSO APIs)
-            accounts = []
-            paginator = self.sso.get_paginator('list_accounts')
+            org = Organization()
+            order: Dict[str, int] = {}
+            negative: List[Dict] = []  # accounts without roles, cached with a status
+
+            def add(index: int, entry: Dict) -> None:
+                order[entry['id']] = index
+                if not entry['roles']:
+                    negative.append(entry)
+                    return
+                account = org.add_entry(entry)
+                if on_account:
+                    on_account(account)
+
+            with self._open_checkpoint(checkpoint, ou_tree) as partial:
+                def page_done(next_token: str, next_index: int) -> None:
+                    partial.write(json.dumps({'page': {'next_token': next_token,
+                                                       'next_index': next_index}}) + "\n")
+                    partial.flush()
+                    os.fsync(partial.fileno())
+
+                resume = checkpoint or {}
+                for index, entry in sorted(resume.get('entries', {}).values(), key=lambda e: e[0]):
+                    add(index, entry)
+                try:
+                    for index, entry in self._iter_discovered_accounts(
+                            resume.get('next_token'), resume.get('next_index', 0),
+                            skip=set(order), on_page=page_done):
+                        partial.write(json.dumps({'index': index, 'account': entry}) + "\n")
+                        partial.flush()
+                        add(index, entry)
+                except _DeadlineReached:
+                    return self._accounts_at_deadline(org, order)
+
+            # Restore list_accounts order so the cache and config stay stable
+            org.accounts.sort(key=lambda a: order[a.id])
+            accounts = org.accounts
+            if negative:
+                self._print(f"{len(negative)} account(s) without accessible roles cached as unavailable")
             
-            for page in paginator.paginate(accessToken=self.access_token):
+            if not accounts:
+                os.remove(self.checkpoint_path)
+                self._print("No accessible accounts found", file=sys.stderr)
+                return None
+                
+            # Save to cache
+            previous = self._load_cache_data()
+            now = datetime.datetime.now().isoformat()
+            cache_data = {
+                'ou_tree': ou_tree,
+                'accounts': sorted(org.to_cache() + negative, key=lambda e: order[e['id']]),
+                'last_updated': now,
+                'use_ou_structure': self.use_ou_structure,
+                'segments': {'ou_tree': now, 'placement': now, 'account_list': now},
+            }
+            
+            self._write_json_atomic(self.ou_cache_path, cache_data)
+            os.remove(self.checkpoint_path)
+            if previous:
+                self._record_changes(previous, cache_data, 'rebuild')
+                
+            return accounts
+            
+        except _DeadlineReached:
+            return self._accounts_at_deadline(Organization(), {})
+        except Exception as e:
+            self._print(f"Error building cache: {str(e)}", file=sys.stderr)
+            if os.path.exists(self.checkpoint_path):
+                self._print("Discovery progress has been checkpointed; the next run resumes from it.",
+                      file=sys.stderr)
+            return None
+
+    def _accounts_at_deadline(self, org: Organization, order: Dict[str, int]) -> Optional[List[Account]]:
+        """Serve the accounts discovered before the deadline, completed from the expired cache.
+
+        The cache file itself is left alone; the checkpoint holds the progress,
+        so the next run continues discovery where this one stopped.
+
+        Args:
+            org: Accounts discovered so far (with roles)
+            order: ``list_accounts`` position of every account discovered so far
+
+        Returns:
+            Optional[List[Account]]: Accounts to serve, or None when there are none
+        """
+        discovered = {entry['id']: entry for entry in org.to_cache()}
+        previous = self._load_cache_data() or {'accounts': []}
+        served = Organization()
+        reused = 0
+        for entry in previous['accounts']:
+            if entry['id'] in order:
+                # Discovered again: a fresh entry, or none when it has no roles anymore
+                entry = discovered.pop(entry['id'], None)
+            elif entry.get('roles'):
+                reused += 1
+            if entry and entry.get('roles'):
+                served.add_entry(entry)
+        for entry in sorted(discovered.values(), key=lambda e: order[e['id']]):
+            served.add_entry(entry)
+
+        note = f"account discovery stopped after {len(order)} account(s)"
+        if reused:
+            note += f"; {reused} account(s) served from the expired cache"
+        self.degraded.append(note)
+        if os.path.exists(self.checkpoint_path):
+            self.degraded.append(f"discovery progress is checkpointed in {self.checkpoint_path}")
+        if not served.accounts:
+            self._print("Deadline reached before any account was discovered", file=sys.stderr)
+            return None
+        return served.accounts
+
+    def _load_checkpoint(self) -> Optional[Dict]:
+        """Read the checkpoint of an interrupted cache rebuild.
+
+        The checkpoint file holds one JSON record per line: a header with the
+        OU tree and build flags, one record per discovered account and, after
+        every ``list_accounts`` page whose accounts have all been processed, the
+        token of the next page.  A truncated last line (e.g. after a crash) is
+        ignored.  Checkpoints built with other flags, or older than the account
+        list TTL, are discarded.
+
+        Returns:
+            Optional[Dict]: ``ou_tree``, ``entries`` (account id -> ``(index, entry)``),
+            ``next_token`` and ``next_index``, or None when there is nothing to resume
+        """
+        try:
+            with open(self.checkpoint_path) as f:
+                lines = f.readlines()
+        except OSError:
+            return None
+
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        header = records[0].get('checkpoint') if records and isinstance(records[0], dict) else None
+        if not header or header.get('use_ou_structure') != self.use_ou_structure:
+            return None
+        try:
+            started = datetime.datetime.fromisoformat(header['started_at'])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if datetime.datetime.now() - started > self.cache_ttls['account_list']:
+            return None
+
+        checkpoint = {'ou_tree': header.get('ou_tree'), 'started_at': header['started_at'],
+                      'entries': {}, 'next_token': None, 'next_index': 0}
+        for record in records[1:]:
+            if 'account' in record:
+                checkpoint['entries'][record['account']['id']] = (record['index'], record['account'])
+            elif 'page' in record:
+                checkpoint['next_token'] = record['page']['next_token']
+                checkpoint['next_index'] = record['page']['next_index']
+        return checkpoint
+
+    def _open_checkpoint(self, checkpoint: Optional[Dict], ou_tree: Optional[Dict]):
+        """Open the checkpoint file for appending discovery progress.
+
+        A new checkpoint starts with a header record.  When resuming, the
+        checkpoint is first rewritten without any truncated records so that new
+        records can safely be appended.
+        """
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        header = {'checkpoint': {
+            'started_at': checkpoint['started_at'] if checkpoint else datetime.datetime.now().isoformat(),
+            'use_ou_structure': self.use_ou_structure,
+            'ou_tree': ou_tree,
+        }}
+        records = [header]
+        if checkpoint:
+            records += [{'index': index, 'account': entry}
+                        for index, entry in checkpoint['entries'].values()]
+            if checkpoint['next_token']:
+                records.append({'page': {'next_token': checkpoint['next_token'],
+                                         'next_index': checkpoint['next_index']}})
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.writelines(json.dumps(record) + "\n" for record in records)
+        os.replace(tmp_path, self.checkpoint_path)
+        return open(self.checkpoint_path, 'a')
+
+    def _iter_discovered_accounts(self, start_token: Optional[str] = None, start_index: int = 0,
+                                  skip: AbstractSet[str] = frozenset(),
+                                  on_page: Optional[Callable[[str, int], None]] = None
+                                  ) -> Iterator[Tuple[int, Dict]]:
+        """Yield accounts from ``list_accounts`` as soon as their OU path and roles are known.
+
+        Enrichment runs on a pool of ``max_workers`` threads while the paginator
+        keeps feeding it, so slow accounts do not hold back the rest.  Results are
+        yielded in completion order as ``(index, entry)`` where ``index`` is the
+        position in the ``list_accounts`` output.
+
+        Args:
+            start_token: ``list_accounts`` token to resume listing at; when AWS no
+                longer accepts it, listing starts from the beginning
+            start_index: Position of the first account of the ``start_token`` page
+            skip: IDs of accounts that have already been discovered
+            on_page: Called with the next page token and the index of its first
+                account once every account of the pages before it has been yielded
+
+        Yields:
+            Tuple[int, Dict]: One cache entry per account, including accounts
+            without any roles (see _discover_account)
+
+        Raises:
+            _DeadlineReached: When the deadline passes before all accounts were yielded
+        """
+        pending = {}
+        boundaries: List[Tuple[str, int]] = []  # (next page token, index of its first account)
+
+        def pages_done():
+            # Report pages whose accounts have all been yielded
+            lowest = min(pending.values(), default=None)
+            while boundaries and (lowest is None or lowest >= boundaries[0][1]):
+                token, first = boundaries.pop(0)
+                if on_page:
+                    on_page(token, first)
+
+        def finished(return_when):
+            done, _ = wait(pending, timeout=self._time_left(), return_when=return_when)
+            for future in done:
+                index = pending.pop(future)
+                yield index, future.result()
+            pages_done()
+            if pending:
+                self._check_deadline()
+
+        pool = DaemonThreadPool(self.max_workers)
+        pages = self._list_account_pages(start_token)
+        try:
+            index = start_index
+            while True:
+                page = self._bounded(next, pages, _END_OF_PAGES)
+                if page is _END_OF_PAGES:
+                    break
+                if page is None:
+                    # The resume token was rejected; list everything again
+                    index = 0
+                    continue
                 for account in page['accountList']:
-                    # Get account OU path if using OU structure
-                    ou_path = self._get_account_ou_path(account['accountId']) if self.use_ou_structure else "/"
-                    roles = self._get_account_roles(account['accountId'])
-                    
-                    if roles:
-                        account_info = {
-                            'id': account['accountId'],
-                            'name': account['accountName'],
-                            'ou_path': ou_path,
-                            'roles': roles
-                        }
-                        accounts.append(account_info)
-            
-            if not accounts:
-                print("No accessible accounts found", file=sys.stderr)
-                return None
-                
-            # Save to cache
-            cache_data = {
-                'ou_tree': ou_tree,
-                'accounts': accounts,
-                'last_updated': datetime.datetime.now().isoformat(),
-                'use_ou_structure': self.use_ou_structure,
-            }
-            
-            os.makedirs(os.path.dirname(self.ou_cache_path), exist_ok=True)
-            with open(self.ou_cache_path, 'w') as f:
-                json.dump(cache_data, f, indent=2)
-                
-            return accounts
-            
-        except Exception as e:
-            print(f"Error building cache: {str(e)}", file=sys.stderr)
-            return None
-            
+                    if account['accountId'] not in skip:
+                        future = pool.submit(self._discover_account,
+                                             account['accountId'], account['accountName'])
+                        pending[future] = index
+                    index += 1
+                    # Bound the number of in-flight accounts
+                    if len(pending) >= 2 * self.max_workers:
+                        yield from finished(FIRST_COMPLETED)
+                if page.get('nextToken'):
+                    boundaries.append((page['nextToken'], index))
+                    pages_done()
+                    self._check_deadline()
+            while pending:
+                yield from finished(FIRST_COMPLETED)
+        finally:
+            # Past the deadline, lookups still in flight are abandoned rather than awaited
+            pool.shutdown(wait=not self._deadline_passed(), cancel_futures=True)
+
+
+    def _list_account_pages(self, start_token: Optional[str] = None) -> Iterator[Optional[Dict]]:
+        """Yield ``list_accounts`` pages, optionally starting at a saved page token.
+
+        When the saved token is rejected, ``None`` is yielded once and listing
+        restarts from the first page.
+        """
+        paginator = self.sso.get_paginator('list_accounts')
+        if start_token:
+            pages = iter(paginator.paginate(accessToken=self.access_token,
+                                            PaginationConfig={'StartingToken': start_token}))
+            try:
+                first = next(pages, None)
+            except ClientError as err:
+                self._print(f"Unable to resume account listing ({err.response.get('Error', {}).get('Code')}); "
+                      "listing all accounts again")
+                yield None
+            else:
+                if first is not None:
+                    yield first
+                    yield from pages
+                return
+        yield from paginator.paginate(accessToken=self.access_token)
+
+    def _discover_account(self, account_id: str, account_name: str) -> Dict:
+        """Look up the OU path and available roles of a single account.
+
+        Args:
+            account_id: AWS account ID
+            account_name: AWS account name
+
+        Returns:
+            Dict: Cache entry for the account.  Accounts without roles are negative
+            entries whose ``status`` says why (see _lookup_account_roles).
+        """
+        ou_path = self._get_account_ou_path(account_id)
+        roles, status = self._lookup_account_roles(account_id)
+        entry = {
+            'id': account_id,
+            'name': account_name,
+            'ou_path': ou_path,
+            'roles': roles,
+            'checked_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        if status:
+            entry['status'] = status
+        if self.tag_enrichment and roles:
+            self._apply_tags(entry, *self._lookup_account_tags(account_id))
+        return entry
+
+    def _lookup_account_tags(self, account_id: str) -> Tuple[Dict[str, str], Optional[str]]:
+        """Get the Organizations tags of an account, classifying failures.
+
+        Requests of all threads together are limited to ``tags_rate_limit`` per
+        second, which keeps a large organization below the Organizations API
+        throttling limits.
+
+        Args:
+            account_id: AWS account ID
+
+        Returns:
+            Tuple[Dict[str, str], Optional[str]]: Tags and None, or an empty dict and
+            one of ``access_denied``, ``throttled`` or ``error``
+        """
+        try:
+            client = self._client('organizations')
+            tags: Dict[str, str] = {}
+            kwargs = {'ResourceId': account_id}
+            while True:
+                self._tags_rate_limiter.wait()
+                response = client.list_tags_for_resource(**kwargs)
+                tags.update((tag['Key'], tag['Value']) for tag in response['Tags'])
+                if not response.get('NextToken'):
+                    return tags, None
+                kwargs['NextToken'] = response['NextToken']
+        except ClientError as err:
+            error_code = err.response.get('Error', {}).get('Code')
+            if error_code in _THROTTLING_ERRORS:
+                return {}, 'throttled'
+            if error_code in {"AccessDeniedException", "AccessDenied"}:
+                return {}, 'access_denied'
+            return {}, 'error'
+        except Exception:
+            return {}, 'error'
+
+    def _apply_tags(self, entry: Dict, tags: Dict[str, str], status: Optional[str]) -> None:
+        """Store a tag lookup in a cache entry; failed lookups keep the previous tags."""
+        entry['tags_checked_at'] = datetime.datetime.now().isoformat(timespec='seconds')
+        entry.pop('tags_status', None)
+        if status:
+            entry['tags_status'] = status
+            entry.setdefault('tags', {})
+        else:
+            entry['tags'] = tags
+
+    def _write_json_atomic(self, path: str, data: Dict) -> None:
+        """Write JSON data to path via a temporary file and an atomic rename."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+            
+    def _get_ou_tree(self) -> Dict:
+        """Return the OU tree, from the shared cache when it holds a fresh one.
+
+        When the shared tree expired it is rebuilt under the shared cache's
+        exclusive lock, so concurrent users of the host build it only once.
+        """
+        ttl = self.cache_ttls['ou_tree']
+        if self.shared_cache:
+            try:
+                ou_tree = self.shared_cache.ou_tree(ttl)
+                if ou_tree:
+                    self._print(f"Using OU tree from shared cache {self.shared_cache.path}")
+                    return ou_tree
+                with self.shared_cache.rebuilding_ou_tree(ttl) as ou_tree:
+                    if ou_tree:
+                        self._print(f"Using OU tree from shared cache {self.shared_cache.path}")
+                        return ou_tree
+                    ou_tree = self._list_ou_tree()
+                    try:
+                        self.shared_cache.store_ou_tree(ou_tree)
+                    except SharedCacheError as exc:
+                        self._disable_shared_cache(exc)
+                    return ou_tree
+            except SharedCacheError as exc:
+                self._disable_shared_cache(exc)
+        return self._list_ou_tree()
+
+    def _list_ou_tree(self) -> Dict:
+        """Build the OU tree from the organization root."""
+        roots = self._bounded(self.org_client.list_roots)['Roots']
+        if not roots:
+            raise Exception("No organization root found")
+        return self._build_ou_tree(roots[0]['Id'])
+
     def _build_ou_tree(self, parent_id: str, path: str = "/") -> Dict:
-        """Recursively build OU tree structure.
+        """Build OU tree structure breadth-first.
+
+        The tree is built level by level: the children of every OU on a level are
+        listed concurrently (at most ``max_workers`` calls in flight), so build time
+        grows with the depth of the organization rather than with its number of
+        OUs.  Children keep the order in which Organizations returns them, giving
+        the same tree as a depth-first walk.
         
         Args:
-            parent_id: Parent OU ID
-            path: Current path in OU tree
+            parent_id: ID of the root (or OU) to start from
+            path: Path of that root in the OU tree
             
         Returns:
             Dict: OU tree structure
         """
         tree = {'id': parent_id, 'path': path, 'children': []}
-        
-        paginator = self.org_client.get_paginator('list_organizational_units_for_parent')
-        for page in paginator.paginate(ParentId=parent_id):
-            for ou in page['OrganizationalUnits']:
-                ou_path = f"{path}{ou['Name']}/"
-                child_tree = self._build_ou_tree(ou['Id'], ou_path)
-                tree['children'].append(child_tree)
+
+        level = [tree]
+        while level:
+            next_level = []
+            children, = self._run_concurrently(
+                (self._list_child_ous, [(node['id'],) for node in level]))
+            if None in children:
+                raise _DeadlineReached()
+            for node, ous in zip(level, children):
+                for ou in ous:
+                    child_tree = {'id': ou['Id'], 'path': f"{node['path']}{ou['Name']}/",
+                                  'children': []}
+                    node['children'].append(child_tree)
+                    next_level.append(child_tree)
+            level = next_level
                 
         return tree
+
+    def _list_child_ous(self, parent_id: str) -> List[Dict]:
+        """List the OUs directly below a parent, in the order Organizations returns them."""
+        ous = []
+        paginator = self.org_client.get_paginator('list_organizational_units_for_parent')
+        for page in paginator.paginate(ParentId=parent_id):
+            ous.extend(page['OrganizationalUnits'])
+        return ous
         
     def _get_account_ou_path(self, account_id: str) -> str:
         """Get OU path for an account.
+
+        A fresh placement in the shared cache is used as is; placements looked up
+        in AWS are recorded for the shared cache.
         
         Args:
             account_id: AWS account ID
@@ -591,6 +2159,16 @@ class SSOConfigGenerator:
         if not self.org_client:
             return "/"
 
+        shared_cache = self.shared_cache
+        if shared_cache:
+            try:
+                ou_path = shared_cache.placement(account_id, self.cache_ttls['placement'])
+            except SharedCacheError as exc:
+                self._disable_shared_cache(exc)
+                shared_cache = ou_path = None
+            if ou_path is not None:
+                return ou_path
+
         try:
             parents = self.org_client.list_parents(ChildId=account_id)['Parents']
             if not parents:
@@ -611,20 +2189,79 @@ class SSOConfigGenerator:
                     
                 parent_id = parents[0]['Id']
                 
-            return "/" + "/".join(path_parts) + "/"
+            ou_path = "/" + "/".join(path_parts) + "/"
             
         except Exception:
             return "/"
+
+        if shared_cache:
+            shared_cache.record_placement(account_id, ou_path)
+        return ou_path
             
-    def _get_account_roles(self, account_id: str) -> List[str]:
-        """Get available roles for an account.
-        
+    def _find_sso_accounts(self, selectors: Sequence[str]) -> Dict[str, str]:
+        """Look up accounts by ID or name via SSO list_accounts.
+
+        Args:
+            selectors: Account IDs or (sanitized) account names
+
+        Returns:
+            Dict[str, str]: Matching account IDs mapped to account names
+        """
+        wanted = set(selectors)
+        found = {}
+        paginator = self.sso.get_paginator('list_accounts')
+        for page in paginator.paginate(accessToken=self.access_token):
+            for account in page['accountList']:
+                name = account['accountName']
+                if wanted & {account['accountId'], name, self._sanitize_path(name)}:
+                    found[account['accountId']] = name
+        return found
+
+    def _find_ou_tree_node(self, tree: Optional[Dict], path: str) -> Optional[Dict]:
+        """Return the node with the given path from a cached OU tree."""
+        if not tree:
+            return None
+        if tree['path'] == path:
+            return tree
+        for child in tree['children']:
+            if path.startswith(child['path']):
+                return self._find_ou_tree_node(child, path)
+        return None
+
+    def _list_ou_subtree_accounts(self, node: Dict) -> Dict[str, str]:
+        """List the accounts Organizations places in an OU subtree.
+
+        Args:
+            node: Node of the cached OU tree
+
+        Returns:
+            Dict[str, str]: Account IDs mapped to account names
+        """
+        accounts = {}
+        paginator = self.org_client.get_paginator('list_accounts_for_parent')
+        for page in paginator.paginate(ParentId=node['id']):
+            for account in page['Accounts']:
+                accounts[account['Id']] = account['Name']
+        for child in node['children']:
+            accounts.update(self._list_ou_subtree_accounts(child))
+        return accounts
+
+    def _lookup_account_roles(self, account_id: str) -> Tuple[List[str], Optional[str]]:
+        """Get available roles for an account, classifying why there are none.
+
         Args:
             account_id: AWS account ID
-            
+
         Returns:
-            List[str]: List of role names
+            Tuple[List[str], Optional[str]]: Role names and None, or an empty list and
+            one of ``no_roles``, ``access_denied``, ``throttled`` or ``error``
         """
+        if self._admin_roles is not None and account_id in self._admin_roles:
+            return self._admin_roles[account_id], None
+        # Accounts missing from the admin map, such as the management account
+        # whose assignments a delegated administrator cannot see, are looked up
+        # with the user's own token
+
         try:
             roles = []
             paginator = self.sso.get_paginator('list_account_roles')
@@ -632,17 +2269,144 @@ class SSOConfigGenerator:
             for page in paginator.paginate(accountId=account_id, accessToken=self.access_token):
                 roles.extend([role['roleName'] for role in page['roleList']])
                 
-            return roles
-            
+            return roles, (None if roles else 'no_roles')
+
+        except ClientError as err:
+            error_code = err.response.get('Error', {}).get('Code')
+            if error_code in _THROTTLING_ERRORS:
+                return [], 'throttled'
+            if error_code in {"AccessDeniedException", "ForbiddenException"}:
+                return [], 'access_denied'
+            return [], 'error'
         except Exception:
-            return []
+            return [], 'error'
+
+    def _prepare_role_discovery(self) -> None:
+        """Set up bulk role discovery before many accounts are looked up.
+
+        With ``role_discovery="admin"`` the caller's account-to-role map is built
+        once via the Identity Center admin APIs and then served to
+        _lookup_account_roles without further calls; accounts missing from it are
+        still looked up per account.  Otherwise, or when those APIs are not
+        accessible, roles are looked up per account.
+        """
+        self._admin_roles = None
+        if self.role_discovery != "admin":
+            return
+        try:
+            self._admin_roles = self._discover_roles_via_admin()
+        except ClientError as err:
+            error_code = err.response.get('Error', {}).get('Code')
+            self._print(f"Identity Center admin APIs not accessible ({error_code});"
+                  " falling back to per-account role discovery.")
+        except Exception as err:
+            self._print(f"Bulk role discovery failed ({err});"
+                  " falling back to per-account role discovery.")
+
+    def _discover_roles_via_admin(self) -> Dict[str, List[str]]:
+        """Build the caller's account-to-role map with the Identity Center admin APIs.
+
+        Instead of one ``list_account_roles`` per account this needs a number of
+        calls proportional to the number of permission sets assigned to the
+        caller (the SSO user behind the authentication profile, directly or via
+        group membership): their assignments are listed, and only the permission
+        sets named there are described, with
+        ``ListAccountsForProvisionedPermissionSet`` telling where each is
+        provisioned.
+
+        Returns:
+            Dict[str, List[str]]: Account IDs mapped to role (permission set) names
+
+        Raises:
+            ClientError: When the admin APIs are not accessible
+        """
+        self._print("Discovering roles via Identity Center admin APIs...")
+        sso_admin = self._client('sso-admin')
+        identity_store = self._client('identitystore')
+
+        instance = sso_admin.list_instances()['Instances'][0]
+        instance_arn = instance['InstanceArn']
+        store_id = instance['IdentityStoreId']
+
+        # The role session name of an SSO role is the user's userName
+        caller_arn = self._client('sts').get_caller_identity()['Arn']
+        user_name = caller_arn.rsplit('/', 1)[-1]
+        user_id = identity_store.get_user_id(
+            IdentityStoreId=store_id,
+            AlternateIdentifier={'UniqueAttribute': {'AttributePath': 'userName',
+                                                     'AttributeValue': user_name}},
+        )['UserId']
+        principals = [(user_id, 'USER')]
+        paginator = identity_store.get_paginator('list_group_memberships_for_member')
+        for page in paginator.paginate(IdentityStoreId=store_id, MemberId={'UserId': user_id}):
+            principals.extend((m['GroupId'], 'GROUP') for m in page['GroupMemberships'])
+
+        assigned = set()
+        paginator = sso_admin.get_paginator('list_account_assignments_for_principal')
+        for principal_id, principal_type in principals:
+            for page in paginator.paginate(InstanceArn=instance_arn, PrincipalId=principal_id,
+                                           PrincipalType=principal_type):
+                assigned.update((a['AccountId'], a['PermissionSetArn'])
+                                for a in page['AccountAssignments'])
+
+        permission_set_arns = sorted({arn for _, arn in assigned})
+
+        def describe(arn: str) -> Tuple[str, List[str]]:
+            name = sso_admin.describe_permission_set(
+                InstanceArn=instance_arn, PermissionSetArn=arn)['PermissionSet']['Name']
+            accounts = []
+            pages = sso_admin.get_paginator('list_accounts_for_provisioned_permission_set')
+            for page in pages.paginate(InstanceArn=instance_arn, PermissionSetArn=arn):
+                accounts.extend(page['AccountIds'])
+            return name, accounts
+
+        roles: Dict[str, List[str]] = {}
+        # Daemon threads: this may run on a call abandoned at the deadline (see _bounded)
+        pool = DaemonThreadPool(self.max_workers)
+        try:
+            described = [pool.submit(describe, arn) for arn in permission_set_arns]
+            for arn, future in zip(permission_set_arns, described):
+                name, accounts = future.result()
+                for account_id in accounts:
+                    if (account_id, arn) in assigned:
+                        roles.setdefault(account_id, []).append(name)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        self._print(f"Found {sum(len(r) for r in roles.values())} role assignment(s) in "
+              f"{len(roles)} account(s) across {len(permission_set_arns)} permission set(s)")
+        return roles
+
+    def _negative_entry_expired(self, entry: Dict, now: datetime.datetime) -> bool:
+        """Return True when a cached entry with a failed lookup should be checked again.
+
+        These are entries without roles and entries that kept their roles after a
+        failed lookup (see _update_cache_segments).
+
+        ``no_roles`` and ``access_denied`` entries live for ``negative_cache_ttl``;
+        transient failures (``throttled``, ``error``) for ``error_cache_ttl``.
+        Entries without a status or timestamp (older caches) are always expired.
+        """
+        status = entry.get('status')
+        checked_at = entry.get('checked_at')
+        if status not in _NEGATIVE_STATUSES or not checked_at:
+            return True
+        ttl = self.negative_cache_ttl if status in {'no_roles', 'access_denied'} else self.error_cache_ttl
+        try:
+            return now - datetime.datetime.fromisoformat(checked_at) > ttl
+        except ValueError:
+            return True
             
-    def _generate_aws_config(self, sso_info: Dict, accounts: List[Dict]) -> bool:
+    def _generate_aws_config(self, sso_info: Dict, accounts: List[Account],
+                             final: bool = True) -> bool:
         """Generate AWS CLI config file.
         
         Args:
             sso_info: SSO configuration information
             accounts: List of account information
+            final: False for the intermediate writes while accounts are streamed in,
+                which keep the profiles of the previous block; the final write
+                replaces the block and updates the shell completion index
             
         Returns:
             bool: True if successful, False otherwise
@@ -650,6 +2414,7 @@ class SSOConfigGenerator:
         try:
             # Read existing config if it exists
             existing_config = ""
+            managed_block = ""
             start_marker = "# BEGIN SSO-CONFIG-GENERATOR MANAGED BLOCK"
             end_marker = "# END SSO-CONFIG-GENERATOR MANAGED BLOCK"
             
@@ -661,6 +2426,10 @@ class SSOConfigGenerator:
                 if start_marker in existing_config and end_marker in existing_config:
                     before_marker = existing_config.split(start_marker)[0]
                     after_marker = existing_config.split(end_marker)[1]
+                    # The newline ending the marker line is written with the marker
+                    if after_marker.startswith("\n"):
+                        after_marker = after_marker[1:]
+                    managed_block = existing_config.split(start_marker)[1].split(end_marker)[0]
                 else:
                     before_marker = existing_config
                     after_marker = ""
@@ -680,15 +2449,44 @@ class SSOConfigGenerator:
                 }
             
             # Add profile for each account/role combination
+            owners: Dict[str, Account] = {}
             for account in accounts:
-                for role in account['roles']:
-                    profile_name = f"{role}@{self._sanitize_path(account['name'])}"
+                for role in account.roles:
+                    profile_name = self._profile_name(account, role)
+                    owner = owners.setdefault(profile_name, account)
+                    if owner is not account:
+                        # Two accounts with the same alias, or a template without
+                        # {account_id}: the first account keeps the profile
+                        if final:
+                            self._print(f"Warning: profile '{profile_name}' of account "
+                                        f"'{account.name}' ({account.id}) is also the name of a "
+                                        f"profile of '{owner.name}' ({owner.id}) — skipped",
+                                        file=sys.stderr)
+                        continue
+                    if self.credential_process:
+                        # The SSO provider takes precedence over credential_process,
+                        # so the sso_* keys must be left out
+                        config[f"profile {profile_name}"] = {
+                            'credential_process': self._credential_process_command(account.id, role),
+                            'region': self._account_region(account)
+                        }
+                        continue
                     config[f"profile {profile_name}"] = {
                         'sso_session': self.sso_session_name,
-                        'sso_account_id': account['id'],
+                        'sso_account_id': account.id,
                         'sso_role_name': role,
-                        'region': self.region
+                        'region': self._account_region(account)
                     }
+
+            if not final:
+                # Keep the profiles of the previous block that the accounts streamed
+                # so far do not replace: a run that fails before the final write
+                # must not leave a partial block behind
+                previous = configparser.ConfigParser(interpolation=None, strict=False)
+                previous.read_string(managed_block)
+                for section in previous.sections():
+                    if section not in config:
+                        config[section] = dict(previous[section])
             
             # Convert config to string
             config_str = ""
@@ -705,96 +2503,355 @@ class SSOConfigGenerator:
             final_config += f"{start_marker}\n{config_str}{end_marker}\n"
             final_config += after_marker
             
-            # Write config file
-            os.makedirs(os.path.dirname(self.aws_config_path), exist_ok=True)
-            with open(self.aws_config_path, 'w') as f:
-                f.write(final_config)
+            # Write config file via a temporary file in the same directory, so the
+            # AWS CLI never reads a half-written file; streamed flushes often
+            # render the same content and skip the write
+            if final_config != existing_config:
+                path = os.path.realpath(self.aws_config_path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    f.write(final_config)
+                if os.path.exists(path):
+                    shutil.copymode(path, tmp_path)
+                os.replace(tmp_path, path)
+
+            if final:
+                self._update_completion_index(config_str, accounts)
                 
             return True
             
         except Exception as e:
-            print(f"Error generating AWS config: {str(e)}", file=sys.stderr)
+            self._print(f"Error generating AWS config: {str(e)}", file=sys.stderr)
             return False
             
-    def _create_directory_structure(self, accounts: List[Dict]) -> bool:
+    def _update_completion_index(self, block: str, accounts: List[Account]) -> None:
+        """Refresh the shell completion index when the managed block changed.
+
+        Failures only produce a warning: completion is a convenience and must
+        not fail the run.
+        """
+        try:
+            ou_paths = set()
+            for account in accounts:
+                node = account.ou
+                while node.parent is not None:
+                    ou_paths.add(node.path)
+                    node = node.parent
+            update_completion_index(
+                self.completion_dir,
+                block,
+                profiles=(self._profile_name(a, role) for a in accounts for role in a.roles),
+                accounts=[value for a in accounts for value in (a.id, self._sanitize_path(a.name))],
+                ou_paths=ou_paths,
+            )
+        except OSError as exc:
+            self._print(f"Warning: unable to update shell completion index: {exc}", file=sys.stderr)
+
+    def _profile_name(self, account: Account, role: str) -> str:
+        """Return the name of the generated profile for a role in an account."""
+        return self.profile_name_template.format(role=role, **self._name_fields(account))
+
+    def _directory_name(self, account: Account) -> str:
+        """Return the name of the directory of an account in the account tree."""
+        name = self.directory_name_template.format(**self._name_fields(account))
+        return self._sanitize_path(name).replace(os.sep, '_')
+
+    def _account_region(self, account: Account) -> str:
+        """Return the region of an account's profiles: its region tag, or ``region``."""
+        return (self.region_tag and account.tags.get(self.region_tag)) or self.region
+
+    def _name_fields(self, account: Account) -> Dict:
+        """Return the fields available in profile and directory name templates."""
+        alias = self.alias_tag and account.tags.get(self.alias_tag)
+        return {
+            'account': self._sanitize_path(alias or account.name),
+            'account_name': self._sanitize_path(account.name),
+            'account_id': account.id,
+            'region': self._account_region(account),
+            # The OU levels joined by '-', since '/' cannot appear in directory names
+            'ou': '-'.join(self._sanitize_path(part) for part in account.ou.parts),
+            'tags': _TemplateTags((key, self._sanitize_path(value))
+                                  for key, value in account.tags.items()),
+        }
+
+    def _check_name_template(self, template: str, kind: str) -> str:
+        """Validate a name template by formatting it with sample values.
+
+        Raises:
+            ValueError: When the template uses unknown fields or invalid syntax
+        """
+        fields = {name: 'x' for name in _NAME_TEMPLATE_FIELDS}
+        fields['tags'] = _TemplateTags()
+        if kind == 'directory':
+            del fields['role']
+        try:
+            template.format(**fields)
+        except (KeyError, IndexError, AttributeError, ValueError) as exc:
+            raise ValueError(f"invalid {kind} name template {template!r}: {exc!r} "
+                             f"(fields: {', '.join(fields)})") from None
+        return template
+
+    def _parse_output(self, spec: str) -> Tuple[Renderer, str]:
+        """Parse a ``FORMAT[=PATH]`` output specification.
+
+        Relative paths and default file names are placed in the directory of the
+        AWS config file.
+
+        Raises:
+            ValueError: When the format is unknown
+        """
+        name, _, path = spec.partition('=')
+        renderer_class = RENDERERS.get(name.strip())
+        if renderer_class is None:
+            raise ValueError(f"unknown output format {name!r} (choose from {', '.join(sorted(RENDERERS))})")
+        path = os.path.expanduser(path.strip()) or renderer_class.default_filename
+        return renderer_class(), os.path.join(self.config_dir, path)
+
+    def _render_outputs(self, sso_info: Dict, accounts: List[Account]) -> bool:
+        """Write every configured output artifact whose content changed.
+
+        Args:
+            sso_info: SSO configuration information
+            accounts: Accounts to render
+
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        if not self.outputs:
+            return True
+        context = RenderContext(
+            start_url=sso_info['start_url'],
+            sso_region=sso_info['region'],
+            sso_name=sso_info['name'],
+            sso_session_name=self.sso_session_name,
+            region=self.region,
+            profile_name=self._profile_name,
+            account_region=self._account_region,
+        )
+        try:
+            for renderer, path in self.outputs:
+                content = renderer.render(accounts, context)
+                try:
+                    with open(path) as f:
+                        if f.read() == content:
+                            self._print(f"{renderer.name} output unchanged: {path}")
+                            continue
+                except OSError:
+                    pass
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+                self._print(f"{renderer.name} output written: {path}")
+            return True
+        except Exception as e:
+            self._print(f"Error rendering outputs: {str(e)}", file=sys.stderr)
+            return False
+
+    def _parse_enrichment_task(self, spec: str) -> Tuple[EnrichmentTask, datetime.timedelta]:
+        """Parse a ``TASK[=TTL]`` enrichment task specification.
+
+        Raises:
+            ValueError: When the task is unknown or the TTL is invalid
+        """
+        name, _, ttl = spec.partition('=')
+        task_class = TASKS.get(name.strip())
+        if task_class is None:
+            raise ValueError(f"unknown enrichment task {name!r} (choose from {', '.join(sorted(TASKS))})")
+        return task_class(), parse_duration(ttl) if ttl.strip() else task_class.ttl
+
+    def _run_enrichment(self, accounts: List[Account]) -> None:
+        """Run the configured enrichment tasks for every account directory.
+
+        Failures are summarized but do not fail the run: the profiles and the
+        directory tree are complete without them.
+        """
+        if not self.enrichment_tasks:
+            return
+        try:
+            if not self.access_token and not self._ensure_sso_auth():
+                self._print("Skipping enrichment: no valid SSO session", file=sys.stderr)
+                return
+            base_path = self._account_tree_root()
+            directories = [(account, self._account_directory(base_path, account))
+                           for account in accounts]
+            EnrichmentRunner(self, self.enrichment_tasks, self.enrichment_role).run(directories)
+        except Exception as e:
+            self._print(f"Error running enrichment tasks: {str(e)}", file=sys.stderr)
+
+    def _credential_process_command(self, account_id: str, role_name: str) -> str:
+        """Return the ``credential_process`` command line for a generated profile."""
+        if self._cli_command is None:
+            executable = shutil.which('sso-config-generator')
+            if executable:
+                self._cli_command = [executable]
+            else:
+                self._cli_command = [sys.executable, '-m', 'sso_config_generator.cli']
+                self._print("Warning: sso-config-generator is not on PATH; credential_process "
+                            f"entries use {sys.executable} instead, which stops working when "
+                            "that Python environment is removed (e.g. a temporary uvx "
+                            "environment). Install the tool, e.g. with "
+                            "'pip install sso-config-generator', to avoid this.",
+                            file=sys.stderr)
+        command = list(self._cli_command)
+        # Without a running broker the client fetches the credentials itself,
+        # which needs the same authentication settings
+        if self._explicit_sso_session_name:
+            command += ['--sso-session-name', self.sso_session_name]
+        if self.profile_name != 'sso-browser':
+            command += ['--profile', self.profile_name]
+        if self.region != 'eu-west-1':
+            command += ['--region', self.region]
+        command += ['credential-process', '--account-id', account_id, '--role-name', role_name,
+                    '--socket', self.broker_socket_path]
+        return " ".join(shlex.quote(part) for part in command)
+
+    def _create_directory_structure(self, accounts: List[Account],
+                                    skip: Optional[set] = None,
+                                    base_path: Optional[Path] = None) -> bool:
         """Create directory structure for accounts.
         
         Args:
             accounts: List of account information
+            skip: IDs of accounts whose directory was already created while streaming
+            base_path: Already prepared root of the account tree (see _prepare_account_tree)
             
         Returns:
             bool: True if successful, False otherwise
         """
         try:
-            base_path = Path(self.unified_root)
-            if not self.skip_sso_name:
-                # Get SSO info to get the name
-                self.config.read(self.aws_config_path)
-                if self.sso_session_section in self.config:
-                    start_url = self.config[self.sso_session_section].get("sso_start_url")
-                    sso_name = self.sso_name or self._extract_sso_name(start_url)
-                else:
-                    sso_name = self.sso_name or self._extract_sso_name()
-                
-                print(f"Using SSO name for directory: {sso_name}")
-                base_path = base_path / self._sanitize_path(sso_name)
-                
-            # Create base directory
-            base_path.mkdir(parents=True, exist_ok=True)
+            if base_path is None:
+                base_path = self._prepare_account_tree()
             
-            # Store generator config
-            self._store_generator_config(base_path)
-            
-            # Create account directories
+            # Create account directories; accounts sharing a directory would
+            # overwrite each other's files, so the first account keeps it
+            owners: Dict[Path, Account] = {}
             for account in accounts:
-                # If using OU structure, create directories for each OU level
-                if self.use_ou_structure and 'ou_path' in account:
-                    # Skip the root OU (/)
-                    ou_parts = [p for p in account['ou_path'].split('/') if p]
-                    
-                    # Build the path for this account based on OU structure
-                    account_base_path = base_path
-                    for ou_part in ou_parts:
-                        account_base_path = account_base_path / self._sanitize_path(ou_part)
-                        account_base_path.mkdir(exist_ok=True)
-                    
-                    # Create account directory within its OU
-                    account_path = account_base_path / self._sanitize_path(account['name'])
-                else:
-                    # Create account directory directly under base path
-                    account_path = base_path / self._sanitize_path(account['name'])
-                
-                account_path.mkdir(exist_ok=True)
-                
-                # Create .envrc file only when a developer role was explicitly requested
-                if self.developer_role_name:
-                    if self.developer_role_name in account['roles']:
-                        self._create_envrc_file(
-                            account_path,
-                            f"{self.developer_role_name}@{self._sanitize_path(account['name'])}",
-                        )
-                    else:
-                        print(f"  Note: role '{self.developer_role_name}' not available in "
-                              f"'{account['name']}' — skipping .envrc")
-                    
-                # Create repos.md if requested
-                if self.create_repos_md:
-                    self._create_repos_md(account_path, account)
+                account_path = self._account_directory(base_path, account)
+                owner = owners.setdefault(account_path, account)
+                if owner is not account:
+                    self._print(f"Warning: directory {account_path} of account '{account.name}' "
+                                f"({account.id}) is also the directory of '{owner.name}' "
+                                f"({owner.id}) — skipped", file=sys.stderr)
+                    continue
+                if skip and account.id in skip:
+                    continue
+                self._create_account_directory(base_path, account)
+
+            self._update_env_index(base_path, accounts)
                     
             return True
             
         except Exception as e:
-            print(f"Error creating directory structure: {str(e)}", file=sys.stderr)
+            self._print(f"Error creating directory structure: {str(e)}", file=sys.stderr)
             return False
 
+    def _update_env_index(self, base_path: Path, accounts: List[Account]) -> None:
+        """Record the account directories of this tree for the ``env`` command.
+
+        Failures only produce a warning, like the shell completion index.
+        """
+        try:
+            directories = {}
+            for account in accounts:
+                relative = os.path.relpath(self._account_directory(base_path, account), base_path)
+                if relative in directories:
+                    continue
+                directories[relative] = {
+                    'account_id': account.id,
+                    'account_name': account.name,
+                    'ou_path': account.ou_path,
+                    'region': self._account_region(account),
+                    'profiles': {role: self._profile_name(account, role) for role in account.roles},
+                    'default_role': (self.developer_role_name
+                                     if self.developer_role_name in account.roles else None),
+                }
+            if update_env_index(self.env_index_path, str(base_path), directories):
+                self._print(f"Directory index for sso-config-generator env written: {self.env_index_path}")
+        except OSError as exc:
+            self._print(f"Warning: unable to update directory index: {exc}", file=sys.stderr)
+
+    def _prepare_account_tree(self) -> Path:
+        """Create the root of the account tree and store the generator config in it.
+
+        Returns:
+            Path: Directory under which the account directories are created
+        """
+        base_path = self._account_tree_root(announce=True)
+            
+        # Create base directory
+        base_path.mkdir(parents=True, exist_ok=True)
+        
+        # Store generator config
+        self._store_generator_config(base_path)
+        return base_path
+
+    def _account_tree_root(self, announce: bool = False) -> Path:
+        """Return the directory under which the account directories are created."""
+        base_path = Path(self.unified_root)
+        if not self.skip_sso_name:
+            # Get SSO info to get the name
+            self.config.read(self.aws_config_path)
+            if self.sso_session_section in self.config:
+                start_url = self.config[self.sso_session_section].get("sso_start_url")
+                sso_name = self.sso_name or self._extract_sso_name(start_url)
+            else:
+                sso_name = self.sso_name or self._extract_sso_name()
+            
+            if announce:
+                self._print(f"Using SSO name for directory: {sso_name}")
+            base_path = base_path / self._sanitize_path(sso_name)
+        return base_path
+
+    def _account_directory(self, base_path: Path, account: Account) -> Path:
+        """Return the directory of an account in the account tree."""
+        if self.use_ou_structure:
+            # Nest the account directory under its OU levels
+            for ou_part in account.ou.parts:
+                base_path = base_path / self._sanitize_path(ou_part)
+        return base_path / self._directory_name(account)
+
+    def _create_account_directory(self, base_path: Path, account: Account) -> Path:
+        """Create the directory (and per-account files) for a single account.
+
+        Args:
+            base_path: Root of the account tree
+            account: Account to create the directory for
+
+        Returns:
+            Path: The account directory
+        """
+        # With OU structure the account directory is nested under its OU levels
+        account_path = self._account_directory(base_path, account)
+        account_path.mkdir(parents=True, exist_ok=True)
+        
+        # Create .envrc file only when a developer role was explicitly requested
+        if self.developer_role_name:
+            if self.developer_role_name in account.roles:
+                self._create_envrc_file(
+                    account_path,
+                    self._profile_name(account, self.developer_role_name),
+                )
+            else:
+                self._print(f"  Note: role '{self.developer_role_name}' not available in "
+                      f"'{account.name}' — skipping .envrc")
+            
+        # Create repos.md if requested; the repos enrichment task writes the real one
+        if self.create_repos_md and not any(task.name == 'repos' for task, _ in self.enrichment_tasks):
+            self._create_repos_md(account_path, account)
+
+        return account_path
+
     def _clear_config_needed_flag(self) -> None:
         """Remove ~/.aws/config.needed if it exists."""
         try:
             if os.path.exists(self.config_needed_flag):
                 os.remove(self.config_needed_flag)
-                print(f"Removed {self.config_needed_flag}")
+                self._print(f"Removed {self.config_needed_flag}")
         except OSError as exc:
-            print(f"Warning: unable to remove {self.config_needed_flag}: {exc}")
+            self._print(f"Warning: unable to remove {self.config_needed_flag}: {exc}")
             
     def _store_generator_config(self, base_path: Path) -> None:
         """Write .sso-config-generator.ini in base_path so that re-running from
@@ -823,6 +2880,15 @@ class SSOConfigGenerator:
             section['profile'] = self.profile_name
         if self._explicit_sso_session_name:
             section['sso_session_name'] = self._explicit_sso_session_name
+        # Naming settings, so re-runs from the tree produce the same names
+        if self.region_tag:
+            section['region_tag'] = self.region_tag
+        if self.alias_tag:
+            section['alias_tag'] = self.alias_tag
+        if self.profile_name_template != "{role}@{account}":
+            section['profile_name_template'] = self.profile_name_template.replace('%', '%%')
+        if self.directory_name_template != "{account}":
+            section['directory_name_template'] = self.directory_name_template.replace('%', '%%')
 
         with open(base_path / '.sso-config-generator.ini', 'w') as f:
             f.write("# Generated by sso-config-generator — re-run from this directory to refresh.\n")
@@ -833,7 +2899,7 @@ class SSOConfigGenerator:
         legacy = base_path / '.generate-sso-config'
         if legacy.exists():
             legacy.unlink()
-            print(f"  Migrated .generate-sso-config → .sso-config-generator.ini")
+            self._print(f"  Migrated .generate-sso-config → .sso-config-generator.ini")
             
     def _create_envrc_file(self, directory: Path, profile: str) -> None:
         """Create .envrc file in directory.
@@ -845,7 +2911,7 @@ class SSOConfigGenerator:
         with open(directory / '.envrc', 'w') as f:
             f.write(f'export AWS_PROFILE="{profile}"\n')
             
-    def _create_repos_md(self, directory: Path, account: Dict) -> None:
+    def _create_repos_md(self, directory: Path, account: Account) -> None:
         """Create repos.md file in directory.
         
         Args:
@@ -853,7 +2919,7 @@ class SSOConfigGenerator:
             account: Account information
         """
         with open(directory / 'repos.md', 'w') as f:
-            f.write(f"# Repositories in {account['name']}\n\n")
+            f.write(f"# Repositories in {account.name}\n\n")
             f.write("Run `cclist --create-repos-md` to populate this file.\n")
             
     def _extract_sso_name(self, url: Optional[str] = None) -> str:
@@ -918,36 +2984,265 @@ class SSOConfigGenerator:
             return True
             
         except Exception as e:
-            print(f"Error validating SSO access: {str(e)}", file=sys.stderr)
+            self._print(f"Error validating SSO access: {str(e)}", file=sys.stderr)
             return False
             
     def _test_role_assumptions(self) -> bool:
-        """Test role assumptions.
-        
+        """Test that the roles of the generated profiles can be assumed.
+
+        Every SSO profile is checked with ``GetRoleCredentials`` on the shared SSO
+        client, concurrently.  Results (status, latency and timestamp) are kept in
+        ``<cache>.validation``; a profile is only checked again when its cached
+        result is older than ``validation_ttl``, when it previously failed, or when
+        its settings in the config file changed since it was validated.
+
         Returns:
-            bool: True if valid, False otherwise
+            bool: True if every profile is valid, False otherwise
         """
         try:
             # Skip role assumption test if config file doesn't exist
             if not os.path.exists(self.aws_config_path):
-                print("AWS config file not found, skipping role assumption test")
+                self._print("AWS config file not found, skipping role assumption test")
                 return True
-                
-            # Test first profile in config
-            self.config.read(self.aws_config_path)
-            for section in self.config.sections():
-                if section.startswith('profile '):
-                    profile = section[8:]  # Remove 'profile ' prefix
-                    print(f"Testing profile: {profile}")
-                    session = boto3.Session(profile_name=profile)
-                    sts = session.client('sts')
-                    sts.get_caller_identity()
-                    return True
-                    
-            # No profiles found but that's okay for initial setup
-            print("No profiles found to test, continuing with setup")
-            return True
+
+            profiles = self._sso_profiles()
+            if not profiles:
+                # No profiles found but that's okay for initial setup
+                self._print("No profiles found to test, continuing with setup")
+                return True
+
+            try:
+                with open(self.validation_path) as f:
+                    cached = json.load(f).get('profiles', {})
+            except (OSError, ValueError):
+                cached = {}
+
+            now = datetime.datetime.now()
+            results: Dict[str, Dict] = {}
+            stale = []
+            for profile, (account_id, role_name, fingerprint) in profiles.items():
+                result = cached.get(profile)
+                if result and result.get('status') == 'ok' and result.get('fingerprint') == fingerprint:
+                    try:
+                        age = now - datetime.datetime.fromisoformat(result['checked_at'])
+                    except (KeyError, ValueError):
+                        age = None
+                    if age is not None and age <= self.validation_ttl:
+                        results[profile] = result
+                        continue
+                stale.append(profile)
+
+            self._print(f"Testing {len(stale)} of {len(profiles)} profile(s); "
+                  f"{len(profiles) - len(stale)} cached result(s) still valid")
+
+            def check(profile: str) -> Dict:
+                account_id, role_name, fingerprint = profiles[profile]
+                started = time.monotonic()
+                result = {'account_id': account_id, 'role_name': role_name,
+                          'fingerprint': fingerprint, 'status': 'ok'}
+                try:
+                    self.sso.get_role_credentials(roleName=role_name, accountId=account_id,
+                                                  accessToken=self.access_token)
+                except ClientError as err:
+                    code = err.response.get('Error', {}).get('Code')
+                    result['status'] = ('missing' if code == 'ResourceNotFoundException' else
+                                        'denied' if code in ('ForbiddenException',
+                                                             'UnauthorizedException',
+                                                             'AccessDeniedException') else
+                                        'error')
+                    result['error'] = code
+                except Exception as exc:
+                    result['status'] = 'error'
+                    result['error'] = str(exc)
+                result['latency_ms'] = round((time.monotonic() - started) * 1000)
+                result['checked_at'] = datetime.datetime.now().isoformat(timespec='seconds')
+                return result
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for profile, result in zip(stale, pool.map(check, stale)):
+                    results[profile] = result
+
+            # Profiles that no longer exist in the config are dropped
+            self._write_json_atomic(self.validation_path, {
+                'validated_at': now.isoformat(timespec='seconds'),
+                'profiles': results,
+            })
+
+            counts: Dict[str, int] = {}
+            for profile, result in results.items():
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+                if result['status'] != 'ok':
+                    self._print(f"  {profile}: {result['status']} ({result.get('error')})", file=sys.stderr)
+            self._print("Profiles: " + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+            return counts.get('ok', 0) == len(results)
             
         except Exception as e:
-            print(f"Error testing role assumption: {str(e)}", file=sys.stderr)
+            self._print(f"Error testing role assumption: {str(e)}", file=sys.stderr)
             return False
+
+    def _sso_profiles(self) -> Dict[str, Tuple[str, str, str]]:
+        """Return the SSO profiles to validate.
+
+        Profiles in the managed block are used when it exists, otherwise every
+        profile in the config file.  Profiles using the credential broker are
+        included with the account and role from their ``credential_process``.
+
+        Returns:
+            Dict[str, Tuple[str, str, str]]: Profile name -> (account ID, role name,
+            fingerprint of the profile settings)
+        """
+        with open(self.aws_config_path) as f:
+            content = f.read()
+        start_marker = "# BEGIN SSO-CONFIG-GENERATOR MANAGED BLOCK"
+        end_marker = "# END SSO-CONFIG-GENERATOR MANAGED BLOCK"
+        if start_marker in content and end_marker in content:
+            content = content.split(start_marker)[1].split(end_marker)[0]
+
+        config = configparser.ConfigParser(interpolation=None, strict=False)
+        config.read_string(content)
+        profiles = {}
+        for section in config.sections():
+            if not section.startswith('profile '):
+                continue
+            settings = config[section]
+            account_id = settings.get('sso_account_id')
+            role_name = settings.get('sso_role_name')
+            if 'credential_process' in settings and not account_id:
+                args = shlex.split(settings['credential_process'])
+                if 'credential-process' in args and '--account-id' in args and '--role-name' in args:
+                    account_id = args[args.index('--account-id') + 1]
+                    role_name = args[args.index('--role-name') + 1]
+            if not account_id or not role_name:
+                continue
+            fingerprint = hashlib.sha256(
+                json.dumps(sorted(settings.items())).encode('utf-8')).hexdigest()[:16]
+            profiles[section[8:]] = (account_id, role_name, fingerprint)  # Remove 'profile ' prefix
+        return profiles
+
+class _AccountSink:
+    """Make each freshly discovered account usable as soon as it is ready.
+
+    Passed as ``on_account`` to the discovery pipeline: the account directory is
+    created immediately and the managed block in the AWS config is rewritten at
+    most every ``flush_interval`` seconds with the accounts found so far, merged
+    into the previous block, so the first profiles work long before discovery of
+    a large organization finishes.  ``SSOConfigGenerator.generate`` performs the
+    final, ordered write afterwards.
+    """
+
+    def __init__(self, generator: SSOConfigGenerator, sso_info: Dict,
+                 flush_interval: float = 2.0):
+        self.generator = generator
+        self.sso_info = sso_info
+        self.flush_interval = flush_interval
+        self.accounts: List[Account] = []
+        self.created: set = set()
+        self.directories: set = set()
+        self.base_path: Optional[Path] = None
+        self._last_flush = time.monotonic()
+
+    def __call__(self, account: Account) -> None:
+        self.accounts.append(account)
+
+        if self.generator.create_directories:
+            if self.base_path is None:
+                self.base_path = self.generator._prepare_account_tree()
+            # A directory taken by another account is left to the final pass,
+            # which reports the collision
+            account_path = self.generator._account_directory(self.base_path, account)
+            if account_path not in self.directories:
+                self.directories.add(account_path)
+                self.generator._create_account_directory(self.base_path, account)
+                self.created.add(account.id)
+
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._last_flush = now
+            self.generator._generate_aws_config(self.sso_info, self.accounts, final=False)
+            self.generator._print(f"  {len(self.accounts)} accounts discovered so far; profiles written")
+
+
+class _DeadlineReached(Exception):
+    """Raised inside discovery when the deadline passed before it completed."""
+
+
+class _TemplateTags(dict):
+    """Tags as seen by name templates: missing tags format as an empty string."""
+
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+class _RateLimiter:
+    """Space out calls from any number of threads to at most ``rate`` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        """Block until the caller may make its next call."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class _ConnectionStats:
+    """Count AWS API requests and the new HTTPS connections they needed.
+
+    Requests are counted through the botocore ``before-send`` event of each
+    instrumented client; new connections (each implying a TCP and TLS
+    handshake) are read from the urllib3 connection pools of those clients.
+    Only the generator's own clients are counted, and nothing process-wide
+    (such as logging configuration) is changed.  Every other request reused a
+    pooled connection.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self._clients: List = []
+        self._lock = threading.Lock()
+
+    def instrument(self, client) -> None:
+        """Start counting the requests and connections of a client."""
+        client.meta.events.register('before-send', self._on_request)
+        with self._lock:
+            self._clients.append(client)
+
+    def _on_request(self, **kwargs) -> None:
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def new_connections(self) -> int:
+        """Number of connections opened by the instrumented clients."""
+        with self._lock:
+            clients = list(self._clients)
+        total = 0
+        for client in clients:
+            # botocore keeps one urllib3 pool manager per client; its pools count
+            # the connections they opened
+            http_session = getattr(getattr(client, '_endpoint', None), 'http_session', None)
+            pools = getattr(getattr(http_session, '_manager', None), 'pools', None)
+            if pools is None:
+                continue
+            for key in pools.keys():
+                pool = pools.get(key)
+                total += getattr(pool, 'num_connections', 0) if pool is not None else 0
+        return total
+
+    @property
+    def reused(self) -> int:
+        """Number of requests that were sent over an already open connection."""
+        return max(0, self.requests - self.new_connections)
+
+    def summary(self) -> str:
+        """Return a one-line summary of connection reuse."""
+        return (f"AWS API requests: {self.requests}, new connections: {self.new_connections}, "
+                f"reused: {self.reused}")
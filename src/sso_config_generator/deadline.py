@@ -0,0 +1,107 @@
+"""Thread helpers for work that is bounded by a deadline.
+
+``concurrent.futures.ThreadPoolExecutor`` joins its worker threads when the
+interpreter exits, so work abandoned at a deadline would still delay the exit
+until every queued call returned.  The pool here runs calls on daemon threads
+instead: once the caller stops waiting, abandoned calls can no longer hold up
+the process.
+"""
+
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Callable, List, Optional
+
+# Returned by call_with_timeout when the call did not finish in time
+TIMED_OUT = object()
+
+
+class DaemonThreadPool:
+    """Minimal executor whose worker threads are daemon threads.
+
+    Supports the subset of ``ThreadPoolExecutor`` used here: :meth:`submit`
+    and :meth:`shutdown`, with futures usable with ``wait`` and ``as_completed``.
+
+    Args:
+        max_workers: Maximum number of worker threads
+        name: Prefix of the worker thread names
+    """
+
+    def __init__(self, max_workers: int, name: str = "sso-config-generator"):
+        self.max_workers = max(1, max_workers)
+        self.name = name
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def submit(self, function: Callable, *args) -> Future:
+        """Schedule ``function(*args)`` and return its future."""
+        future: Future = Future()
+        with self._lock:
+            self._queue.put((future, function, args))
+            if len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f"{self.name}-{len(self._threads)}")
+                self._threads.append(thread)
+                thread.start()
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        """Stop the workers once the queued calls are done.
+
+        Args:
+            wait: Block until the running and queued calls finished
+            cancel_futures: Cancel the calls that have not started yet
+        """
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        with self._lock:
+            threads = list(self._threads)
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, function, args = item
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = function(*args)
+                except BaseException as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+
+
+def call_with_timeout(timeout: Optional[float], function: Callable, *args) -> Any:
+    """Call ``function(*args)``, waiting for it at most ``timeout`` seconds.
+
+    Without a timeout the function is called directly.  Otherwise it runs on
+    a daemon thread that is abandoned when it does not return in time.
+
+    Returns:
+        The function's result, or :data:`TIMED_OUT`
+
+    Raises:
+        Whatever the function raised
+    """
+    if timeout is None:
+        return function(*args)
+    pool = DaemonThreadPool(1)
+    future = pool.submit(function, *args)
+    pool.shutdown(wait=False)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        return TIMED_OUT
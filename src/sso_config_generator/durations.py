@@ -0,0 +1,25 @@
+"""Parsing of duration values such as ``90s``, ``15m``, ``12h`` or ``7d``.
+
+Kept free of AWS dependencies, so command line options can be converted
+without importing boto3.
+"""
+
+import datetime
+import re
+
+
+def parse_duration(value) -> datetime.timedelta:
+    """Parse a duration such as ``90``, ``90s``, ``15m``, ``12h`` or ``7d``.
+
+    Plain numbers are seconds.
+
+    Raises:
+        ValueError: When the value is not a valid, non-negative duration
+    """
+    if isinstance(value, datetime.timedelta):
+        return value
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", str(value).lower())
+    if not match:
+        raise ValueError(f"invalid duration: {value!r} (use e.g. 90s, 15m, 12h or 7d)")
+    unit = {'': 'seconds', 's': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}[match.group(2)]
+    return datetime.timedelta(**{unit: float(match.group(1))})
@@ -0,0 +1,157 @@
+"""Directory-to-account index for the ``env`` command.
+
+Every time the account tree is written, the generator records which account
+each account directory belongs to in ``sso-env-index.json`` next to the AWS
+config file.  ``sso-config-generator env`` looks up the current directory in
+that index and prints shell exports for the matching profile, so a single
+shell hook can replace a generated ``.envrc`` in every account directory.
+
+This module only uses the standard library: the ``env`` command runs on every
+directory change and must not pay for importing boto3.
+
+The index holds one entry per account tree (keyed by the real path of its
+root, so ``unified_root`` and ``skip_sso_name`` are honoured) with the path of
+every account directory relative to that root, including OU levels.
+"""
+
+import json
+import os
+import shlex
+from typing import Dict, Optional
+
+ENV_INDEX_FILENAME = "sso-env-index.json"
+ENV_INDEX_FORMAT = "sso-config-generator-env-index"
+
+# Set by the exports, so leaving the tree only unsets a profile this tool set
+MARKER_VARIABLE = "_SSO_CONFIG_GENERATOR_PROFILE"
+
+HOOKS: Dict[str, str] = {
+    'bash': '''_sso_config_generator_env() {
+    if [ "$PWD" != "${_SSO_CONFIG_GENERATOR_PWD:-}" ]; then
+        _SSO_CONFIG_GENERATOR_PWD=$PWD
+        eval "$(command sso-config-generator env --shell bash)"
+    fi
+}
+case ";${PROMPT_COMMAND:-};" in
+    *";_sso_config_generator_env;"*) ;;
+    *) PROMPT_COMMAND="_sso_config_generator_env${PROMPT_COMMAND:+;$PROMPT_COMMAND}" ;;
+esac
+''',
+    'zsh': '''_sso_config_generator_env() {
+    eval "$(command sso-config-generator env --shell zsh)"
+}
+autoload -Uz add-zsh-hook
+add-zsh-hook chpwd _sso_config_generator_env
+_sso_config_generator_env
+''',
+    'fish': '''function __sso_config_generator_env --on-variable PWD
+    command sso-config-generator env --shell fish | source
+end
+__sso_config_generator_env
+''',
+}
+
+
+def default_index_path() -> str:
+    """Return the index path for the current AWS config file (symlinks resolved)."""
+    config_path = os.environ.get('AWS_CONFIG_FILE', os.path.expanduser("~/.aws/config"))
+    return os.path.join(os.path.dirname(os.path.realpath(config_path)), ENV_INDEX_FILENAME)
+
+
+def update_env_index(index_path: str, root: str, directories: Dict[str, Dict]) -> bool:
+    """Replace the entries of one account tree in the index.
+
+    Entries of other trees are kept.  The file is only rewritten when the
+    entries of this tree changed.
+
+    Args:
+        index_path: Path of the index file
+        root: Root of the account tree
+        directories: Account directory path relative to ``root`` -> entry
+            (``account_id``, ``account_name``, ``ou_path``, ``region``,
+            ``profiles`` by role and ``default_role``)
+
+    Returns:
+        bool: True when the index was rewritten
+    """
+    root = os.path.realpath(root)
+    index = _load(index_path)
+    if index['trees'].get(root, {}).get('directories') == directories:
+        return False
+    index['trees'][root] = {'directories': directories}
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    os.replace(tmp_path, index_path)
+    return True
+
+
+def resolve(cwd: str, index_path: Optional[str] = None) -> Optional[Dict]:
+    """Return the entry of the account directory that contains ``cwd``, if any.
+
+    Subdirectories of an account directory (e.g. a cloned repository) resolve
+    to that account.
+    """
+    trees = _load(index_path or default_index_path())['trees']
+    path = os.path.realpath(cwd)
+    # The innermost tree wins when trees are nested
+    for root in sorted(trees, key=len, reverse=True):
+        if path != root and not path.startswith(root.rstrip(os.sep) + os.sep):
+            continue
+        directories = trees[root]['directories']
+        relative = os.path.relpath(path, root)
+        while relative not in ('.', ''):
+            entry = directories.get(relative)
+            if entry is not None:
+                return entry
+            relative = os.path.dirname(relative)
+        return None
+    return None
+
+
+def exports(entry: Optional[Dict], role: Optional[str] = None, shell: str = 'sh',
+            environ: Optional[Dict[str, str]] = None) -> str:
+    """Return shell commands that select the profile of an index entry.
+
+    Without an entry (the directory is not in an account tree), a profile set
+    earlier by these exports is unset again.
+
+    Args:
+        entry: Index entry from :func:`resolve`
+        role: Role to use (default: the entry's default role, else its first role)
+        shell: ``sh`` (also bash and zsh) or ``fish``
+        environ: Environment to inspect (default: ``os.environ``)
+
+    Raises:
+        KeyError: When the account has no profile for ``role``
+    """
+    environ = os.environ if environ is None else environ
+    if entry is None:
+        previous = environ.get(MARKER_VARIABLE)
+        if previous is None:
+            return ""
+        names = ([] if environ.get('AWS_PROFILE') != previous else ['AWS_PROFILE']) + [MARKER_VARIABLE]
+        if shell == 'fish':
+            return "".join(f"set -e {name};\n" for name in names)
+        return f"unset {' '.join(names)}\n"
+
+    profiles = entry['profiles']
+    role = role or entry.get('default_role') or next(iter(profiles))
+    if role not in profiles:
+        raise KeyError(f"role {role!r} is not available in {entry['account_name']} "
+                       f"(available: {', '.join(profiles)})")
+    values = [('AWS_PROFILE', profiles[role]), (MARKER_VARIABLE, profiles[role])]
+    if shell == 'fish':
+        return "".join(f"set -gx {name} {shlex.quote(value)};\n" for name, value in values)
+    return "".join(f"export {name}={shlex.quote(value)}\n" for name, value in values)
+
+
+def _load(index_path: str) -> Dict:
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+        if index.get('format') == ENV_INDEX_FORMAT:
+            return index
+    except (OSError, ValueError, AttributeError):
+        pass
+    return {'format': ENV_INDEX_FORMAT, 'trees': {}}
@@ -0,0 +1,198 @@
+"""Compact in-memory model for accounts, roles and the OU hierarchy.
+
+Plain dicts repeat every role name and the full OU path string for each
+account.  The classes below use ``__slots__``, intern role names, share
+identical role tuples and point accounts at a shared :class:`OUNode` so that
+memory grows with the number of *distinct* roles and OUs rather than with
+the number of account/role combinations.
+
+The on-disk cache format is unchanged: :meth:`Account.to_cache` and
+:meth:`Organization.from_cache` convert to and from the list of dicts stored
+under ``accounts`` in ``.ou-cache``.
+"""
+
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Cache entry fields written by optional enrichment (account tags); they are
+# carried through the model unchanged so rewriting the cache keeps them
+ENRICHMENT_FIELDS = ('tags', 'tags_checked_at', 'tags_status')
+
+
+class OUNode:
+    """A node in the OU hierarchy, shared by every account placed in it."""
+
+    __slots__ = ('name', 'parent', 'path')
+
+    def __init__(self, name: str, parent: Optional['OUNode'] = None):
+        self.name = name
+        self.parent = parent
+        self.path = f"{parent.path}{name}/" if parent is not None else "/"
+
+    @property
+    def parts(self) -> List[str]:
+        """Return the OU names from the root down to this node."""
+        return [p for p in self.path.split('/') if p]
+
+    def __repr__(self) -> str:
+        return f"OUNode({self.path!r})"
+
+
+class Account:
+    """An AWS account with the SSO roles available to the caller."""
+
+    __slots__ = ('id', 'name', 'ou', 'roles', 'checked_at', 'enrichment')
+
+    def __init__(self, account_id: str, name: str, ou: OUNode, roles: Tuple[str, ...],
+                 checked_at: Optional[str] = None, enrichment: Optional[Dict] = None):
+        self.id = account_id
+        self.name = name
+        self.ou = ou
+        self.roles = roles
+        self.checked_at = checked_at
+        self.enrichment = enrichment
+
+    @property
+    def ou_path(self) -> str:
+        """Return the OU path of the account, e.g. ``/Workloads/Prod/``."""
+        return self.ou.path
+
+    @property
+    def tags(self) -> Dict[str, str]:
+        """Return the Organizations tags of the account (empty unless enriched)."""
+        return (self.enrichment or {}).get('tags') or {}
+
+    def to_cache(self) -> Dict:
+        """Serialize the account to its ``.ou-cache`` representation."""
+        entry = {
+            'id': self.id,
+            'name': self.name,
+            'ou_path': self.ou.path,
+            'roles': list(self.roles),
+        }
+        if self.checked_at:
+            entry['checked_at'] = self.checked_at
+        if self.enrichment:
+            entry.update(self.enrichment)
+        return entry
+
+    def __repr__(self) -> str:
+        return f"Account({self.id!r}, {self.name!r}, {self.ou.path!r}, {self.roles!r})"
+
+
+class Organization:
+    """Registry that owns the accounts and deduplicates OUs and role sets."""
+
+    __slots__ = ('root', 'accounts', '_ous', '_role_sets')
+
+    def __init__(self):
+        self.root = OUNode('')
+        self.accounts: List[Account] = []
+        self._ous: Dict[str, OUNode] = {'/': self.root}
+        self._role_sets: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    def ou(self, path: Optional[str]) -> OUNode:
+        """Return the shared node for an OU path, creating missing levels."""
+        parts = [p for p in (path or '/').split('/') if p]
+        key = "/" + "".join(f"{p}/" for p in parts) if parts else "/"
+        node = self._ous.get(key)
+        if node is not None:
+            return node
+
+        node = self.root
+        for part in parts:
+            child_path = f"{node.path}{part}/"
+            child = self._ous.get(child_path)
+            if child is None:
+                child = OUNode(sys.intern(part), node)
+                self._ous[child_path] = child
+            node = child
+        return node
+
+    def role_set(self, roles: Iterable[str]) -> Tuple[str, ...]:
+        """Return a shared, interned tuple for a list of role names."""
+        key = tuple(sys.intern(r) for r in roles)
+        return self._role_sets.setdefault(key, key)
+
+    def add_account(self, account_id: str, name: str, ou_path: Optional[str],
+                    roles: Iterable[str], checked_at: Optional[str] = None,
+                    enrichment: Optional[Dict] = None) -> Account:
+        """Create an account, register it and return it."""
+        account = Account(account_id, name, self.ou(ou_path), self.role_set(roles), checked_at,
+                          enrichment)
+        self.accounts.append(account)
+        return account
+
+    def add_entry(self, entry: Dict) -> Account:
+        """Create and register an account from its ``.ou-cache`` entry."""
+        enrichment = {key: entry[key] for key in ENRICHMENT_FIELDS if key in entry}
+        return self.add_account(entry['id'], entry['name'], entry.get('ou_path', '/'),
+                                entry.get('roles') or (), entry.get('checked_at'),
+                                enrichment or None)
+
+    @classmethod
+    def from_cache(cls, entries: Iterable[Dict]) -> 'Organization':
+        """Build an organization from the ``accounts`` list of a cache file."""
+        org = cls()
+        for entry in entries:
+            org.add_entry(entry)
+        return org
+
+    def to_cache(self) -> List[Dict]:
+        """Serialize all accounts to their ``.ou-cache`` representation."""
+        return [account.to_cache() for account in self.accounts]
+
+
+def diff_accounts(old: Iterable[Dict], new: Iterable[Dict],
+                  compare_ou: bool = True) -> Dict[str, List[Dict]]:
+    """Compute the delta between two generations of cached account entries.
+
+    Both arguments are lists of ``.ou-cache`` account entries.  Entries without
+    roles are treated as absent.  Every change category is always present in
+    the result so consumers do not need to check for missing keys.
+
+    Args:
+        old: Account entries of the previous generation
+        new: Account entries of the current generation
+        compare_ou: Report ``moved`` accounts; pass False when either generation
+            was built without OU structure, where every account is placed in ``/``
+
+    Returns:
+        Dict[str, List[Dict]]: ``added``, ``removed``, ``renamed``, ``moved``,
+        ``roles_granted`` and ``roles_revoked`` lists
+    """
+    before = {e['id']: e for e in old if e.get('roles')}
+    after = {e['id']: e for e in new if e.get('roles')}
+    delta: Dict[str, List[Dict]] = {
+        'added': [], 'removed': [], 'renamed': [], 'moved': [],
+        'roles_granted': [], 'roles_revoked': [],
+    }
+
+    for account_id, entry in after.items():
+        previous = before.get(account_id)
+        if previous is None:
+            delta['added'].append({'id': account_id, 'name': entry['name'],
+                                   'ou_path': entry.get('ou_path', '/'),
+                                   'roles': list(entry['roles'])})
+            continue
+        if previous['name'] != entry['name']:
+            delta['renamed'].append({'id': account_id, 'from': previous['name'],
+                                     'to': entry['name']})
+        if compare_ou and previous.get('ou_path', '/') != entry.get('ou_path', '/'):
+            delta['moved'].append({'id': account_id, 'name': entry['name'],
+                                   'from': previous.get('ou_path', '/'),
+                                   'to': entry.get('ou_path', '/')})
+        granted = [r for r in entry['roles'] if r not in previous['roles']]
+        revoked = [r for r in previous['roles'] if r not in entry['roles']]
+        if granted:
+            delta['roles_granted'].append({'id': account_id, 'name': entry['name'],
+                                           'roles': granted})
+        if revoked:
+            delta['roles_revoked'].append({'id': account_id, 'name': entry['name'],
+                                           'roles': revoked})
+
+    for account_id, entry in before.items():
+        if account_id not in after:
+            delta['removed'].append({'id': account_id, 'name': entry['name']})
+
+    return delta
@@ -0,0 +1,271 @@
+"""Per-account enrichment tasks that run with the account's own role credentials.
+
+After the account tree has been written, every configured task runs for every
+account directory, e.g. to list the CodeCommit repositories of the account
+into ``repos.md``.  Tasks run inside the account: credentials for one of the
+caller's roles are obtained with SSO ``GetRoleCredentials`` (once per account,
+shared by all tasks) and the task gets clients created with them.
+
+All account/task combinations run concurrently on ``max_workers`` threads.
+Results are cached per account and task in ``<cache>.enrichment`` with a TTL
+per task, so a run only contacts the accounts whose results expired.  Failed
+tasks are summarized at the end of the run and retried after
+``error_cache_ttl``.  Tasks still running at the generator's deadline are
+abandoned on their daemon threads; their cached results stay expired, so the
+next run retries them.
+
+Built-in tasks:
+
+* ``repos`` — CodeCommit repositories of the account, written to ``repos.md``
+* ``alias`` — IAM account alias, written to ``.account-alias``
+
+Additional tasks can be added with :func:`register_task`.
+"""
+
+import datetime
+import json
+import os
+import sys
+import threading
+from concurrent.futures import TimeoutError, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from .broker import BrokerError, CredentialBroker
+from .deadline import DaemonThreadPool
+from .models import Account
+
+
+class EnrichmentTask:
+    """Base class for enrichment tasks.
+
+    Subclasses set ``name`` (used on the command line) and ``ttl`` (how long a
+    result is reused) and implement :meth:`run` and :meth:`write`.
+    """
+
+    name = ""
+    ttl = datetime.timedelta(days=1)
+
+    def run(self, client: Callable[[str], Any], account: Account) -> Any:
+        """Collect the task's data for an account.
+
+        Args:
+            client: Returns a client for an AWS service, authenticated with role
+                credentials for the account and set to the account's region
+            account: The account
+
+        Returns:
+            JSON-serializable result, cached until it expires
+        """
+        raise NotImplementedError
+
+    def write(self, directory: Path, account: Account, result: Any) -> None:
+        """Write a (fresh or cached) result into the account directory."""
+        raise NotImplementedError
+
+
+TASKS: Dict[str, Type[EnrichmentTask]] = {}
+
+
+def register_task(cls: Type[EnrichmentTask]) -> Type[EnrichmentTask]:
+    """Class decorator that makes a task available under its ``name``."""
+    TASKS[cls.name] = cls
+    return cls
+
+
+def _write_if_changed(path: Path, content: Optional[str]) -> None:
+    """Write a file only when its content changed; ``None`` removes it."""
+    try:
+        if path.read_text() == content:
+            return
+    except OSError:
+        if content is None:
+            return
+    if content is None:
+        path.unlink()
+        return
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(content)
+    os.replace(tmp_path, path)
+
+
+@register_task
+class ReposTask(EnrichmentTask):
+    """CodeCommit repositories of the account, written to ``repos.md``."""
+
+    name = "repos"
+    ttl = datetime.timedelta(days=1)
+
+    def run(self, client: Callable[[str], Any], account: Account) -> Any:
+        codecommit = client('codecommit')
+        repositories = []
+        for page in codecommit.get_paginator('list_repositories').paginate():
+            repositories.extend(repo['repositoryName'] for repo in page['repositories'])
+        return {'region': codecommit.meta.region_name, 'repositories': sorted(repositories)}
+
+    def write(self, directory: Path, account: Account, result: Any) -> None:
+        lines = [f"# Repositories in {account.name}\n\n"]
+        if result['repositories']:
+            lines += [f"- {name}\n" for name in result['repositories']]
+        else:
+            lines.append(f"No CodeCommit repositories in {result['region']}.\n")
+        _write_if_changed(directory / 'repos.md', "".join(lines))
+
+
+@register_task
+class AliasTask(EnrichmentTask):
+    """IAM account alias, written to ``.account-alias``."""
+
+    name = "alias"
+    ttl = datetime.timedelta(days=7)
+
+    def run(self, client: Callable[[str], Any], account: Account) -> Any:
+        aliases = client('iam').list_account_aliases()['AccountAliases']
+        return aliases[0] if aliases else None
+
+    def write(self, directory: Path, account: Account, result: Any) -> None:
+        _write_if_changed(directory / '.account-alias', f"{result}\n" if result else None)
+
+
+class EnrichmentRunner:
+    """Run enrichment tasks for account directories, using and updating the result cache.
+
+    Args:
+        generator: Configured :class:`~sso_config_generator.core.SSOConfigGenerator`;
+            its SSO token, AWS session, workers and TTLs are reused
+        tasks: Tasks to run, each with its result TTL
+        role_name: Role used inside the accounts; accounts without it are skipped.
+            Default: the first role of each account
+    """
+
+    def __init__(self, generator, tasks: List[Tuple[EnrichmentTask, datetime.timedelta]],
+                 role_name: Optional[str] = None):
+        self.generator = generator
+        self.tasks = tasks
+        self.role_name = role_name
+        self.broker = CredentialBroker(generator)
+        self._client_lock = threading.Lock()
+
+    def run(self, directories: List[Tuple[Account, Path]]) -> bool:
+        """Run the tasks whose cached result expired and write every result.
+
+        Returns:
+            bool: True when no task failed
+        """
+        cache = self._load_cache()
+        now = datetime.datetime.now()
+        jobs = []
+        cached = skipped = 0
+        for account, directory in directories:
+            role = self._role(account)
+            for task, ttl in self.tasks:
+                entry = cache.get(account.id, {}).get(task.name)
+                if entry and self._fresh(entry, ttl, now):
+                    cached += 1
+                    if 'error' not in entry:
+                        task.write(directory, account, entry['result'])
+                elif role is None:
+                    skipped += 1
+                else:
+                    jobs.append((account, directory, task, role))
+
+        failures: Dict[Tuple[str, str], List[str]] = {}
+        postponed = len(jobs) if jobs and self.generator._deadline_passed() else 0
+        if jobs and not postponed:
+            self.generator._print(f"Running {len(jobs)} enrichment task(s) in "
+                                  f"{len({job[0].id for job in jobs})} account(s)...")
+            pool = DaemonThreadPool(self.generator.max_workers)
+            futures = {pool.submit(self._run_task, task, account, role): (account, directory, task)
+                       for account, directory, task, role in jobs}
+            done = 0
+            try:
+                for future in as_completed(futures, timeout=self.generator._time_left()):
+                    done += 1
+                    account, directory, task = futures[future]
+                    result, error = future.result()
+                    entry = {'fetched_at': datetime.datetime.now().isoformat(timespec='seconds')}
+                    if error:
+                        entry['error'] = error
+                        failures.setdefault((task.name, error), []).append(account.name)
+                    else:
+                        entry['result'] = result
+                        try:
+                            task.write(directory, account, result)
+                        except OSError as exc:
+                            failures.setdefault((task.name, type(exc).__name__), []).append(account.name)
+                    cache.setdefault(account.id, {})[task.name] = entry
+            except TimeoutError:
+                postponed = len(jobs) - done
+            finally:
+                pool.shutdown(wait=not postponed, cancel_futures=True)
+            self._save_cache(cache)
+
+        failed = sum(len(names) for names in failures.values())
+        summary = f"Enrichment: {len(jobs) - failed - postponed} fetched, {cached} cached"
+        if skipped:
+            summary += f", {skipped} skipped (role {self.role_name} not available)"
+        if postponed:
+            summary += f", {postponed} postponed"
+            self.generator.degraded.append(f"{postponed} enrichment task(s) postponed")
+        self.generator._print(summary + (f", {failed} failed" if failed else ""))
+        for (task_name, error), names in sorted(failures.items()):
+            listed = ", ".join(sorted(names)[:5]) + (", ..." if len(names) > 5 else "")
+            self.generator._print(f"  {task_name}: {error} in {len(names)} account(s) ({listed})",
+                                  file=sys.stderr)
+        return not failed
+
+    def _role(self, account: Account) -> Optional[str]:
+        if self.role_name:
+            return self.role_name if self.role_name in account.roles else None
+        return account.roles[0] if account.roles else None
+
+    def _run_task(self, task: EnrichmentTask, account: Account, role: str) -> Tuple[Any, Optional[str]]:
+        """Run one task in an account; returns the result or the error code."""
+        try:
+            credentials = self.broker.get(account.id, role)
+        except BrokerError as exc:
+            # Keep only the error code, so failures group well in the summary
+            return None, f"GetRoleCredentials for {role}: {str(exc).split(':')[0]}"
+        region = self.generator._account_region(account)
+
+        def client(service: str):
+            # Creating clients from the shared session reuses its loaded service
+            # models; the session itself is not thread-safe
+            with self._client_lock:
+                return self.generator.session.client(
+                    service, region_name=region,
+                    aws_access_key_id=credentials['AccessKeyId'],
+                    aws_secret_access_key=credentials['SecretAccessKey'],
+                    aws_session_token=credentials['SessionToken'],
+                    config=Config(retries={'mode': 'standard'}))
+
+        try:
+            return task.run(client, account), None
+        except ClientError as err:
+            return None, err.response.get('Error', {}).get('Code') or 'ClientError'
+        except Exception as exc:
+            return None, type(exc).__name__
+
+    def _fresh(self, entry: Dict, ttl: datetime.timedelta, now: datetime.datetime) -> bool:
+        if 'error' in entry:
+            ttl = self.generator.error_cache_ttl
+        try:
+            return now - datetime.datetime.fromisoformat(entry['fetched_at']) <= ttl
+        except (KeyError, TypeError, ValueError):
+            return False
+
+    def _load_cache(self) -> Dict:
+        try:
+            with open(self.generator.enrichment_path) as f:
+                return json.load(f).get('accounts', {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def _save_cache(self, cache: Dict) -> None:
+        try:
+            self.generator._write_json_atomic(self.generator.enrichment_path, {'accounts': cache})
+        except OSError as exc:
+            self.generator._print(f"Warning: unable to write enrichment cache: {exc}", file=sys.stderr)
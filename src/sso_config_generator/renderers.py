@@ -0,0 +1,168 @@
+"""Additional output formats rendered from the in-memory account model.
+
+Besides the managed block in ``~/.aws/config`` and the directory tree, a run
+can emit any number of artifacts for other tools.  Every renderer turns the
+same list of :class:`~sso_config_generator.models.Account` objects into the
+text of one file, so all artifacts come from a single discovery pass (or from
+the cache, without contacting AWS).
+
+Built-in formats:
+
+* ``json``      — account inventory as a JSON document
+* ``ndjson``    — account inventory, one JSON object per account and line
+* ``terraform`` — one ``provider "aws"`` alias block per profile
+* ``granted``   — AWS config profiles in the format written by Granted
+
+Additional formats can be added with :func:`register_renderer`.
+"""
+
+import json
+from typing import Callable, Dict, List, Optional, Type
+
+from .models import Account
+
+
+class RenderContext:
+    """Settings of the current run that renderers may need besides the accounts."""
+
+    __slots__ = ('start_url', 'sso_region', 'sso_name', 'sso_session_name', 'region',
+                 'profile_name', 'account_region')
+
+    def __init__(self, start_url: str, sso_region: str, sso_name: str, sso_session_name: str,
+                 region: str, profile_name: Callable[[Account, str], str],
+                 account_region: Optional[Callable[[Account], str]] = None):
+        self.start_url = start_url
+        self.sso_region = sso_region
+        self.sso_name = sso_name
+        self.sso_session_name = sso_session_name
+        self.region = region
+        self.profile_name = profile_name
+        # Region of an account's profiles (e.g. from an account tag)
+        self.account_region = account_region or (lambda account: region)
+
+
+class Renderer:
+    """Base class for output formats.
+
+    Subclasses set ``name`` (used on the command line) and ``default_filename``
+    (created next to the AWS config file unless a path is given) and implement
+    :meth:`render`.
+    """
+
+    name = ""
+    default_filename = ""
+
+    def render(self, accounts: List[Account], context: RenderContext) -> str:
+        """Return the complete file content for the given accounts."""
+        raise NotImplementedError
+
+
+RENDERERS: Dict[str, Type[Renderer]] = {}
+
+
+def register_renderer(cls: Type[Renderer]) -> Type[Renderer]:
+    """Class decorator that makes a renderer available under its ``name``."""
+    RENDERERS[cls.name] = cls
+    return cls
+
+
+def _inventory(account: Account, context: RenderContext) -> Dict:
+    return {
+        'id': account.id,
+        'name': account.name,
+        'ou_path': account.ou_path,
+        'region': context.account_region(account),
+        'roles': list(account.roles),
+        'profiles': [context.profile_name(account, role) for role in account.roles],
+    }
+
+
+def _hcl_string(value: str) -> str:
+    """Quote a value as an HCL string literal, without template interpolation."""
+    value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return '"' + value.replace("${", "$${").replace("%{", "%%{") + '"'
+
+
+@register_renderer
+class JsonRenderer(Renderer):
+    """Account inventory as a single JSON document."""
+
+    name = "json"
+    default_filename = "sso-accounts.json"
+
+    def render(self, accounts: List[Account], context: RenderContext) -> str:
+        return json.dumps({
+            'sso_start_url': context.start_url,
+            'sso_region': context.sso_region,
+            'accounts': [_inventory(account, context) for account in accounts],
+        }, indent=2) + "\n"
+
+
+@register_renderer
+class NdjsonRenderer(Renderer):
+    """Account inventory with one JSON object per line."""
+
+    name = "ndjson"
+    default_filename = "sso-accounts.ndjson"
+
+    def render(self, accounts: List[Account], context: RenderContext) -> str:
+        return "".join(json.dumps(_inventory(account, context)) + "\n" for account in accounts)
+
+
+@register_renderer
+class TerraformRenderer(Renderer):
+    """Terraform ``provider "aws"`` blocks, one alias per generated profile."""
+
+    name = "terraform"
+    default_filename = "sso-providers.tf"
+
+    def render(self, accounts: List[Account], context: RenderContext) -> str:
+        blocks = ["# Generated by sso-config-generator; do not edit.\n"]
+        aliases = set()
+        for account in accounts:
+            for role in account.roles:
+                profile = context.profile_name(account, role)
+                alias = "".join(c if c.isalnum() or c in "_-" else "_" for c in profile)
+                if not alias[0].isalpha() and alias[0] != "_":
+                    alias = f"_{alias}"
+                if alias in aliases:
+                    # Profiles that differ only in replaced characters, e.g. "a.b" and "a_b"
+                    base, n = f"{alias}_{account.id}", 1
+                    alias = base
+                    while alias in aliases:
+                        n += 1
+                        alias = f"{base}_{n}"
+                aliases.add(alias)
+                blocks.append(
+                    'provider "aws" {\n'
+                    f'  alias   = {_hcl_string(alias)}\n'
+                    f'  profile = {_hcl_string(profile)}\n'
+                    f'  region  = {_hcl_string(context.account_region(account))}\n'
+                    '}\n'
+                )
+        return "\n".join(blocks)
+
+
+@register_renderer
+class GrantedRenderer(Renderer):
+    """AWS config profiles in the style of ``granted sso generate``."""
+
+    name = "granted"
+    default_filename = "granted-config"
+
+    def render(self, accounts: List[Account], context: RenderContext) -> str:
+        sections = []
+        for account in accounts:
+            for role in account.roles:
+                profile = context.profile_name(account, role)
+                sections.append(
+                    f"[profile {profile}]\n"
+                    f"granted_sso_start_url      = {context.start_url}\n"
+                    f"granted_sso_region         = {context.sso_region}\n"
+                    f"granted_sso_account_id     = {account.id}\n"
+                    f"granted_sso_role_name      = {role}\n"
+                    f"common_fate_generated_from = aws-sso\n"
+                    f"credential_process         = granted credential-process --profile {profile}\n"
+                    f"region                     = {context.account_region(account)}\n"
+                )
+        return "\n".join(sections)
@@ -0,0 +1,261 @@
+"""Host-wide cache of organization-level data, shared by all users of a host.
+
+On shared hosts (jump hosts, Cloud9 instances with several users) every user
+otherwise discovers the same OU tree and account placement for their own
+``.ou-cache``.  With a shared cache directory the organization-level data is
+fetched once per host and reused by everyone:
+
+* the OU tree
+* the OU path of every account (account-to-OU placement)
+
+Which accounts a user can see (the SSO account list) and which roles they
+have there are grants of that user, so those stay in the per-user cache.
+
+There is one file per SSO start URL, ``org-<hash>.json``.  Readers take a
+shared ``flock`` on ``<file>.lock`` and writers an exclusive one, so an
+update is never read half-written.  Whoever finds the OU tree expired
+rebuilds it while holding the exclusive lock; users arriving in the meantime
+wait and then use the new tree instead of building it as well.
+
+Files are created group-writable (the directory gets the setgid bit, so they
+keep its group).  A cache file or directory that anyone may write to is not
+trusted, because any user on the host could have put a forged OU tree there.
+
+The locking needs ``fcntl.flock``; where it is not available (Windows) every
+use of the shared cache raises :class:`SharedCacheError`.
+"""
+
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so no shared cache
+    fcntl = None
+
+SHARED_CACHE_FORMAT = "sso-config-generator-org-cache"
+
+# Members of the directory's group may update the cache; others may only read it
+FILE_MODE = 0o664
+DIRECTORY_MODE = 0o2775
+
+
+class SharedCacheError(Exception):
+    """Raised when the shared cache cannot be used safely."""
+
+
+class SharedOrgCache:
+    """Organization-level data for one SSO start URL in a shared directory.
+
+    Placements looked up during a run are collected in memory and merged into
+    the file by :meth:`flush`, so a discovery run writes the file once.
+
+    Args:
+        directory: Shared cache directory
+        start_url: SSO start URL the organization data belongs to
+        lock_timeout: Returns how many seconds a lock may still be waited for,
+            or None to wait as long as it takes (default)
+    """
+
+    def __init__(self, directory: str, start_url: str,
+                 lock_timeout: Optional[Callable[[], Optional[float]]] = None):
+        self.directory = os.path.abspath(os.path.expanduser(directory))
+        self.start_url = start_url
+        key = hashlib.sha256(start_url.encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(self.directory, f"org-{key}.json")
+        self.lock_path = f"{self.path}.lock"
+        self._data: Optional[Dict] = None
+        self._new_placements: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._lock_timeout = lock_timeout
+
+    def ou_tree(self, ttl: datetime.timedelta) -> Optional[Dict]:
+        """Return the shared OU tree when it is younger than ``ttl``."""
+        data = self._load()
+        if self._fresh(data.get('ou_tree_fetched_at'), ttl):
+            return data.get('ou_tree')
+        return None
+
+    def placement(self, account_id: str, ttl: datetime.timedelta) -> Optional[str]:
+        """Return the shared OU path of an account when it is younger than ``ttl``."""
+        with self._lock:
+            entry = self._new_placements.get(account_id)
+        if entry is None:
+            entry = self._load().get('placements', {}).get(account_id)
+        if entry and self._fresh(entry.get('fetched_at'), ttl):
+            return entry['ou_path']
+        return None
+
+    def record_placement(self, account_id: str, ou_path: str) -> None:
+        """Remember a freshly looked up placement until the next :meth:`flush`."""
+        with self._lock:
+            self._new_placements[account_id] = {'ou_path': ou_path, 'fetched_at': _now()}
+
+    def forget_placements(self, account_ids: Iterable[str]) -> None:
+        """Ignore the shared placement of accounts for the rest of this run.
+
+        Used for targeted refreshes, which must ask AWS rather than the cache.
+        """
+        data = self._load()
+        with self._lock:
+            for account_id in account_ids:
+                data.get('placements', {}).pop(account_id, None)
+                self._new_placements.pop(account_id, None)
+
+    @contextlib.contextmanager
+    def rebuilding_ou_tree(self, ttl: datetime.timedelta) -> Iterator[Optional[Dict]]:
+        """Hold the exclusive lock while the OU tree is rebuilt.
+
+        Yields the shared OU tree when another user refreshed it while this one
+        waited for the lock, otherwise None; the caller then builds the tree and
+        passes it to :meth:`store_ou_tree` before leaving the block.
+        """
+        with self._locked(exclusive=True):
+            self._data = self._read()
+            yield self.ou_tree(ttl)
+
+    def store_ou_tree(self, ou_tree: Dict) -> None:
+        """Write a freshly built OU tree (call within :meth:`rebuilding_ou_tree`)."""
+        data = self._load()
+        data['ou_tree'] = ou_tree
+        data['ou_tree_fetched_at'] = _now()
+        self._write(data)
+
+    def flush(self) -> int:
+        """Merge the placements recorded during this run into the shared file.
+
+        Returns:
+            int: Number of placements written
+        """
+        with self._lock:
+            placements, self._new_placements = self._new_placements, {}
+        if not placements:
+            return 0
+        with self._locked(exclusive=True):
+            # Merge into the current file, which other users may have updated
+            data = self._read()
+            data.setdefault('placements', {}).update(placements)
+            self._write(data)
+            self._data = data
+        return len(placements)
+
+    def _load(self) -> Dict:
+        if self._data is None:
+            with self._locked(exclusive=False):
+                self._data = self._read()
+        return self._data
+
+    def _read(self) -> Dict:
+        """Read the cache file; call with the lock held."""
+        try:
+            with open(self.path) as f:
+                self._check_trusted(os.fstat(f.fileno()), self.path)
+                data = json.load(f)
+        except FileNotFoundError:
+            return self._empty()
+        except ValueError:
+            # Only a writer holding the exclusive lock could have produced this;
+            # start over rather than failing every user of the host
+            return self._empty()
+        except OSError as exc:
+            raise SharedCacheError(f"unable to read {self.path}: {exc}") from exc
+        if data.get('format') != SHARED_CACHE_FORMAT or data.get('start_url') != self.start_url:
+            return self._empty()
+        return data
+
+    def _write(self, data: Dict) -> None:
+        """Atomically replace the cache file; call with the exclusive lock held."""
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, FILE_MODE)
+            with os.fdopen(fd, 'w') as f:
+                os.fchmod(f.fileno(), FILE_MODE)  # independent of the user's umask
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise SharedCacheError(f"unable to write {self.path}: {exc}") from exc
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        if fcntl is None:
+            raise SharedCacheError("file locking (fcntl) is not available on this platform")
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        self._ensure_directory()
+        try:
+            try:
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, FILE_MODE)
+            except PermissionError:
+                if exclusive:
+                    raise
+                # Users outside the group can still read under a shared lock
+                fd = os.open(self.lock_path, os.O_RDONLY)
+        except OSError as exc:
+            raise SharedCacheError(f"unable to open lock file {self.lock_path}: {exc}") from exc
+        try:
+            with contextlib.suppress(OSError):
+                os.fchmod(fd, FILE_MODE)  # fails when another user created it; that is fine
+            self._flock(fd, operation)
+            yield
+        finally:
+            os.close(fd)  # releases the lock
+
+    def _flock(self, fd: int, operation: int) -> None:
+        timeout = self._lock_timeout() if self._lock_timeout else None
+        if timeout is None:
+            fcntl.flock(fd, operation)
+            return
+        give_up = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, operation | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= give_up:
+                    raise SharedCacheError(f"timed out waiting for {self.lock_path}") from None
+                time.sleep(0.05)
+
+    def _ensure_directory(self) -> None:
+        try:
+            os.makedirs(self.directory)
+        except FileExistsError:
+            pass
+        except OSError as exc:
+            raise SharedCacheError(f"unable to create {self.directory}: {exc}") from exc
+        else:
+            with contextlib.suppress(OSError):
+                os.chmod(self.directory, DIRECTORY_MODE)
+        self._check_trusted(os.stat(self.directory), self.directory)
+
+    def _check_trusted(self, st: os.stat_result, path: str) -> None:
+        # Updates replace the file, so a sticky world-writable directory (like
+        # /tmp) would not work either: use a directory owned by a shared group
+        if st.st_mode & stat.S_IWOTH:
+            raise SharedCacheError(f"{path} is writable by every user")
+
+    def _empty(self) -> Dict:
+        return {'format': SHARED_CACHE_FORMAT, 'start_url': self.start_url,
+                'ou_tree': None, 'ou_tree_fetched_at': None, 'placements': {}}
+
+    @staticmethod
+    def _fresh(timestamp: Optional[str], ttl: datetime.timedelta) -> bool:
+        try:
+            fetched_at = datetime.datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            return False
+        if fetched_at.tzinfo is None:
+            fetched_at = fetched_at.astimezone()  # written in local time by an older release
+        return datetime.datetime.now(datetime.timezone.utc) - fetched_at <= ttl
+
+
+def _now() -> str:
+    # UTC: the users of a host may have different TZ settings
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
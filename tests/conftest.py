@@ -0,0 +1,216 @@
+"""Shared fixtures: an isolated home directory and stubbed AWS clients.
+
+The generator is never allowed to reach AWS: every test replaces its SSO
+client with :class:`FakeSSO` and authenticates with a token in the SSO cache
+of a temporary home directory.
+"""
+
+import datetime
+import json
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+
+START_URL = "https://acme.awsapps.com/start"
+
+AWS_CONFIG = f"""[sso-session sso]
+sso_region = eu-west-1
+sso_start_url = {START_URL}
+
+[profile sso-browser]
+sso_session = sso
+region = eu-west-1
+"""
+
+
+class _Paginator:
+    def __init__(self, pages):
+        self._pages = pages
+
+    def paginate(self, **kwargs):
+        return iter(self._pages(**kwargs))
+
+
+class FakeSSO:
+    """SSO portal client serving a fixed account list and role grants.
+
+    Args:
+        accounts: ``(account_id, account_name)`` pairs
+        roles: Role names by account ID; an exception is raised by the role lookup
+        delay: Seconds every role lookup takes
+        page_size: Accounts per ``list_accounts`` page
+    """
+
+    def __init__(self, accounts, roles, delay=0.0, page_size=None):
+        self.accounts = list(accounts)
+        self.roles = roles
+        self.delay = delay
+        self.page_size = page_size or max(1, len(self.accounts))
+        self.role_lookups = []
+        self.account_listings = 0
+        self.credential_requests = []
+        self.credential_lifetime = datetime.timedelta(hours=1)
+
+    def list_accounts(self, **kwargs):
+        return {'accountList': self._account_list(self.accounts)}
+
+    def get_role_credentials(self, accountId, roleName, accessToken):
+        time.sleep(self.delay)
+        self.credential_requests.append((accountId, roleName))
+        roles = self.roles.get(accountId)
+        if not isinstance(roles, list) or roleName not in roles:
+            raise ClientError({'Error': {'Code': 'ForbiddenException', 'Message': 'No access'}},
+                              'GetRoleCredentials')
+        expiration = datetime.datetime.now(datetime.timezone.utc) + self.credential_lifetime
+        return {'roleCredentials': {
+            'accessKeyId': f'AKIA{accountId}',
+            'secretAccessKey': 'secret',
+            'sessionToken': f'{roleName}-{len(self.credential_requests)}',
+            'expiration': int(expiration.timestamp() * 1000),
+        }}
+
+    def get_paginator(self, name):
+        if name == 'list_accounts':
+            return _Paginator(self._account_pages)
+        if name == 'list_account_roles':
+            return _Paginator(self._role_pages)
+        raise AssertionError(f"unexpected paginator {name}")
+
+    def _account_pages(self, accessToken, PaginationConfig=None, **kwargs):
+        self.account_listings += 1
+        start = int((PaginationConfig or {}).get('StartingToken') or 0)
+        for first in range(start, len(self.accounts), self.page_size):
+            page = {'accountList': self._account_list(self.accounts[first:first + self.page_size])}
+            if first + self.page_size < len(self.accounts):
+                page['nextToken'] = str(first + self.page_size)
+            yield page
+
+    def _role_pages(self, accountId, **kwargs):
+        time.sleep(self.delay)
+        self.role_lookups.append(accountId)
+        roles = self.roles.get(accountId, [])
+        if isinstance(roles, BaseException):
+            raise roles
+        yield {'roleList': [{'roleName': role} for role in roles]}
+
+    @staticmethod
+    def _account_list(accounts):
+        return [{'accountId': account_id, 'accountName': name} for account_id, name in accounts]
+
+
+class FakeOrganizations:
+    """Organizations client serving a fixed OU tree below the root ``r-root``.
+
+    Args:
+        ous: Child OUs as ``(ou_id, name)`` pairs by parent ID
+        placements: Parent OU ID by account ID; other accounts are in the root
+        delay: Seconds every listing of child OUs takes
+        tags: Tags by account ID; an exception is raised by the tag lookup
+    """
+
+    ROOT = 'r-root'
+
+    def __init__(self, ous=None, placements=None, delay=0.0, tags=None):
+        self.ous = ous or {}
+        self.placements = placements or {}
+        self.delay = delay
+        self.tags = tags or {}
+        self.tag_lookups = []
+        self.parents = {ou_id: parent for parent, children in self.ous.items()
+                        for ou_id, _ in children}
+        self.names = {ou_id: name for children in self.ous.values() for ou_id, name in children}
+        self.parent_lookups = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def list_roots(self, **kwargs):
+        return {'Roots': [{'Id': self.ROOT}]}
+
+    def get_paginator(self, name):
+        if name == 'list_organizational_units_for_parent':
+            return _Paginator(self._ou_pages)
+        raise AssertionError(f"unexpected paginator {name}")
+
+    def list_parents(self, ChildId):
+        self.parent_lookups.append(ChildId)
+        parent = self.placements.get(ChildId) or self.parents.get(ChildId) or self.ROOT
+        return {'Parents': [{'Id': parent, 'Type': 'ROOT' if parent == self.ROOT else 'ORGANIZATIONAL_UNIT'}]}
+
+    def list_tags_for_resource(self, ResourceId, **kwargs):
+        self.tag_lookups.append(ResourceId)
+        tags = self.tags.get(ResourceId, {})
+        if isinstance(tags, BaseException):
+            raise tags
+        return {'Tags': [{'Key': key, 'Value': value} for key, value in tags.items()]}
+
+    def describe_organizational_unit(self, OrganizationalUnitId):
+        return {'OrganizationalUnit': {'Id': OrganizationalUnitId,
+                                       'Name': self.names[OrganizationalUnitId]}}
+
+    def _ou_pages(self, ParentId, **kwargs):
+        with self._lock:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self._in_flight -= 1
+        # One OU per page, so every listing is paginated
+        for ou_id, name in self.ous.get(ParentId, []):
+            yield {'OrganizationalUnits': [{'Id': ou_id, 'Name': name}]}
+
+
+@pytest.fixture
+def aws_home(tmp_path, monkeypatch):
+    """A home directory with an SSO session, a valid cached token and a work directory."""
+    home = tmp_path / "home"
+    (home / ".aws" / "sso" / "cache").mkdir(parents=True)
+    (home / "work").mkdir()
+    (home / ".aws" / "config").write_text(AWS_CONFIG)
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+    (home / ".aws" / "sso" / "cache" / "token.json").write_text(json.dumps({
+        'startUrl': START_URL,
+        'accessToken': 'token',
+        'expiresAt': expires.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'region': 'eu-west-1',
+    }))
+    monkeypatch.setenv('HOME', str(home))
+    monkeypatch.delenv('AWS_CONFIG_FILE', raising=False)
+    monkeypatch.delenv('AWS_PROFILE', raising=False)
+    monkeypatch.setenv('AWS_EC2_METADATA_DISABLED', 'true')
+    monkeypatch.chdir(home / "work")
+    return home
+
+
+@pytest.fixture
+def make_generator(aws_home):
+    """Return a factory for generators whose SSO client is a :class:`FakeSSO`."""
+    from sso_config_generator.core import SSOConfigGenerator
+
+    def make(accounts, roles=None, delay=0.0, page_size=None, **options):
+        roles = roles if roles is not None else {account_id: ['Dev'] for account_id, _ in accounts}
+        options.setdefault('quiet', True)
+        generator = SSOConfigGenerator(**options)
+        generator.sso = FakeSSO(accounts, roles, delay=delay, page_size=page_size)
+        return generator
+
+    return make
+
+
+@pytest.fixture
+def managed_block(aws_home):
+    """Return a function reading the managed block of the AWS config file."""
+    def read() -> str:
+        config = (aws_home / ".aws" / "config").read_text()
+        return config.split("# BEGIN SSO-CONFIG-GENERATOR MANAGED BLOCK")[1].split(
+            "# END SSO-CONFIG-GENERATOR MANAGED BLOCK")[0]
+
+    return read
+
+
+@pytest.fixture
+def make_organizations():
+    """Return a factory for :class:`FakeOrganizations` clients."""
+    return FakeOrganizations
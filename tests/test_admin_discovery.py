@@ -0,0 +1,96 @@
+from botocore.exceptions import ClientError
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+INSTANCE_ARN = 'arn:aws:sso:::instance/ssoins-1'
+
+
+class _Paginator:
+    def __init__(self, pages):
+        self._pages = pages
+
+    def paginate(self, **kwargs):
+        return iter(self._pages(**kwargs))
+
+
+class FakeIdentityCenter:
+    """sso-admin, identitystore and sts client of an Identity Center instance.
+
+    The caller ``alice`` is assigned ``Dev`` directly and ``Admin`` through the
+    ``ops`` group; ``Unused`` is provisioned everywhere but not assigned to her.
+    """
+
+    PERMISSION_SETS = {'ps-dev': 'Dev', 'ps-admin': 'Admin', 'ps-unused': 'Unused'}
+    PROVISIONED = {'ps-dev': ['111111111111'], 'ps-admin': ['111111111111', '222222222222'],
+                   'ps-unused': ['111111111111', '222222222222']}
+    ASSIGNMENTS = {'u-alice': [('111111111111', 'ps-dev')],
+                   'g-ops': [('111111111111', 'ps-admin'), ('222222222222', 'ps-admin')]}
+
+    def __init__(self, error=None):
+        self.error = error
+        self.described = []
+
+    def list_instances(self):
+        if self.error:
+            raise self.error
+        return {'Instances': [{'InstanceArn': INSTANCE_ARN, 'IdentityStoreId': 'd-1'}]}
+
+    def get_caller_identity(self):
+        return {'Arn': 'arn:aws:sts::999999999999:assumed-role/AWSReservedSSO_Admin_1/alice'}
+
+    def get_user_id(self, IdentityStoreId, AlternateIdentifier):
+        assert AlternateIdentifier['UniqueAttribute']['AttributeValue'] == 'alice'
+        return {'UserId': 'u-alice'}
+
+    def describe_permission_set(self, InstanceArn, PermissionSetArn):
+        self.described.append(PermissionSetArn)
+        return {'PermissionSet': {'Name': self.PERMISSION_SETS[PermissionSetArn]}}
+
+    def get_paginator(self, name):
+        return _Paginator(getattr(self, f'_{name}'))
+
+    def _list_group_memberships_for_member(self, IdentityStoreId, MemberId):
+        yield {'GroupMemberships': [{'GroupId': 'g-ops'}]}
+
+    def _list_account_assignments_for_principal(self, InstanceArn, PrincipalId, PrincipalType):
+        yield {'AccountAssignments': [{'AccountId': account_id, 'PermissionSetArn': arn}
+                                      for account_id, arn in self.ASSIGNMENTS[PrincipalId]]}
+
+    def _list_accounts_for_provisioned_permission_set(self, InstanceArn, PermissionSetArn):
+        yield {'AccountIds': self.PROVISIONED[PermissionSetArn]}
+
+
+def admin_generator(make_generator, identity_center, accounts=ACCOUNTS):
+    generator = make_generator(accounts, role_discovery='admin')
+    generator._clients.update(dict.fromkeys(['sso-admin', 'identitystore', 'sts'], identity_center))
+    return generator
+
+
+def test_admin_discovery_replaces_per_account_lookups(make_generator, managed_block):
+    identity_center = FakeIdentityCenter()
+    generator = admin_generator(make_generator, identity_center)
+    assert generator.generate()
+    assert generator.sso.role_lookups == []
+    block = managed_block()
+    for profile in ('Dev@Dev', 'Admin@Dev', 'Admin@Prod'):
+        assert f'[profile {profile}]' in block
+    assert 'Unused@' not in block and '[profile Dev@Prod]' not in block
+    # Only the permission sets assigned to the caller are described
+    assert sorted(identity_center.described) == ['ps-admin', 'ps-dev']
+
+
+def test_accounts_missing_from_the_assignments_are_looked_up(make_generator, managed_block):
+    accounts = ACCOUNTS + [('999999999999', 'Management')]
+    generator = admin_generator(make_generator, FakeIdentityCenter(), accounts)
+    generator.sso.roles['999999999999'] = ['Billing']
+    assert generator.generate()
+    assert generator.sso.role_lookups == ['999999999999']
+    assert '[profile Billing@Management]' in managed_block()
+
+
+def test_inaccessible_admin_apis_fall_back_to_per_account_lookups(make_generator, managed_block):
+    error = ClientError({'Error': {'Code': 'AccessDeniedException', 'Message': 'denied'}},
+                        'ListInstances')
+    generator = admin_generator(make_generator, FakeIdentityCenter(error))
+    assert generator.generate()
+    assert sorted(generator.sso.role_lookups) == ['111111111111', '222222222222']
+    assert managed_block().count('[profile ') == 2
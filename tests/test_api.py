@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+
+from sso_config_generator.api import AccountDirectory, DiscoveryError
+
+ACCOUNTS = [(f'{i:012d}', f'Acct {i}') for i in range(1, 6)]
+
+
+def directory_for(make_generator, accounts=ACCOUNTS, **options):
+    directory = AccountDirectory()
+    directory._generator = make_generator(accounts, interactive=False, **options)
+    return directory
+
+
+def test_accounts_are_discovered_without_side_effects(make_generator, aws_home, capsys):
+    config = (aws_home / ".aws" / "config").read_text()
+    directory = directory_for(make_generator)
+    accounts = directory.accounts()
+    assert sorted(account.id for account in accounts) == [account_id for account_id, _ in ACCOUNTS]
+    assert all(account.roles == ('Dev',) for account in accounts)
+    assert (aws_home / ".aws" / "config").read_text() == config
+    assert capsys.readouterr() == ('', '')
+    # A second call is served from the cache
+    assert len(directory.accounts()) == len(ACCOUNTS)
+    assert len(directory._generator.sso.role_lookups) == len(ACCOUNTS)
+
+
+def test_async_iteration(make_generator):
+    directory = directory_for(make_generator)
+
+    async def collect():
+        return [account.id async for account in directory.aiter_accounts()]
+
+    assert sorted(asyncio.run(collect())) == [account_id for account_id, _ in ACCOUNTS]
+
+
+def test_missing_sso_session_raises_discovery_error(make_generator, aws_home):
+    (aws_home / ".aws" / "sso" / "cache" / "token.json").unlink()
+    directory = directory_for(make_generator)
+    with pytest.raises(DiscoveryError, match="discovery failed"):
+        directory.accounts()
+
+
+def test_closing_the_iterator_stops_discovery(make_generator):
+    accounts = [(f'{i:012d}', f'Acct {i}') for i in range(100)]
+    directory = directory_for(make_generator, accounts, delay=0.02, max_workers=2)
+    iterator = directory.iter_accounts()
+    next(iterator)
+    iterator.close()
+    time.sleep(0.5)
+    lookups = len(directory._generator.sso.role_lookups)
+    time.sleep(0.3)
+    assert len(directory._generator.sso.role_lookups) == lookups < len(accounts)
+    # The next run continues from the checkpoint
+    assert len(directory.accounts()) == len(accounts)
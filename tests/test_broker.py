@@ -0,0 +1,118 @@
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from sso_config_generator.broker import (BrokerError, CredentialBroker, _broker_running,
+                                         request_credentials, request_prefetch)
+from sso_config_generator.cli import cli
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+ROLES = {'111111111111': ['Dev', 'Admin'], '222222222222': ['Dev']}
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to about 100 characters
+    directory = tempfile.mkdtemp(prefix='broker-')
+    yield os.path.join(directory, 'broker.sock')
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def serve_in_background(broker, path):
+    threading.Thread(target=broker.serve, args=(path,), daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(path) and _broker_running(path):
+            return
+        time.sleep(0.01)
+    raise AssertionError("broker did not start")
+
+
+def test_credentials_are_cached_until_shortly_before_expiry(make_generator):
+    generator = make_generator(ACCOUNTS, ROLES)
+    broker = CredentialBroker(generator)
+    first = broker.get('111111111111', 'Dev')
+    assert broker.get('111111111111', 'Dev') == first
+    assert first['Version'] == 1 and first['AccessKeyId'] == 'AKIA111111111111'
+    assert len(generator.sso.credential_requests) == 1
+
+    generator.sso.credential_lifetime = datetime.timedelta(minutes=2)
+    broker.get('222222222222', 'Dev')
+    broker.get('222222222222', 'Dev')
+    assert generator.sso.credential_requests.count(('222222222222', 'Dev')) == 2
+
+
+def test_concurrent_requests_for_a_role_share_one_call(make_generator):
+    generator = make_generator(ACCOUNTS, ROLES, delay=0.05)
+    broker = CredentialBroker(generator)
+    threads = [threading.Thread(target=broker.get, args=('111111111111', 'Dev')) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert generator.sso.credential_requests == [('111111111111', 'Dev')]
+
+
+def test_denied_role_raises_broker_error(make_generator):
+    broker = CredentialBroker(make_generator(ACCOUNTS, ROLES))
+    with pytest.raises(BrokerError, match='ForbiddenException'):
+        broker.get('222222222222', 'Admin')
+
+
+def test_clients_talk_to_the_broker_over_its_socket(make_generator, socket_path):
+    generator = make_generator(ACCOUNTS, ROLES)
+    assert generator.generate()
+    broker = CredentialBroker(generator)
+    serve_in_background(broker, socket_path)
+    assert os.stat(socket_path).st_mode & 0o077 == 0
+
+    assert request_prefetch(socket_path) == 3
+    credentials = request_credentials(socket_path, '111111111111', 'Admin')
+    assert credentials == broker.get('111111111111', 'Admin')
+    assert len(generator.sso.credential_requests) == 3
+    with pytest.raises(BrokerError, match='ForbiddenException'):
+        request_credentials(socket_path, '222222222222', 'Admin')
+    with pytest.raises(BrokerError, match='already running'):
+        CredentialBroker(generator).serve(socket_path)
+
+
+def test_unreachable_broker_raises_broker_error(socket_path):
+    with pytest.raises(BrokerError, match='not reachable'):
+        request_credentials(socket_path, '111111111111', 'Dev')
+
+
+def test_profiles_use_the_broker_with_credential_process(make_generator, managed_block, socket_path):
+    generator = make_generator(ACCOUNTS, ROLES, credential_process=True, broker_socket=socket_path)
+    assert generator.generate()
+    block = managed_block()
+    assert 'sso_session' not in block.split('[profile Dev@Dev]')[1]
+    assert ('credential-process --account-id 111111111111 --role-name Dev '
+            f'--socket {socket_path}') in block
+
+
+def test_interpreter_fallback_is_reported_once(make_generator, managed_block, monkeypatch, capsys):
+    monkeypatch.setattr(shutil, 'which', lambda name: None)
+    generator = make_generator(ACCOUNTS, ROLES, quiet=False, credential_process=True)
+    assert generator.generate()
+    assert '-m sso_config_generator.cli credential-process' in managed_block()
+    assert capsys.readouterr().err.count('is not on PATH') == 1
+
+
+def test_broker_socket_is_expanded(make_generator, aws_home):
+    generator = make_generator(ACCOUNTS, broker_socket='~/broker.sock')
+    assert generator.broker_socket_path == str(aws_home / "broker.sock")
+
+
+def test_serve_with_prefetch_asks_a_running_broker(make_generator, socket_path):
+    generator = make_generator(ACCOUNTS, ROLES)
+    assert generator.generate()
+    serve_in_background(CredentialBroker(generator), socket_path)
+    result = CliRunner().invoke(cli, ['--broker-socket', socket_path, 'serve-credentials', '--prefetch'])
+    assert result.exit_code == 0, result.output
+    assert 'prefetched credentials for 3 role(s)' in result.output
+    assert len(generator.sso.credential_requests) == 3
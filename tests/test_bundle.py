@@ -0,0 +1,71 @@
+import datetime
+import gzip
+import json
+import os
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+
+
+def read_bundle(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_bundle(path, bundle):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(bundle, f)
+
+
+def test_exported_bundle_recreates_config_without_discovery(make_generator, managed_block, aws_home):
+    bundle_path = str(aws_home / "org.json.gz")
+    generator = make_generator(ACCOUNTS)
+    assert generator.generate()
+    assert generator.export_cache(bundle_path)
+    expected = managed_block()
+    os.remove(generator.ou_cache_path)
+    (aws_home / ".aws" / "config").write_text((aws_home / ".aws" / "config").read_text().replace(
+        expected, "\n"))
+
+    generator = make_generator(ACCOUNTS)
+    assert generator.import_cache(bundle_path)
+    assert managed_block() == expected
+    assert generator.sso.role_lookups == [] and generator.sso.account_listings == 0
+
+
+def test_modified_bundle_is_rejected(make_generator, aws_home, capsys):
+    bundle_path = str(aws_home / "org.json.gz")
+    generator = make_generator(ACCOUNTS)
+    assert generator.generate()
+    assert generator.export_cache(bundle_path)
+    bundle = read_bundle(bundle_path)
+    bundle['cache']['accounts'][0]['roles'].append('Admin')
+    write_bundle(bundle_path, bundle)
+    assert not make_generator(ACCOUNTS, quiet=False).import_cache(bundle_path)
+    assert "checksum mismatch" in capsys.readouterr().err
+
+
+def test_bundle_of_another_start_url_needs_force(make_generator, aws_home):
+    bundle_path = str(aws_home / "org.json.gz")
+    generator = make_generator(ACCOUNTS)
+    assert generator.generate()
+    assert generator.export_cache(bundle_path)
+    bundle = read_bundle(bundle_path)
+    bundle['start_url'] = "https://other.awsapps.com/start"
+    write_bundle(bundle_path, bundle)
+    assert not make_generator(ACCOUNTS).import_cache(bundle_path)
+    assert make_generator(ACCOUNTS).import_cache(bundle_path, force=True)
+
+
+def test_import_works_offline_with_expired_negative_entries(make_generator, managed_block, aws_home):
+    bundle_path = str(aws_home / "org.json.gz")
+    generator = make_generator(ACCOUNTS, {'111111111111': ['Dev'], '222222222222': []})
+    assert generator.generate()
+    assert generator.export_cache(bundle_path)
+    (aws_home / ".aws" / "sso" / "cache" / "token.json").unlink()
+
+    generator = make_generator(ACCOUNTS, negative_cache_ttl=datetime.timedelta(0))
+    logins = []
+    generator._ensure_sso_auth = lambda: logins.append(True)  # would start a browser login
+    assert generator.import_cache(bundle_path)
+    assert logins == [] and generator.sso.role_lookups == []
+    assert '[profile Dev@Dev]' in managed_block()
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+ACCOUNTS = [(f'{i:012d}', f'Acct {i}') for i in range(1, 7)]
+
+
+def interrupt_at(generator, account_id):
+    """Make the role lookup of one account interrupt the run."""
+    generator.sso.roles[account_id] = KeyboardInterrupt()
+
+
+def test_interrupted_rebuild_resumes_from_the_checkpoint(make_generator, managed_block):
+    generator = make_generator(ACCOUNTS, page_size=2, max_workers=1)
+    interrupt_at(generator, ACCOUNTS[4][0])
+    with pytest.raises(KeyboardInterrupt):
+        generator.generate()
+    checkpoint = f"{generator.ou_cache_path}.partial"
+    assert os.path.exists(checkpoint)
+    assert not os.path.exists(generator.ou_cache_path)
+
+    resumed = make_generator(ACCOUNTS, page_size=2, max_workers=1)
+    assert resumed.generate()
+    # The first two pages were complete; listing continues after them
+    assert set(resumed.sso.role_lookups) == {account_id for account_id, _ in ACCOUNTS[4:]}
+    assert managed_block().count('[profile ') == len(ACCOUNTS)
+    assert not os.path.exists(checkpoint)
+
+
+def test_checkpoint_of_another_layout_is_ignored(make_generator, make_organizations):
+    generator = make_generator(ACCOUNTS, page_size=2, max_workers=1)
+    interrupt_at(generator, ACCOUNTS[4][0])
+    with pytest.raises(KeyboardInterrupt):
+        generator.generate()
+
+    resumed = make_generator(ACCOUNTS, page_size=2, max_workers=1, use_ou_structure=True)
+    resumed._clients['organizations'] = make_organizations()
+    assert resumed.generate()
+    assert len(resumed.sso.role_lookups) == len(ACCOUNTS)
+    assert resumed.use_ou_structure
@@ -0,0 +1,28 @@
+import logging
+
+
+def test_clients_are_shared_and_sized_to_the_workers(make_generator):
+    generator = make_generator([], max_workers=32)
+    client = generator._client('organizations')
+    assert generator._client('organizations') is client
+    assert client.meta.config.max_pool_connections == 32
+    assert client.meta.config.tcp_keepalive
+    assert make_generator([], max_workers=2)._client('sts').meta.config.max_pool_connections == 10
+
+
+def test_requests_of_shared_clients_are_counted(make_generator):
+    generator = make_generator([], quiet=False)
+    client = generator._client('organizations')
+    client.meta.events.emit('before-send.organizations.ListRoots', request=None)
+    client.meta.events.emit('before-send.organizations.ListRoots', request=None)
+    assert generator.connection_stats.requests == 2
+    assert generator.connection_stats.summary().startswith("AWS API requests: 2,")
+
+
+def test_counting_leaves_logging_alone(make_generator):
+    pool_logger = logging.getLogger('urllib3.connectionpool')
+    level, handlers = pool_logger.level, list(pool_logger.handlers)
+    generator = make_generator([], quiet=False)
+    generator._client('organizations')
+    assert pool_logger.level == level and pool_logger.handlers == handlers
+    assert generator.connection_stats.new_connections == 0
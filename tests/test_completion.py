@@ -0,0 +1,59 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from sso_config_generator.completion import SCRIPTS, update_completion_index
+
+
+def write_index(directory, block="block", profiles=('Dev@B', 'Admin@A', 'Dev@A'),
+                accounts=('A', '111111111111'), ou_paths=('/Prod/', '/Prod/')):
+    return update_completion_index(str(directory), block, profiles=profiles,
+                                   accounts=accounts, ou_paths=ou_paths)
+
+
+def test_index_files_are_sorted_and_deduplicated(tmp_path):
+    assert write_index(tmp_path)
+    assert (tmp_path / "profiles.idx").read_text() == "Admin@A\nDev@A\nDev@B\n"
+    assert (tmp_path / "ous.idx").read_text() == "/Prod/\n"
+    for shell in SCRIPTS:
+        script = (tmp_path / f"completion.{shell}").read_text()
+        assert str(tmp_path) in script and '__INDEX_DIR__' not in script
+
+
+def test_index_is_only_rewritten_when_the_block_changed(tmp_path):
+    assert write_index(tmp_path)
+    assert not write_index(tmp_path)
+    assert write_index(tmp_path, block="changed")
+    # Missing scripts are restored even when the block did not change
+    os.remove(tmp_path / "completion.zsh")
+    assert write_index(tmp_path, block="changed")
+
+
+@pytest.mark.parametrize('shell', sorted(SCRIPTS))
+def test_scripts_complete_aws_profile_values(shell):
+    assert 'AWS_PROFILE' in SCRIPTS[shell]
+
+
+@pytest.mark.skipif(shutil.which('bash') is None, reason="bash is not available")
+def test_bash_completes_profiles_containing_wordbreaks(tmp_path):
+    write_index(tmp_path, profiles=('Dev@Other', 'Dev@Prod'))
+    script = tmp_path / "completion.bash"
+    probe = f"""
+source {script}
+complete_line() {{
+    COMP_LINE=$1; COMP_POINT=${{#1}}
+    read -ra COMP_WORDS <<< "$1"; COMP_CWORD=$(( ${{#COMP_WORDS[@]}} - 1 ))
+    COMPREPLY=()
+    "$2" "${{COMP_WORDS[0]}}" "${{COMP_WORDS[COMP_CWORD]}}" "${{COMP_WORDS[COMP_CWORD-1]}}"
+    echo "${{COMPREPLY[*]}}"
+}}
+complete_line 'aws s3 ls --profile Dev@O' _sso_config_generator_complete_aws
+complete_line 'export AWS_PROFILE=Dev@P' _sso_config_generator_complete_export
+"""
+    result = subprocess.run(['bash', '--norc', '--noprofile', '-c', probe],
+                            capture_output=True, text=True, check=True)
+    lines = result.stdout.splitlines()
+    # "@" is a word break, so only the part after it is completed
+    assert lines == ['Other', 'Prod']
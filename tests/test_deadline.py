@@ -0,0 +1,97 @@
+import datetime
+import os
+import threading
+import time
+
+import pytest
+
+from sso_config_generator.deadline import TIMED_OUT, DaemonThreadPool, call_with_timeout
+
+ACCOUNTS = [(f'{i:012d}', f'Acct {i}') for i in range(1, 31)]
+
+
+def test_call_with_timeout():
+    assert call_with_timeout(None, max, 1, 2) == 2
+    assert call_with_timeout(1.0, max, 1, 2) == 2
+    assert call_with_timeout(0.05, time.sleep, 1) is TIMED_OUT
+
+
+def test_call_with_timeout_raises_the_error_of_the_call():
+    with pytest.raises(ValueError):
+        call_with_timeout(1.0, int, 'x')
+
+
+def test_pool_runs_on_daemon_threads():
+    pool = DaemonThreadPool(2, name="test-pool")
+    futures = [pool.submit(lambda: threading.current_thread()) for _ in range(4)]
+    threads = {future.result(timeout=1) for future in futures}
+    pool.shutdown()
+    assert threads and all(thread.daemon for thread in threads)
+    assert len(threads) <= 2
+
+
+def test_pool_shutdown_cancels_queued_calls():
+    pool = DaemonThreadPool(1)
+    release = threading.Event()
+    running = pool.submit(release.wait)
+    queued = pool.submit(time.sleep, 0)
+    pool.shutdown(wait=False, cancel_futures=True)
+    assert queued.cancelled()
+    release.set()
+    assert running.result(timeout=1)
+
+
+def test_deadline_stops_rebuild_and_checkpoints(make_generator, managed_block):
+    generator = make_generator(ACCOUNTS, delay=0.2, max_workers=4,
+                               deadline=datetime.timedelta(seconds=0.5))
+    started = time.monotonic()
+    assert generator.generate()
+    assert time.monotonic() - started < 2
+    assert generator.degraded
+    assert os.path.exists(generator.checkpoint_path)
+    assert generator._deadline_at is None  # the deadline bounds that run only
+    discovered = set(generator.sso.role_lookups)
+    assert 0 < len(discovered) < len(ACCOUNTS)
+
+    # Without a deadline the next run continues from the checkpoint
+    resumed = make_generator(ACCOUNTS, max_workers=4)
+    assert resumed.generate()
+    assert not resumed.degraded
+    assert not os.path.exists(resumed.checkpoint_path)
+    assert managed_block().count('[profile ') == len(ACCOUNTS)
+    # Accounts finished before the deadline are not looked up again; only the
+    # lookups in flight at the deadline (at most 2 * max_workers) are repeated
+    assert len(set(resumed.sso.role_lookups) & discovered) <= 8
+
+
+def test_deadline_with_expired_cache_serves_the_cache(make_generator, managed_block):
+    assert make_generator(ACCOUNTS, max_workers=4).generate()
+    generator = make_generator(ACCOUNTS, delay=0.2, max_workers=4, roles_ttl=datetime.timedelta(0),
+                               deadline=datetime.timedelta(seconds=0.5))
+    assert generator.generate()
+    assert generator.degraded
+    assert managed_block().count('[profile ') == len(ACCOUNTS)
+
+
+def test_interrupted_rebuild_is_resumed_while_the_cache_is_fresh(make_generator, managed_block):
+    assert make_generator(ACCOUNTS, max_workers=4).generate()
+    generator = make_generator(ACCOUNTS, delay=0.2, max_workers=4,
+                               deadline=datetime.timedelta(seconds=0.5))
+    assert generator.generate(rebuild_cache=True)
+    assert os.path.exists(generator.checkpoint_path)
+
+    resumed = make_generator(ACCOUNTS, max_workers=4)
+    assert resumed.generate()
+    assert 0 < len(resumed.sso.role_lookups) < len(ACCOUNTS)
+    assert not os.path.exists(resumed.checkpoint_path)
+    assert managed_block().count('[profile ') == len(ACCOUNTS)
+
+
+def test_unusable_checkpoint_is_discarded(make_generator):
+    assert make_generator(ACCOUNTS, max_workers=4).generate()
+    generator = make_generator(ACCOUNTS)
+    with open(generator.checkpoint_path, 'w') as f:
+        f.write('{"checkpoint": {"use_ou_structure": true}}\n')
+    assert generator.generate()
+    assert generator.sso.role_lookups == []
+    assert not os.path.exists(generator.checkpoint_path)
@@ -0,0 +1,30 @@
+import datetime
+
+import pytest
+
+from sso_config_generator.durations import parse_duration
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('90', datetime.timedelta(seconds=90)),
+    ('90s', datetime.timedelta(seconds=90)),
+    ('15m', datetime.timedelta(minutes=15)),
+    ('12H', datetime.timedelta(hours=12)),
+    (' 7d ', datetime.timedelta(days=7)),
+    ('1.5h', datetime.timedelta(minutes=90)),
+    ('0', datetime.timedelta(0)),
+    (30, datetime.timedelta(seconds=30)),
+])
+def test_parse_duration(value, expected):
+    assert parse_duration(value) == expected
+
+
+def test_timedelta_is_returned_as_is():
+    value = datetime.timedelta(minutes=5)
+    assert parse_duration(value) is value
+
+
+@pytest.mark.parametrize('value', ['', 'abc', '-5m', '5w', '1h30m'])
+def test_invalid_durations_are_rejected(value):
+    with pytest.raises(ValueError, match='invalid duration'):
+        parse_duration(value)
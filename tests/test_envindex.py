@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from sso_config_generator.envindex import MARKER_VARIABLE, exports, resolve, update_env_index
+
+ENTRY = {
+    'account_id': '111111111111',
+    'account_name': 'Dev',
+    'ou_path': '/Workloads/',
+    'region': 'eu-west-1',
+    'profiles': {'Admin': 'Admin@Dev', 'Dev': 'Dev@Dev'},
+    'default_role': 'Dev',
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    root = tmp_path / "acme"
+    (root / "Workloads" / "Dev" / "repo").mkdir(parents=True)
+    index_path = str(tmp_path / "sso-env-index.json")
+    update_env_index(index_path, str(root), {'Workloads/Dev': ENTRY})
+    return root, index_path
+
+
+def test_index_is_only_rewritten_when_changed(index):
+    root, index_path = index
+    assert not update_env_index(index_path, str(root), {'Workloads/Dev': ENTRY})
+    assert update_env_index(index_path, str(root), {'Workloads/Dev': dict(ENTRY, region='us-east-1')})
+
+
+def test_trees_are_kept_side_by_side(index, tmp_path):
+    root, index_path = index
+    other = tmp_path / "other"
+    (other / "Prod").mkdir(parents=True)
+    update_env_index(index_path, str(other), {'Prod': ENTRY})
+    with open(index_path) as f:
+        assert len(json.load(f)['trees']) == 2
+
+
+def test_resolve_matches_account_directory_and_subdirectories(index):
+    root, index_path = index
+    assert resolve(str(root / "Workloads" / "Dev"), index_path) == ENTRY
+    assert resolve(str(root / "Workloads" / "Dev" / "repo"), index_path) == ENTRY
+    assert resolve(str(root / "Workloads"), index_path) is None
+    assert resolve(str(root.parent), index_path) is None
+
+
+def test_resolve_without_index(tmp_path):
+    assert resolve(str(tmp_path), str(tmp_path / "missing.json")) is None
+
+
+def test_exports_select_default_or_requested_role():
+    assert exports(ENTRY, environ={}) == (f"export AWS_PROFILE=Dev@Dev\n"
+                                          f"export {MARKER_VARIABLE}=Dev@Dev\n")
+    assert "set -gx AWS_PROFILE Admin@Dev;" in exports(ENTRY, role='Admin', shell='fish', environ={})
+    with pytest.raises(KeyError):
+        exports(ENTRY, role='Ops', environ={})
+
+
+def test_leaving_the_tree_only_unsets_own_profile():
+    assert exports(None, environ={}) == ""
+    environ = {MARKER_VARIABLE: 'Dev@Dev', 'AWS_PROFILE': 'Dev@Dev'}
+    assert exports(None, environ=environ) == f"unset AWS_PROFILE {MARKER_VARIABLE}\n"
+    # A profile the user selected themselves is left alone
+    environ['AWS_PROFILE'] = 'mine'
+    assert exports(None, environ=environ) == f"unset {MARKER_VARIABLE}\n"
+    assert exports(None, shell='fish', environ=environ) == f"set -e {MARKER_VARIABLE};\n"
+
+
+def test_generate_indexes_the_account_directories(make_generator, aws_home):
+    generator = make_generator([('111111111111', 'Dev')], {'111111111111': ['Admin', 'Dev']},
+                               create_directories=True)
+    assert generator.generate()
+    entry = resolve(str(aws_home / "work" / "acme" / "Dev"), str(aws_home / ".aws" / "sso-env-index.json"))
+    assert entry['account_id'] == '111111111111'
+    assert entry['profiles'] == {'Admin': 'Admin@Dev', 'Dev': 'Dev@Dev'}
@@ -0,0 +1,164 @@
+import json
+import os
+import time
+
+from sso_config_generator.core import _AccountSink
+from sso_config_generator.models import Organization
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+
+
+def test_generate_writes_one_profile_per_role(make_generator, managed_block):
+    generator = make_generator(ACCOUNTS, {'111111111111': ['Dev', 'Admin'], '222222222222': ['Admin']})
+    assert generator.generate()
+    block = managed_block()
+    for profile in ('Dev@Dev', 'Admin@Dev', 'Admin@Prod'):
+        assert f'[profile {profile}]' in block
+    assert os.path.exists(generator.ou_cache_path)
+
+
+def test_streamed_writes_keep_the_previous_block(make_generator, managed_block):
+    assert make_generator(ACCOUNTS).generate()
+    generator = make_generator(ACCOUNTS)
+    sink = _AccountSink(generator, generator._get_sso_info(), flush_interval=0)
+    sink(Organization().add_account('333333333333', 'New', '/', ('Dev',)))
+    block = managed_block()
+    for profile in ('Dev@Dev', 'Dev@Prod', 'Dev@New'):
+        assert f'[profile {profile}]' in block
+    # Only the final write drops profiles and updates the completion index
+    with open(os.path.join(generator.completion_dir, 'profiles.idx')) as f:
+        assert 'Dev@New' not in f.read()
+
+
+def test_config_is_replaced_atomically_and_only_when_changed(make_generator, aws_home):
+    config = aws_home / ".aws" / "config"
+    os.chmod(config, 0o600)
+    before = config.stat()
+    assert make_generator(ACCOUNTS).generate()
+    written = config.stat()
+    assert written.st_ino != before.st_ino  # a new file replaced the old one
+    assert written.st_mode & 0o777 == 0o600
+    assert not (aws_home / ".aws" / "config.tmp").exists()
+    assert make_generator(ACCOUNTS).generate()
+    unchanged = config.stat()
+    assert (unchanged.st_ino, unchanged.st_mtime_ns) == (written.st_ino, written.st_mtime_ns)
+
+
+def test_colliding_names_keep_the_first_account(make_generator, make_organizations, managed_block,
+                                                aws_home, capsys):
+    generator = make_generator(ACCOUNTS, quiet=False, alias_tag='Alias', create_directories=True,
+                               developer_role_name='Dev')
+    tags = {account_id: {'Alias': 'shared'} for account_id, _ in ACCOUNTS}
+    generator._clients['organizations'] = make_organizations(tags=tags)
+    assert generator.generate()
+    block = managed_block()
+    assert block.count('[profile Dev@shared]') == 1
+    assert '111111111111' in block and '222222222222' not in block
+    stderr = capsys.readouterr().err
+    assert "profile 'Dev@shared'" in stderr and "directory" in stderr
+    assert (aws_home / "work" / "acme" / "shared" / ".envrc").exists()
+
+
+def test_ou_field_is_usable_in_names(make_generator):
+    generator = make_generator(ACCOUNTS, profile_name_template='{role}@{ou}-{account}')
+    account = Organization().add_account('1', 'A', '/Work loads/Prod/', ('Dev',))
+    assert generator._profile_name(account, 'Dev') == 'Dev@Work_loads-Prod-A'
+
+
+def test_refresh_looks_up_only_the_selected_accounts(make_generator, managed_block):
+    assert make_generator(ACCOUNTS).generate()
+    accounts = ACCOUNTS + [('333333333333', 'New')]
+    roles = {'111111111111': ['Dev'], '222222222222': ['Dev', 'Admin'], '333333333333': ['Dev']}
+    generator = make_generator(accounts, roles)
+    assert generator.refresh(['Prod', '333333333333'])
+    assert sorted(generator.sso.role_lookups) == ['222222222222', '333333333333']
+    block = managed_block()
+    for profile in ('Dev@Dev', 'Admin@Prod', 'Dev@New'):
+        assert f'[profile {profile}]' in block
+
+def test_refresh_accepts_sanitized_names(make_generator, managed_block, capsys):
+    assert make_generator(ACCOUNTS[:1]).generate()
+    generator = make_generator(ACCOUNTS + [('333333333333', 'New Box')], quiet=False)
+    assert generator.refresh(['New_Box'])
+    assert 'not found' not in capsys.readouterr().err
+    assert '[profile Dev@New_Box]' in managed_block()
+
+
+def test_refresh_without_matching_accounts_succeeds(make_generator, managed_block, capsys):
+    assert make_generator(ACCOUNTS).generate()
+    block = managed_block()
+    generator = make_generator(ACCOUNTS, quiet=False)
+    assert generator.refresh(['Missing'])
+    assert "Account 'Missing' not found" in capsys.readouterr().err
+    assert generator.sso.role_lookups == []
+    assert managed_block() == block
+
+
+
+def test_watch_regenerates_when_the_account_list_changed(make_generator, managed_block, monkeypatch):
+    generator = make_generator(ACCOUNTS)
+    sleeps = []
+
+    def sleep(seconds):
+        if not seconds:
+            return  # role lookups of the fake SSO client
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            generator.sso.accounts.append(('333333333333', 'New'))
+            generator.sso.roles['333333333333'] = ['Dev']
+
+    monkeypatch.setattr(time, 'sleep', sleep)
+    runs = []
+    generate = generator.generate
+    generator.generate = lambda rebuild_cache=False: runs.append(rebuild_cache) or generate(rebuild_cache)
+    assert generator.watch(interval=60, iterations=3, jitter=0)
+    assert runs == [False, True]
+    assert sleeps == [60, 60, 60]
+    assert '[profile Dev@New]' in managed_block()
+
+def test_watch_adopts_the_fingerprint_without_rebuilding(make_generator, monkeypatch):
+    assert make_generator(ACCOUNTS).generate()
+    generator = make_generator(ACCOUNTS)
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    runs = []
+    generate = generator.generate
+    generator.generate = lambda rebuild_cache=False: runs.append(rebuild_cache) or generate(rebuild_cache)
+    assert generator.watch(iterations=2, jitter=0)
+    assert runs == [False]
+    assert generator._cached_fingerprint()
+
+
+
+def test_rebuild_journals_the_changes(make_generator):
+    assert make_generator(ACCOUNTS).generate()
+    generator = make_generator(ACCOUNTS[:1] + [('333333333333', 'New')])
+    assert generator.generate(rebuild_cache=True)
+    record, = generator.read_changes()
+    assert record['source'] == 'rebuild'
+    assert [change['id'] for change in record['added']] == ['333333333333']
+    assert record['removed'] == [{'id': '222222222222', 'name': 'Prod'}]
+    # An unchanged organization adds no record
+    assert make_generator(ACCOUNTS[:1] + [('333333333333', 'New')]).generate(rebuild_cache=True)
+    assert len(generator.read_changes()) == 1
+
+
+def test_journal_has_no_moves_against_a_flat_cache(make_generator):
+    assert make_generator(ACCOUNTS).generate()
+    generator = make_generator(ACCOUNTS)
+    with open(generator.ou_cache_path) as f:
+        previous = json.load(f)
+    current = dict(previous, use_ou_structure=True,
+                   accounts=[dict(entry, ou_path='/Prod/') for entry in previous['accounts']])
+    assert generator._record_changes(previous, current, 'rebuild') is None
+
+
+def test_clear_ou_cache_files_keeps_side_files(make_generator, aws_home):
+    generator = make_generator(ACCOUNTS)
+    names = ['.ou-cache', '.ou-cache.other', '.ou', '.ou.x.json', '.ou-cache.journal',
+             '.ou-cache.partial', '.ou-cache.validation', '.ou-cache.enrichment']
+    for name in names:
+        (aws_home / ".aws" / name).touch()
+    assert generator.clear_ou_cache_files(keep=[generator.ou_cache_path]) == 3
+    left = sorted(name for name in os.listdir(aws_home / ".aws") if name.startswith('.ou'))
+    assert left == ['.ou-cache', '.ou-cache.enrichment', '.ou-cache.journal',
+                    '.ou-cache.partial', '.ou-cache.validation']
@@ -0,0 +1,57 @@
+from sso_config_generator.models import Organization, diff_accounts
+
+
+def entry(account_id, name='Acct', ou_path='/', roles=('Dev',)):
+    return {'id': account_id, 'name': name, 'ou_path': ou_path, 'roles': list(roles)}
+
+
+def test_ou_nodes_are_shared_and_normalized():
+    org = Organization()
+    node = org.ou('Workloads/Prod')
+    assert node is org.ou('/Workloads/Prod/')
+    assert node.path == '/Workloads/Prod/'
+    assert node.parts == ['Workloads', 'Prod']
+    assert node.parent is org.ou('/Workloads/')
+    assert org.ou(None) is org.root
+    assert org.root.parts == []
+
+
+def test_accounts_share_role_sets():
+    org = Organization()
+    first = org.add_account('1', 'A', '/', ['Dev', 'Admin'])
+    second = org.add_account('2', 'B', '/', ['Dev', 'Admin'])
+    assert first.roles is second.roles
+
+
+def test_cache_round_trip_keeps_enrichment():
+    entries = [dict(entry('1', 'A', '/Workloads/'), checked_at='2026-01-01T00:00:00',
+                    tags={'Env': 'prod'}, tags_checked_at='2026-01-01T00:00:00'),
+               entry('2', 'B', roles=())]
+    org = Organization.from_cache(entries)
+    assert org.accounts[0].ou_path == '/Workloads/'
+    assert org.accounts[0].tags == {'Env': 'prod'}
+    assert org.accounts[1].tags == {}
+    assert org.to_cache() == entries
+
+
+def test_diff_reports_every_category():
+    old = [entry('1', 'A'), entry('2', 'B', roles=('Dev', 'Admin')), entry('3', 'C')]
+    new = [entry('1', 'A2', '/Prod/'), entry('2', 'B', roles=('Dev', 'Ops')), entry('4', 'D')]
+    delta = diff_accounts(old, new)
+    assert delta['added'] == [{'id': '4', 'name': 'D', 'ou_path': '/', 'roles': ['Dev']}]
+    assert delta['removed'] == [{'id': '3', 'name': 'C'}]
+    assert delta['renamed'] == [{'id': '1', 'from': 'A', 'to': 'A2'}]
+    assert delta['moved'] == [{'id': '1', 'name': 'A2', 'from': '/', 'to': '/Prod/'}]
+    assert delta['roles_granted'] == [{'id': '2', 'name': 'B', 'roles': ['Ops']}]
+    assert delta['roles_revoked'] == [{'id': '2', 'name': 'B', 'roles': ['Admin']}]
+
+
+def test_diff_treats_accounts_without_roles_as_absent():
+    delta = diff_accounts([entry('1', roles=())], [entry('1')])
+    assert [change['id'] for change in delta['added']] == ['1']
+    assert not any(delta[key] for key in delta if key != 'added')
+
+
+def test_diff_without_ou_comparison_reports_no_moves():
+    delta = diff_accounts([entry('1')], [entry('1', ou_path='/Prod/')], compare_ou=False)
+    assert not any(delta.values())
@@ -0,0 +1,80 @@
+import datetime
+import json
+
+from botocore.exceptions import ClientError
+
+ACCOUNTS = [('111111111111', 'Ok'), ('222222222222', 'Empty'), ('333333333333', 'Denied'),
+            ('444444444444', 'Throttled'), ('555555555555', 'Broken')]
+
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'ListAccountRoles')
+
+
+ROLES = {
+    '111111111111': ['Dev'],
+    '222222222222': [],
+    '333333333333': client_error('ForbiddenException'),
+    '444444444444': client_error('TooManyRequestsException'),
+    '555555555555': client_error('InternalServerException'),
+}
+
+
+def cached_entries(generator):
+    with open(generator.ou_cache_path) as f:
+        return {entry['name']: entry for entry in json.load(f)['accounts']}
+
+
+def test_accounts_without_roles_are_cached_with_their_reason(make_generator, managed_block):
+    generator = make_generator(ACCOUNTS, ROLES)
+    assert generator.generate()
+    entries = cached_entries(generator)
+    assert {name: entry.get('status') for name, entry in entries.items()} == {
+        'Ok': None, 'Empty': 'no_roles', 'Denied': 'access_denied',
+        'Throttled': 'throttled', 'Broken': 'error'}
+    assert all(entry['checked_at'] for entry in entries.values())
+    assert managed_block().count('[profile ') == 1
+
+
+def test_negative_entries_are_not_looked_up_before_their_ttl(make_generator):
+    assert make_generator(ACCOUNTS, ROLES).generate()
+    generator = make_generator(ACCOUNTS, ROLES)
+    assert generator.generate()
+    assert generator.sso.role_lookups == []
+
+
+def test_failed_lookups_expire_before_accounts_without_roles(make_generator):
+    assert make_generator(ACCOUNTS, ROLES).generate()
+    generator = make_generator(ACCOUNTS, ROLES, error_cache_ttl=datetime.timedelta(0))
+    assert generator.generate()
+    assert sorted(generator.sso.role_lookups) == ['444444444444', '555555555555']
+
+    generator = make_generator(ACCOUNTS, ROLES, negative_cache_ttl=datetime.timedelta(0))
+    assert generator.generate()
+    assert sorted(generator.sso.role_lookups) == ['222222222222', '333333333333']
+
+
+def test_rechecked_account_with_roles_gets_profiles(make_generator, managed_block):
+    assert make_generator(ACCOUNTS, ROLES).generate()
+    generator = make_generator(ACCOUNTS, dict(ROLES, **{'444444444444': ['Dev']}),
+                               error_cache_ttl=datetime.timedelta(0))
+    assert generator.generate()
+    assert '[profile Dev@Throttled]' in managed_block()
+    assert 'status' not in cached_entries(generator)['Throttled']
+
+
+def test_recheck_looks_up_only_the_roles(make_generator, make_organizations, managed_block):
+    ous = {'r-root': [('ou-w', 'Workloads')]}
+    placements = {account_id: 'ou-w' for account_id, _ in ACCOUNTS}
+    generator = make_generator(ACCOUNTS, ROLES, use_ou_structure=True)
+    generator._clients['organizations'] = make_organizations(ous, placements)
+    assert generator.generate()
+
+    generator = make_generator(ACCOUNTS, dict(ROLES, **{'222222222222': ['Dev']}),
+                               use_ou_structure=True, negative_cache_ttl=datetime.timedelta(0))
+    generator.org_client = organizations = make_organizations(ous, placements)
+    assert generator.generate()
+    assert sorted(generator.sso.role_lookups) == ['222222222222', '333333333333']
+    assert organizations.parent_lookups == []
+    assert cached_entries(generator)['Empty']['ou_path'] == '/Workloads/'
+    assert '[profile Dev@Empty]' in managed_block()
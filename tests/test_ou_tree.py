@@ -0,0 +1,32 @@
+OUS = {
+    'r-root': [('ou-w', 'Workloads'), ('ou-s', 'Security'), ('ou-x', 'Sandbox')],
+    'ou-w': [('ou-wp', 'Prod'), ('ou-wd', 'Dev')],
+    'ou-wp': [('ou-wpe', 'EU'), ('ou-wpu', 'US')],
+    'ou-s': [('ou-sl', 'Log Archive')],
+}
+
+
+def depth_first(org, parent_id, path="/"):
+    """The recursive walk the breadth-first build replaced."""
+    tree = {'id': parent_id, 'path': path, 'children': []}
+    for page in org.get_paginator('list_organizational_units_for_parent').paginate(ParentId=parent_id):
+        for ou in page['OrganizationalUnits']:
+            tree['children'].append(depth_first(org, ou['Id'], f"{path}{ou['Name']}/"))
+    return tree
+
+
+def test_breadth_first_tree_matches_depth_first_walk(make_generator, make_organizations):
+    generator = make_generator([], max_workers=4)
+    generator.org_client = make_organizations(OUS, delay=0.02)
+    tree = generator._build_ou_tree('r-root')
+    assert tree == depth_first(make_organizations(OUS), 'r-root')
+    assert [child['path'] for child in tree['children']] == ['/Workloads/', '/Security/', '/Sandbox/']
+    # The OUs of a level are listed concurrently
+    assert generator.org_client.max_in_flight > 1
+
+
+def test_account_placement_follows_the_tree(make_generator, make_organizations):
+    generator = make_generator([])
+    generator.org_client = make_organizations(OUS, placements={'111111111111': 'ou-wpe'})
+    assert generator._get_account_ou_path('111111111111') == '/Workloads/Prod/EU/'
+    assert generator._get_account_ou_path('222222222222') == '/'
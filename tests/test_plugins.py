@@ -0,0 +1,78 @@
+import datetime
+
+import pytest
+from botocore.exceptions import ClientError
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+
+
+class FakeIAM:
+    """IAM client of the account whose role credentials it was created with."""
+
+    def __init__(self, calls, access_key, denied):
+        self.account_id = access_key[len('AKIA'):]
+        self.calls = calls
+        self.denied = denied
+
+    def list_account_aliases(self):
+        self.calls.append(self.account_id)
+        if self.account_id in self.denied:
+            raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': 'denied'}},
+                              'ListAccountAliases')
+        return {'AccountAliases': [f'alias-{self.account_id}']}
+
+
+def enriching_generator(make_generator, denied=(), **options):
+    generator = make_generator(ACCOUNTS, create_directories=True, enrich=['alias'], **options)
+    generator.iam_calls = []
+
+    def client(service, aws_access_key_id, **kwargs):
+        assert service == 'iam'
+        return FakeIAM(generator.iam_calls, aws_access_key_id, denied)
+
+    generator.session.client = client
+    return generator
+
+
+def test_tasks_run_inside_each_account(make_generator, aws_home):
+    generator = enriching_generator(make_generator)
+    assert generator.generate()
+    assert sorted(generator.iam_calls) == ['111111111111', '222222222222']
+    assert sorted(generator.sso.credential_requests) == [('111111111111', 'Dev'),
+                                                         ('222222222222', 'Dev')]
+    tree = aws_home / "work" / "acme"
+    assert (tree / "Dev" / ".account-alias").read_text() == "alias-111111111111\n"
+    assert (tree / "Prod" / ".account-alias").read_text() == "alias-222222222222\n"
+
+
+def test_cached_results_are_written_without_contacting_the_accounts(make_generator, aws_home):
+    assert enriching_generator(make_generator).generate()
+    alias = aws_home / "work" / "acme" / "Dev" / ".account-alias"
+    alias.unlink()
+    generator = enriching_generator(make_generator)
+    assert generator.generate()
+    assert generator.iam_calls == [] and generator.sso.credential_requests == []
+    assert alias.read_text() == "alias-111111111111\n"
+
+
+def test_failures_are_summarized_and_retried(make_generator, aws_home, capsys):
+    generator = enriching_generator(make_generator, denied={'222222222222'}, quiet=False)
+    assert generator.generate()
+    assert "alias: AccessDenied in 1 account(s) (Prod)" in capsys.readouterr().err
+    assert not (aws_home / "work" / "acme" / "Prod" / ".account-alias").exists()
+
+    generator = enriching_generator(make_generator, error_cache_ttl=datetime.timedelta(0))
+    assert generator.generate()
+    assert generator.iam_calls == ['222222222222']
+    assert (aws_home / "work" / "acme" / "Prod" / ".account-alias").exists()
+
+
+def test_accounts_without_the_enrichment_role_are_skipped(make_generator):
+    generator = enriching_generator(make_generator, enrichment_role='Admin')
+    assert generator.generate()
+    assert generator.iam_calls == []
+
+
+def test_unknown_task_is_rejected(make_generator):
+    with pytest.raises(ValueError, match="unknown enrichment task 'lint'"):
+        make_generator(ACCOUNTS, enrich=['lint'])
@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from sso_config_generator.models import Organization
+from sso_config_generator.renderers import RENDERERS, RenderContext
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+ROLES = {'111111111111': ['Dev', 'Admin'], '222222222222': ['Dev']}
+
+
+@pytest.fixture
+def accounts():
+    org = Organization()
+    org.add_account('111111111111', 'Dev', '/Workloads/', ('Dev', 'Admin'))
+    org.add_account('222222222222', '1 Prod', '/', ('Dev',))
+    return org.accounts
+
+
+@pytest.fixture
+def context():
+    return RenderContext(start_url="https://acme.awsapps.com/start", sso_region='eu-west-1',
+                         sso_name='acme', sso_session_name='sso', region='us-east-1',
+                         profile_name=lambda account, role: f"{role}@{account.name}")
+
+
+def render(name, accounts, context):
+    return RENDERERS[name]().render(accounts, context)
+
+
+def test_json_and_ndjson_inventories_agree(accounts, context):
+    document = json.loads(render('json', accounts, context))
+    assert document['sso_start_url'] == context.start_url
+    lines = [json.loads(line) for line in render('ndjson', accounts, context).splitlines()]
+    assert lines == document['accounts']
+    assert lines[0] == {'id': '111111111111', 'name': 'Dev', 'ou_path': '/Workloads/',
+                        'region': 'us-east-1', 'roles': ['Dev', 'Admin'],
+                        'profiles': ['Dev@Dev', 'Admin@Dev']}
+
+
+def test_terraform_aliases_are_valid_identifiers(accounts, context):
+    content = render('terraform', accounts, context)
+    assert content.count('provider "aws" {') == 3
+    assert 'alias   = "Admin_Dev"' in content
+    assert 'profile = "Dev@1 Prod"' in content
+    assert 'alias   = "Dev_1_Prod"' in content
+    assert 'region  = "us-east-1"' in content
+
+
+def test_granted_profiles_use_granted_credential_process(accounts, context):
+    content = render('granted', accounts, context)
+    assert content.count('[profile ') == 3
+    assert "credential_process         = granted credential-process --profile Admin@Dev\n" in content
+    assert "granted_sso_account_id     = 222222222222\n" in content
+
+
+def test_outputs_are_written_next_to_the_config(make_generator, aws_home, capsys):
+    outputs = ['json', 'terraform=terraform/providers.tf']
+    assert make_generator(ACCOUNTS, ROLES, outputs=outputs).generate()
+    inventory = json.loads((aws_home / ".aws" / "sso-accounts.json").read_text())
+    assert [account['id'] for account in inventory['accounts']] == ['111111111111', '222222222222']
+    assert (aws_home / ".aws" / "terraform" / "providers.tf").exists()
+
+    # render() works from the cache without contacting AWS and keeps unchanged files
+    generator = make_generator(ACCOUNTS, ROLES, outputs=outputs, quiet=False)
+    capsys.readouterr()
+    assert generator.render()
+    assert generator.sso.role_lookups == [] and generator.sso.account_listings == 0
+    assert capsys.readouterr().out.count("output unchanged") == 2
+
+
+def test_unknown_output_format_is_rejected(make_generator):
+    with pytest.raises(ValueError, match="unknown output format 'yaml'"):
+        make_generator(ACCOUNTS, outputs=['yaml'])
+
+
+def test_account_region_overrides_the_default(accounts, context):
+    context.account_region = lambda account: 'ap-south-1' if account.id == '111111111111' else 'us-east-1'
+    content = render('terraform', accounts, context)
+    assert content.count('region  = "ap-south-1"') == 2
+    assert content.count('region  = "us-east-1"') == 1
+
+
+def test_terraform_aliases_are_unique_and_values_escaped(context):
+    org = Organization()
+    org.add_account('111111111111', 'a.b', '/', ('Dev',))
+    org.add_account('222222222222', 'a_b', '/', ('Dev',))
+    org.add_account('333333333333', 'say "${hi}"', '/', ('Dev',))
+    content = render('terraform', org.accounts, context)
+    assert 'alias   = "Dev_a_b"' in content
+    assert 'alias   = "Dev_a_b_222222222222"' in content
+    assert 'profile = "Dev@say \\"$${hi}\\""' in content
@@ -0,0 +1,84 @@
+import datetime
+
+from botocore.exceptions import ClientError
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+OUS = {'r-root': [('ou-w', 'Workloads'), ('ou-s', 'Sandbox')]}
+EXPIRED = datetime.timedelta(0)
+
+
+def with_organizations(generator, organizations):
+    """Let the generator use a fake Organizations client."""
+    generator._clients['organizations'] = organizations
+    return generator
+
+
+def test_fresh_cache_is_used_without_any_lookup(make_generator):
+    assert make_generator(ACCOUNTS).generate()
+    generator = make_generator(ACCOUNTS)
+    assert generator.generate()
+    assert generator.sso.account_listings == 0
+    assert generator.sso.role_lookups == []
+
+
+def test_only_expired_roles_are_looked_up_again(make_generator, managed_block):
+    assert make_generator(ACCOUNTS).generate()
+    generator = make_generator(ACCOUNTS, {'111111111111': ['Dev', 'Admin'], '222222222222': ['Dev']},
+                               roles_ttl=EXPIRED)
+    assert generator.generate()
+    assert sorted(generator.sso.role_lookups) == ['111111111111', '222222222222']
+    assert generator.sso.account_listings == 0
+    assert '[profile Admin@Dev]' in managed_block()
+
+
+
+def test_failed_lookup_keeps_the_cached_roles(make_generator, managed_block):
+    assert make_generator(ACCOUNTS).generate()
+    throttled = ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Slow down'}},
+                            'ListAccountRoles')
+    generator = make_generator(ACCOUNTS, {'111111111111': throttled, '222222222222': []},
+                               roles_ttl=EXPIRED)
+    assert generator.generate()
+    block = managed_block()
+    assert '[profile Dev@Dev]' in block and '[profile Dev@Prod]' not in block
+
+    # The kept roles are retried after the error TTL, not the roles TTL
+    retry = make_generator(ACCOUNTS, {'111111111111': ['Admin']}, error_cache_ttl=EXPIRED)
+    assert retry.generate()
+    assert retry.sso.role_lookups == ['111111111111']
+    block = managed_block()
+    assert '[profile Admin@Dev]' in block and '[profile Dev@Dev]' not in block
+    assert make_generator(ACCOUNTS, error_cache_ttl=EXPIRED)._expired_segments(
+        retry._load_cache_data())[1] == []
+
+def test_expired_account_list_discovers_only_new_accounts(make_generator, managed_block):
+    assert make_generator(ACCOUNTS).generate()
+    generator = make_generator(ACCOUNTS[:1] + [('333333333333', 'New')], account_list_ttl=EXPIRED)
+    assert generator.generate()
+    assert generator.sso.role_lookups == ['333333333333']
+    block = managed_block()
+    assert '[profile Dev@New]' in block and '[profile Dev@Prod]' not in block
+    record, = generator.read_changes()
+    assert record['source'] == 'update'
+
+
+def test_unchanged_ou_tree_keeps_the_placement(make_generator, make_organizations):
+    organizations = make_organizations(OUS, placements={'111111111111': 'ou-w'})
+    assert with_organizations(make_generator(ACCOUNTS, use_ou_structure=True), organizations).generate()
+    generator = make_generator(ACCOUNTS, use_ou_structure=True, ou_tree_ttl=EXPIRED)
+    generator.org_client = organizations = make_organizations(OUS, placements={'111111111111': 'ou-w'})
+    assert generator.generate()
+    assert organizations.parent_lookups == []
+    assert generator.sso.role_lookups == []
+
+
+def test_changed_ou_tree_refreshes_the_placement(make_generator, make_organizations):
+    organizations = make_organizations(OUS, placements={'111111111111': 'ou-w'})
+    assert with_organizations(make_generator(ACCOUNTS, use_ou_structure=True), organizations).generate()
+    moved = {'r-root': OUS['r-root'] + [('ou-p', 'Prod')]}
+    generator = make_generator(ACCOUNTS, use_ou_structure=True, ou_tree_ttl=EXPIRED)
+    generator.org_client = make_organizations(moved, placements={'222222222222': 'ou-p'})
+    assert generator.generate()
+    paths = {account.name: account.ou_path for account in generator._get_accounts_from_cache()}
+    assert paths == {'Dev': '/', 'Prod': '/Prod/'}
+    assert generator.sso.role_lookups == []
@@ -0,0 +1,135 @@
+import datetime
+import json
+import os
+import threading
+
+import pytest
+
+from sso_config_generator import shared_cache
+from sso_config_generator.shared_cache import SharedCacheError, SharedOrgCache
+
+START_URL = "https://acme.awsapps.com/start"
+TTL = datetime.timedelta(hours=1)
+TREE = {'id': 'r-1', 'name': 'Root', 'children': []}
+
+pytestmark = pytest.mark.skipif(shared_cache.fcntl is None, reason="needs fcntl")
+
+
+@pytest.fixture
+def directory(tmp_path):
+    path = tmp_path / "shared"
+    path.mkdir(mode=0o775)
+    os.chmod(path, 0o775)
+    return str(path)
+
+
+def test_ou_tree_is_shared_between_users(directory):
+    first = SharedOrgCache(directory, START_URL)
+    with first.rebuilding_ou_tree(TTL) as tree:
+        assert tree is None
+        first.store_ou_tree(TREE)
+    assert SharedOrgCache(directory, START_URL).ou_tree(TTL) == TREE
+    assert SharedOrgCache(directory, START_URL).ou_tree(datetime.timedelta(0)) is None
+
+
+def test_placements_are_merged_on_flush(directory):
+    first = SharedOrgCache(directory, START_URL)
+    second = SharedOrgCache(directory, START_URL)
+    first.record_placement('1', '/Prod/')
+    second.record_placement('2', '/Dev/')
+    assert first.placement('1', TTL) == '/Prod/'  # visible before the flush
+    assert first.flush() == 1
+    assert second.flush() == 1
+    assert first.flush() == 0
+    reader = SharedOrgCache(directory, START_URL)
+    assert reader.placement('1', TTL) == '/Prod/'
+    assert reader.placement('2', TTL) == '/Dev/'
+    reader.forget_placements(['1'])
+    assert reader.placement('1', TTL) is None
+
+
+def test_files_of_other_start_urls_are_separate(directory):
+    cache = SharedOrgCache(directory, START_URL)
+    cache.record_placement('1', '/Prod/')
+    cache.flush()
+    assert SharedOrgCache(directory, "https://other.awsapps.com/start").placement('1', TTL) is None
+
+
+def test_unreadable_content_starts_over(directory):
+    cache = SharedOrgCache(directory, START_URL)
+    with open(cache.path, 'w') as f:
+        f.write("{not json")
+    assert cache.ou_tree(TTL) is None
+
+
+def test_foreign_content_is_ignored(directory):
+    cache = SharedOrgCache(directory, START_URL)
+    with open(cache.path, 'w') as f:
+        json.dump({'format': 'something-else', 'ou_tree': TREE}, f)
+    assert cache.ou_tree(TTL) is None
+
+
+def test_world_writable_directory_is_not_trusted(directory):
+    os.chmod(directory, 0o777)
+    with pytest.raises(SharedCacheError, match="writable by every user"):
+        SharedOrgCache(directory, START_URL).ou_tree(TTL)
+
+
+def test_lock_wait_is_bounded(directory):
+    holder = SharedOrgCache(directory, START_URL)
+    waiter = SharedOrgCache(directory, START_URL, lock_timeout=lambda: 0.2)
+    locked, release = threading.Event(), threading.Event()
+
+    def hold():
+        with holder._locked(exclusive=True):
+            locked.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    try:
+        assert locked.wait(5)
+        with pytest.raises(SharedCacheError, match="timed out"):
+            waiter.ou_tree(TTL)
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_second_user_reuses_tree_and_placements(make_generator, make_organizations, directory):
+    accounts = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+    ous = {'r-root': [('ou-w', 'Workloads'), ('ou-s', 'Sandbox')]}
+    placements = {'111111111111': 'ou-w', '222222222222': 'ou-s'}
+    first = make_generator(accounts, use_ou_structure=True, shared_cache_dir=directory)
+    first._clients['organizations'] = make_organizations(ous, placements)
+    assert first.generate()
+    os.remove(first.ou_cache_path)
+
+    second = make_generator(accounts, use_ou_structure=True, shared_cache_dir=directory)
+    second._clients['organizations'] = organizations = make_organizations(ous)
+    assert second.generate()
+    assert organizations.max_in_flight == 0 and organizations.parent_lookups == []
+    paths = {account.name: account.ou_path for account in second._get_accounts_from_cache()}
+    assert paths == {'Dev': '/Workloads/', 'Prod': '/Sandbox/'}
+
+
+def test_platform_without_fcntl(directory, monkeypatch):
+    monkeypatch.setattr(shared_cache, 'fcntl', None)
+    with pytest.raises(SharedCacheError, match="not available"):
+        SharedOrgCache(directory, START_URL).ou_tree(TTL)
+
+
+def test_timestamps_are_utc(directory):
+    cache = SharedOrgCache(directory, START_URL)
+    cache.record_placement('1', '/Prod/')
+    cache.flush()
+    with open(cache.path) as f:
+        fetched_at = datetime.datetime.fromisoformat(json.load(f)['placements']['1']['fetched_at'])
+    assert fetched_at.utcoffset() == datetime.timedelta(0)
+
+
+def test_local_timestamps_of_older_releases_are_read(directory):
+    cache = SharedOrgCache(directory, START_URL)
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    assert cache._fresh(now, TTL)
+    assert not cache._fresh(now, datetime.timedelta(seconds=-1))
@@ -0,0 +1,60 @@
+import json
+import os
+import stat
+
+START_URL = "https://acme.awsapps.com/start"
+
+
+class FakeOIDC:
+    def __init__(self):
+        self.requests = []
+
+    def create_token(self, **kwargs):
+        self.requests.append(kwargs)
+        return {'accessToken': 'new-token', 'expiresIn': 3600, 'refreshToken': 'new-refresh'}
+
+
+def expire_token(aws_home, **fields):
+    path = aws_home / ".aws" / "sso" / "cache" / "token.json"
+    path.write_text(json.dumps(dict({
+        'startUrl': START_URL,
+        'region': 'eu-west-1',
+        'accessToken': 'old-token',
+        'expiresAt': '2020-01-01T00:00:00Z',
+        'refreshToken': 'refresh',
+        'clientId': 'client',
+        'clientSecret': 'secret',
+    }, **fields)))
+    return path
+
+
+def test_expired_token_is_refreshed_and_written_back(make_generator, aws_home):
+    path = expire_token(aws_home)
+    generator = make_generator([])
+    generator._clients['sso-oidc'] = oidc = FakeOIDC()
+    assert generator._ensure_sso_auth()
+    assert generator.access_token == 'new-token'
+    assert oidc.requests == [{'grantType': 'refresh_token', 'clientId': 'client',
+                              'clientSecret': 'secret', 'refreshToken': 'refresh'}]
+    token = json.loads(path.read_text())
+    assert token['accessToken'] == 'new-token' and token['refreshToken'] == 'new-refresh'
+    assert token['expiresAt'] > '2020'
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    # The next run uses the written-back token without another refresh
+    assert make_generator([])._get_sso_token() == 'new-token'
+
+
+def test_expired_client_registration_is_not_used(make_generator, aws_home):
+    expire_token(aws_home, registrationExpiresAt='2020-01-01T00:00:00Z')
+    generator = make_generator([])
+    generator._clients['sso-oidc'] = oidc = FakeOIDC()
+    assert not generator._ensure_sso_auth()
+    assert oidc.requests == []
+
+
+def test_legacy_token_without_refresh_token_is_not_refreshed(make_generator, aws_home):
+    expire_token(aws_home, refreshToken=None)
+    generator = make_generator([])
+    generator._clients['sso-oidc'] = oidc = FakeOIDC()
+    assert generator._refresh_sso_token() is None
+    assert oidc.requests == []
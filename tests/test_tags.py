@@ -0,0 +1,68 @@
+import datetime
+import json
+
+import pytest
+from botocore.exceptions import ClientError
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+TAGS = {'111111111111': {'Alias': 'sandbox', 'Region': 'us-east-1', 'Team': 'web'},
+        '222222222222': {'Team': 'data'}}
+OPTIONS = dict(alias_tag='Alias', region_tag='Region',
+               profile_name_template='{role}@{account}-{tags[Team]}')
+
+
+def tagged_generator(make_generator, make_organizations, tags=TAGS, **options):
+    generator = make_generator(ACCOUNTS, **dict(OPTIONS, **options))
+    generator._clients['organizations'] = make_organizations(tags=tags)
+    return generator
+
+
+def cached_tags(generator):
+    with open(generator.ou_cache_path) as f:
+        return {entry['id']: entry.get('tags') for entry in json.load(f)['accounts']}
+
+
+def test_tags_name_profiles_and_set_their_region(make_generator, make_organizations, managed_block):
+    assert tagged_generator(make_generator, make_organizations).generate()
+    block = managed_block()
+    sandbox = block.split('[profile Dev@sandbox-web]\n')[1].split('\n\n')[0]
+    assert 'region = us-east-1' in sandbox
+    prod = block.split('[profile Dev@Prod-data]\n')[1].split('\n\n')[0]
+    assert 'region = eu-west-1' in prod
+
+
+def test_cached_tags_are_reused_until_their_ttl(make_generator, make_organizations):
+    assert tagged_generator(make_generator, make_organizations).generate()
+    generator = tagged_generator(make_generator, make_organizations)
+    assert generator.generate()
+    assert generator._clients['organizations'].tag_lookups == []
+
+    generator = tagged_generator(make_generator, make_organizations, tags_ttl=datetime.timedelta(0))
+    assert generator.generate()
+    assert sorted(generator._clients['organizations'].tag_lookups) == ['111111111111', '222222222222']
+    assert generator.sso.role_lookups == []
+
+
+def test_failed_tag_lookup_keeps_the_previous_tags(make_generator, make_organizations):
+    assert tagged_generator(make_generator, make_organizations).generate()
+    throttled = ClientError({'Error': {'Code': 'TooManyRequestsException', 'Message': 'slow down'}},
+                            'ListTagsForResource')
+    generator = tagged_generator(make_generator, make_organizations,
+                                 tags=dict(TAGS, **{'111111111111': throttled}),
+                                 tags_ttl=datetime.timedelta(0))
+    assert generator.generate()
+    assert cached_tags(generator) == {'111111111111': TAGS['111111111111'],
+                                      '222222222222': TAGS['222222222222']}
+
+
+def test_tags_are_not_fetched_when_unused(make_generator, make_organizations):
+    generator = make_generator(ACCOUNTS)
+    generator._clients['organizations'] = organizations = make_organizations(tags=TAGS)
+    assert generator.generate()
+    assert organizations.tag_lookups == []
+    assert cached_tags(generator) == {'111111111111': None, '222222222222': None}
+
+
+def test_unknown_template_field_is_rejected(make_generator):
+    with pytest.raises(ValueError, match="invalid profile name template"):
+        make_generator(ACCOUNTS, profile_name_template='{role}@{acount}')
@@ -0,0 +1,47 @@
+import datetime
+import json
+
+ACCOUNTS = [('111111111111', 'Dev'), ('222222222222', 'Prod')]
+ROLES = {'111111111111': ['Dev', 'Admin'], '222222222222': ['Dev']}
+
+
+def validated(make_generator, roles=ROLES, **options):
+    generator = make_generator(ACCOUNTS, roles, **options)
+    return generator, generator.validate()
+
+
+def test_valid_results_are_reused_until_their_ttl(make_generator):
+    assert make_generator(ACCOUNTS, ROLES).generate()
+    generator, valid = validated(make_generator)
+    assert valid and len(generator.sso.credential_requests) == 3
+    with open(generator.validation_path) as f:
+        results = json.load(f)['profiles']
+    assert {result['status'] for result in results.values()} == {'ok'}
+
+    generator, valid = validated(make_generator)
+    assert valid and generator.sso.credential_requests == []
+    generator, valid = validated(make_generator, validation_ttl=datetime.timedelta(0))
+    assert valid and len(generator.sso.credential_requests) == 3
+
+
+def test_failed_profiles_are_checked_on_every_run(make_generator, capsys):
+    assert make_generator(ACCOUNTS, ROLES).generate()
+    revoked = dict(ROLES, **{'111111111111': ['Dev']})
+    generator, valid = validated(make_generator, revoked, quiet=False)
+    assert not valid
+    assert "Admin@Dev: denied (ForbiddenException)" in capsys.readouterr().err
+
+    generator, valid = validated(make_generator, revoked)
+    assert not valid
+    assert generator.sso.credential_requests == [('111111111111', 'Admin')]
+
+
+def test_changed_profiles_are_checked_again(make_generator, aws_home):
+    assert make_generator(ACCOUNTS, ROLES).generate()
+    assert validated(make_generator)[1]
+    config = aws_home / ".aws" / "config"
+    config.write_text(config.read_text().replace(
+        "sso_account_id = 222222222222", "sso_account_id = 111111111111"))
+    generator, valid = validated(make_generator)
+    assert valid
+    assert generator.sso.credential_requests == [('111111111111', 'Dev')]